@@ -30,8 +30,12 @@ class CanCreateSalesOrAdminOnly(permissions.BasePermission):
             return True
 
         if request.method == 'POST':
-            movement_type = request.data.get('movement_type')
-            if movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+            # Bulk requests send a list; every row must be an OUT movement.
+            rows = request.data if isinstance(request.data, list) else [request.data]
+            if rows and all(
+                hasattr(row, 'get') and row.get('movement_type') == InventoryMovement.MOVEMENT_OUTPUT
+                for row in rows
+            ):
                 return True
 
             return request.user and request.user.is_staff
@@ -11,7 +11,6 @@ django.setup()
 from django.utils import timezone
 from purchasing.models import PurchaseOrder
 from suppliers.models import Supplier
-from django.db.models import F, ExpressionWrapper, DateField, Subquery, OuterRef
 
 def debug_payment_issues():
     print("=== DEBUGGING PAYMENT DUE ISSUES ===\n")
@@ -63,27 +62,14 @@ def debug_payment_issues():
     for supplier in suppliers:
         print(f"\nSupplier: {supplier.name}")
         print(f"Payment terms: {supplier.payment_terms} days")
-        print(f"Last purchase date: {supplier.last_purchase_date}")
-        print(f"Payment due date: {supplier.payment_due_date}")
-        print(f"Payment status: {supplier.payment_status}")
+        print(f"Last purchase date: {supplier.latest_order_date}")
+        print(f"Payment due date: {supplier.next_payment_due_date}")
     
     # Check suppliers count calculation from dashboard
     print("\n4. SUPPLIERS DUE COUNT (Dashboard calculation):")
     print("="*50)
-    due_suppliers_count = Supplier.objects.annotate(
-        latest_order_date=Subquery(
-            PurchaseOrder.objects.filter(
-                supplier=OuterRef('pk')
-            ).order_by('-order_date').values('order_date')[:1]
-        )
-    ).annotate(
-        due_date=ExpressionWrapper(
-            F('latest_order_date') + timedelta(days=1) * F('payment_terms'),
-            output_field=DateField()
-        )
-    ).filter(
-        due_date__lte=due_date_threshold,
-        latest_order_date__isnull=False
+    due_suppliers_count = Supplier.objects.filter(
+        next_payment_due_date__lte=due_date_threshold
     ).count()
     
     print(f"Suppliers with payments due within 7 days: {due_suppliers_count}")
@@ -90,10 +90,66 @@ DATABASES = {
         "PASSWORD": os.environ.get("DB_PASSWORD", "brayan1106"),
         "HOST": os.environ.get("DB_HOST", "localhost"),
         "PORT": os.environ.get("DB_PORT", "5432"),
+        # Seconds to keep connections open; the async reports view runs its
+        # queries on worker-thread connections that benefit from reuse.
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", "0")),
     }
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Report responses use their own cache, which holds the inventory version
+# every worker process must agree on. Outside DEBUG it defaults to a file
+# cache all workers on the host share; point it at Redis or Memcached when
+# they run on several hosts. The per-process LocMemCache is only the DEBUG
+# default: with it, ETags and 304 answers are not sent, since a write in one
+# worker does not change the inventory version the others see.
+
+if DEBUG:
+    REPORTS_CACHE_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+    REPORTS_CACHE_LOCATION = "inventory-reports"
+else:
+    REPORTS_CACHE_BACKEND = "django.core.cache.backends.filebased.FileBasedCache"
+    REPORTS_CACHE_LOCATION = str(BASE_DIR / "report_cache")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "reports": {
+        "BACKEND": os.environ.get("REPORTS_CACHE_BACKEND", REPORTS_CACHE_BACKEND),
+        "LOCATION": os.environ.get("REPORTS_CACHE_LOCATION", REPORTS_CACHE_LOCATION),
+        "TIMEOUT": int(os.environ.get("REPORTS_CACHE_TIMEOUT", "300")),
+    },
+}
+
+# Most movements accepted by one bulk request; larger batches are rejected
+# so one transaction never locks an unbounded number of products
+INVENTORY_BULK_MAX_MOVEMENTS = int(os.environ.get("INVENTORY_BULK_MAX_MOVEMENTS", "1000"))
+
+# Seconds a worker trusts its last look at the products table before checking
+# again whether another process changed the catalog under its autocomplete index
+AUTOCOMPLETE_CHECK_SECONDS = float(os.environ.get("AUTOCOMPLETE_CHECK_SECONDS", "5"))
+
+# Seconds after which the precomputed dashboard is refreshed in the background
+DASHBOARD_STALE_AFTER = int(os.environ.get("DASHBOARD_STALE_AFTER", "60"))
+
+# Coalesce identical expensive requests across worker processes too, through
+# PostgreSQL advisory locks. Needs a reports cache shared by all workers.
+COALESCE_ACROSS_WORKERS = os.environ.get("COALESCE_ACROSS_WORKERS", "False").lower() in ("true", "1", "yes")
+
+# Seconds between persisting a worker's top-seller sketches
+SALES_SKETCH_FLUSH_SECONDS = int(os.environ.get("SALES_SKETCH_FLUSH_SECONDS", "10"))
+
+# Where the Parquet exports for analysts are written (needs pyarrow)
+ANALYTICS_EXPORT_DIR = os.environ.get("ANALYTICS_EXPORT_DIR", str(BASE_DIR / "analytics_exports"))
+
+# How stock is valued: "fifo" cost layers or "average" cost. Run the
+# rebuild_cost_layers command after changing it.
+INVENTORY_COSTING_METHOD = os.environ.get("INVENTORY_COSTING_METHOD", "fifo").lower()
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -1,11 +1,18 @@
 from django.contrib import admin
-from .models import Product, InventoryMovement
+from .models import Product, InventoryMovement, StockReconciliationRun, StockDrift, AnalyticsExport, InventoryValuation
 
 
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ('name', 'price', 'quantity', 'is_active')
+    list_display = ('name', 'price', 'quantity', 'stripe_count', 'is_active')
     list_filter = ('is_active',)
     search_fields = ('name', 'description')
+    readonly_fields = ('stripe_count',)
+
+    def get_readonly_fields(self, request, obj=None):
+        # A striped product's stock is in its stripes; quantity is only a cached total
+        if obj is not None and obj.stripe_count:
+            return self.readonly_fields + ('quantity',)
+        return self.readonly_fields
 
 
 class InventoryMovementAdmin(admin.ModelAdmin):
@@ -14,5 +21,31 @@ class InventoryMovementAdmin(admin.ModelAdmin):
     search_fields = ('product__name',)
 
 
+class StockDriftInline(admin.TabularInline):
+    model = StockDrift
+    extra = 0
+    readonly_fields = ('product', 'recorded_quantity', 'expected_quantity', 'repaired')
+
+
+class StockReconciliationRunAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_at', 'full', 'repair', 'products_checked', 'drift_count', 'repaired_count')
+    list_filter = ('full', 'repair')
+    inlines = [StockDriftInline]
+
+
+class AnalyticsExportAdmin(admin.ModelAdmin):
+    list_display = ('started_at', 'finished_at', 'status', 'full', 'since_movement_id', 'high_water_mark')
+    list_filter = ('status', 'full')
+
+
+class InventoryValuationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'quantity', 'value')
+    search_fields = ('product__name',)
+    readonly_fields = ('product', 'quantity', 'value')
+
+
 admin.site.register(Product, ProductAdmin)
-admin.site.register(InventoryMovement, InventoryMovementAdmin)
\ No newline at end of file
+admin.site.register(InventoryMovement, InventoryMovementAdmin)
+admin.site.register(StockReconciliationRun, StockReconciliationRunAdmin)
+admin.site.register(AnalyticsExport, AnalyticsExportAdmin)
+admin.site.register(InventoryValuation, InventoryValuationAdmin)
@@ -0,0 +1,178 @@
+"""
+Inventory analytics for every product at once, computed with NumPy.
+
+The OUT movements of a window are streamed into three arrays (product,
+quantity, value) and summed per product with ``bincount``; every metric is then one
+vectorized expression over all products instead of a query or a Python
+loop per product:
+
+- ABC class by sales value, at the unit price each sale was made at (the
+  current product price when it was not recorded): A for the products making up the first 80% of
+  the value, B up to 95%, C for the rest and for products without sales.
+- Turnover: units sold in the window over the stock on hand at its end,
+  replayed from the daily stock snapshots when the window is in the past.
+- Days of supply: stock on hand over the average units sold per day.
+- Sell-through: units sold over units sold plus stock on hand.
+
+NumPy is an optional dependency, only needed by this module.
+"""
+from datetime import timedelta
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import F, FloatField
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from .models import ArchivedInventoryMovement, InventoryMovement, Product
+from .services import get_stocks_before
+
+ABC_A_SHARE = 0.80
+ABC_B_SHARE = 0.95
+LOAD_CHUNK_SIZE = 50000
+
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError as exc:
+        raise ImproperlyConfigured("Inventory analytics need numpy; install it with 'pip install numpy'.") from exc
+    return numpy
+
+
+class AnalyticsRows:
+    """
+    Lazy sequence of result rows; dicts are only built for the rows read,
+    so paginating 200k products costs one page of Python objects.
+    """
+
+    def __init__(self, analytics, indexes):
+        self.analytics = analytics
+        self.indexes = indexes
+
+    def __len__(self):
+        return len(self.indexes)
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.analytics.row(index) for index in self.indexes[item]]
+        return self.analytics.row(self.indexes[item])
+
+
+class InventoryAnalytics:
+    """Per-product metrics of one window, as arrays ordered by sales value."""
+
+    def __init__(self, start, end, product_ids, names, units_sold, sales_value, abc, turnover, days_of_supply,
+                 sell_through):
+        self.start = start
+        self.end = end
+        self.product_ids = product_ids
+        self.names = names
+        self.units_sold = units_sold
+        self.sales_value = sales_value
+        self.abc = abc
+        self.turnover = turnover
+        self.days_of_supply = days_of_supply
+        self.sell_through = sell_through
+
+    def __len__(self):
+        return len(self.product_ids)
+
+    def abc_counts(self) -> dict:
+        return {label: int((self.abc == label).sum()) for label in ("A", "B", "C")}
+
+    def rows(self, abc=None) -> AnalyticsRows:
+        """All rows, or those of one ABC class, highest sales value first."""
+        np = _import_numpy()
+        indexes = np.arange(len(self)) if abc is None else np.flatnonzero(self.abc == abc)
+        return AnalyticsRows(self, indexes)
+
+    def row(self, index) -> dict:
+        def optional(value, digits):
+            return None if value != value else round(float(value), digits)  # NaN when undefined
+
+        return {
+            "product_id": int(self.product_ids[index]),
+            "name": self.names[index],
+            "units_sold": int(self.units_sold[index]),
+            "sales_value": round(float(self.sales_value[index]), 2),
+            "abc_class": str(self.abc[index]),
+            "turnover": optional(self.turnover[index], 4),
+            "days_of_supply": optional(self.days_of_supply[index], 1),
+            "sell_through": optional(self.sell_through[index], 4),
+        }
+
+
+def _load_sales(np, start, end):
+    """OUT movements of [start, end), live and archived, as a structured array."""
+    window = {
+        "movement_type": InventoryMovement.MOVEMENT_OUTPUT,
+        "date__gte": start,
+        "date__lt": end,
+    }
+    value = Cast(F("quantity") * Coalesce("unit_price", "product__price"), FloatField())
+    live = InventoryMovement.objects.filter(**window).order_by().values_list("product_id", "quantity", value)
+    archived = ArchivedInventoryMovement.objects.filter(**window).order_by().values_list("product_id", "quantity", value)
+    rows = live.union(archived, all=True).iterator(chunk_size=LOAD_CHUNK_SIZE)
+    return np.fromiter(rows, dtype=[("product", np.int64), ("quantity", np.int64), ("value", np.float64)])
+
+
+def _abc_classes(np, sales_value):
+    """ABC class of each product; ``sales_value`` must be sorted descending."""
+    total = sales_value.sum()
+    if not total:
+        return np.full(len(sales_value), "C")
+    # Share of the value held by the products ranked above, so the product
+    # crossing a threshold still belongs to the class it completes
+    above = (np.cumsum(sales_value) - sales_value) / total
+    abc = np.where(above < ABC_A_SHARE, "A", np.where(above < ABC_B_SHARE, "B", "C"))
+    abc[sales_value == 0] = "C"
+    return abc
+
+
+def compute_inventory_analytics(start, end) -> InventoryAnalytics:
+    """
+    ABC class, turnover, days of supply and sell-through of every product
+    for the sales in [start, end).
+
+    Args:
+        start (datetime): Start of the window, inclusive
+        end (datetime): End of the window, exclusive
+
+    Returns:
+        InventoryAnalytics: Metrics ordered by sales value, highest first
+    """
+    np = _import_numpy()
+    products = list(Product.objects.with_stock().order_by("pk").values_list("pk", "name", "stock"))
+    product_ids = np.fromiter((row[0] for row in products), dtype=np.int64, count=len(products))
+    if end < timezone.now():
+        # A past window is measured against the stock replayed from the snapshots
+        stocks = get_stocks_before(end)
+        stock = np.fromiter((stocks.get(row[0], 0) for row in products), dtype=np.float64, count=len(products))
+    else:
+        stock = np.fromiter((row[2] for row in products), dtype=np.float64, count=len(products))
+
+    sales = _load_sales(np, start, end)
+    positions = np.searchsorted(product_ids, sales["product"])
+    units_sold = np.bincount(positions, weights=sales["quantity"], minlength=len(products))
+    sales_value = np.bincount(positions, weights=sales["value"], minlength=len(products))
+
+    days = max((end - start) / timedelta(days=1), 1)
+    daily_sales = units_sold / days
+    with np.errstate(divide="ignore", invalid="ignore"):
+        turnover = np.where(stock > 0, units_sold / stock, np.nan)
+        days_of_supply = np.where(daily_sales > 0, stock / daily_sales, np.nan)
+        sell_through = np.where(units_sold + stock > 0, units_sold / (units_sold + stock), np.nan)
+
+    order = np.argsort(-sales_value, kind="stable")
+    return InventoryAnalytics(
+        start=start,
+        end=end,
+        product_ids=product_ids[order],
+        names=[products[index][1] for index in order],
+        units_sold=units_sold[order],
+        sales_value=sales_value[order],
+        abc=_abc_classes(np, sales_value[order]),
+        turnover=turnover[order],
+        days_of_supply=days_of_supply[order],
+        sell_through=sell_through[order],
+    )
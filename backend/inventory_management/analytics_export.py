@@ -0,0 +1,367 @@
+"""
+Parquet export of inventory data for analysts.
+
+Each run writes its tables below ANALYTICS_EXPORT_DIR/<run id>/ in a
+Hive-style layout that pandas, DuckDB and pyarrow read directly; movements
+are partitioned by month (``inventory_movements/month=2025-05/``). Rows are
+read with server-side cursors and written in batches, so memory use does
+not grow with the table sizes.
+
+The first run, and any run with ``full``, exports everything. Later runs
+only export movements after the previous run's high-water mark and the
+suppliers, purchase orders and purchase order items updated since the
+previous run started; readers keep the latest row per id. Products are
+exported in full every time, since stock changes do not touch their
+updated_at.
+
+Incremental runs carry no deletes. Order items are only removed by
+replacing an order's items, which updates the order, so every item of a
+changed order is exported again: readers take an order's items from the
+latest run that exported the order. Deleted suppliers and purchase orders
+only drop out of a full export.
+
+pyarrow is an optional dependency, only needed to write the files.
+"""
+import logging
+import os
+import shutil
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, connections, transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from purchasing.models import PurchaseOrder, PurchaseOrderItem
+from suppliers.models import Supplier
+
+from .models import AnalyticsExport, ArchivedInventoryMovement, InventoryMovement, Product
+from .services import RECONCILIATION_GRACE
+
+logger = logging.getLogger(__name__)
+
+EXPORT_BATCH_SIZE = 10000
+# A running export records that it is alive this often, however long it takes
+EXPORT_HEARTBEAT = timedelta(seconds=30)
+# A run that has not recorded a heartbeat for this long is assumed to have died
+EXPORT_TIMEOUT = EXPORT_HEARTBEAT * 4
+
+# (column name, queryset field, type)
+PRODUCT_COLUMNS = [
+    ("id", "id", "int"),
+    ("name", "name", "str"),
+    ("description", "description", "str"),
+    ("price", "price", "decimal"),
+    ("quantity", "stock", "int"),
+    ("is_active", "is_active", "bool"),
+]
+MOVEMENT_COLUMNS = [
+    ("id", "id", "int"),
+    ("date", "date", "datetime"),
+    ("product_id", "product_id", "int"),
+    ("movement_type", "movement_type", "str"),
+    ("quantity", "quantity", "int"),
+    ("unit_price", "unit_price", "decimal"),
+    ("user_id", "user_id", "int"),
+]
+SUPPLIER_COLUMNS = [
+    ("id", "id", "int"),
+    ("name", "name", "str"),
+    ("tax_id", "tax_id", "str"),
+    ("phone_number", "phone_number", "str"),
+    ("email", "email", "str"),
+    ("contact_person", "contact_person", "str"),
+    ("payment_terms", "payment_terms", "int"),
+    ("created_at", "created_at", "datetime"),
+    ("updated_at", "updated_at", "datetime"),
+]
+PURCHASE_ORDER_COLUMNS = [
+    ("id", "id", "int"),
+    ("supplier_id", "supplier_id", "int"),
+    ("order_date", "order_date", "datetime"),
+    ("status", "status", "str"),
+    ("created_by_id", "created_by_id", "int"),
+    ("created_at", "created_at", "datetime"),
+    ("updated_at", "updated_at", "datetime"),
+    ("received_date", "received_date", "date"),
+    ("payment_due_date", "payment_due_date", "date"),
+    ("is_paid", "is_paid", "bool"),
+    ("payment_terms", "payment_terms", "int"),
+]
+PURCHASE_ORDER_ITEM_COLUMNS = [
+    ("id", "id", "int"),
+    ("purchase_order_id", "purchase_order_id", "int"),
+    ("product_id", "product_id", "int"),
+    ("quantity", "quantity", "int"),
+    ("cost_per_unit", "cost_per_unit", "decimal"),
+    ("updated_at", "updated_at", "datetime"),
+]
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImproperlyConfigured("Parquet exports need pyarrow; install it with 'pip install pyarrow'.") from exc
+    return pyarrow, pyarrow.parquet
+
+
+def export_root() -> str:
+    """Directory the export runs are written to."""
+    return str(settings.ANALYTICS_EXPORT_DIR)
+
+
+class _ParquetTableWriter:
+    """
+    Writes one table in batches, one file per partition. Rows must arrive
+    grouped by partition.
+    """
+
+    def __init__(self, pa, pq, export, table, columns):
+        types = {
+            "int": pa.int64(),
+            "str": pa.string(),
+            "bool": pa.bool_(),
+            "decimal": pa.decimal128(10, 2),
+            "date": pa.date32(),
+            "datetime": pa.timestamp("us", tz="UTC"),
+        }
+        self.pa, self.pq = pa, pq
+        self.schema = pa.schema([(name, types[kind]) for name, _, kind in columns])
+        self.directory = os.path.join(str(export.pk), table)
+        self.table = table
+        self.files = []
+        self.partition = None
+        self.writer = None
+        self.path = None
+        self.rows = 0
+        self.batch = []
+
+    def write(self, row, partition=""):
+        if partition != self.partition:
+            self._close_partition()
+            self.partition = partition
+        self.batch.append(row)
+        if len(self.batch) >= EXPORT_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        if not self.batch:
+            return
+        if self.writer is None:
+            self.path = os.path.join(self.directory, self.partition, "part-0.parquet")
+            absolute = os.path.join(export_root(), self.path)
+            os.makedirs(os.path.dirname(absolute), exist_ok=True)
+            self.writer = self.pq.ParquetWriter(absolute, self.schema)
+        arrays = [
+            self.pa.array(values, type=field.type)
+            for values, field in zip(zip(*self.batch), self.schema)
+        ]
+        self.writer.write_table(self.pa.Table.from_arrays(arrays, schema=self.schema))
+        self.rows += len(self.batch)
+        self.batch = []
+
+    def _close_partition(self):
+        self._flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.files.append({"table": self.table, "path": self.path, "rows": self.rows})
+        self.writer = None
+        self.rows = 0
+
+    def close(self) -> list:
+        """Finish the last file and return the written files."""
+        self._close_partition()
+        return self.files
+
+
+def _movement_rows(export):
+    fields = [field for _, field, _ in MOVEMENT_COLUMNS]
+    live = InventoryMovement.objects.filter(id__gt=export.since_movement_id, id__lte=export.high_water_mark)
+    queryset = live.values_list(*fields)
+    if export.full:
+        archived = ArchivedInventoryMovement.objects.values_list(*fields)
+        queryset = queryset.order_by().union(archived.order_by(), all=True)
+    # Ordered by date so each month partition is written in one go
+    return queryset.order_by("date").iterator(chunk_size=EXPORT_BATCH_SIZE)
+
+
+def _changed(queryset, export):
+    if export.full:
+        return queryset
+    return queryset.filter(updated_at__gt=export.since)
+
+
+def _changed_items(export):
+    """Items updated since the previous run, and every item of the orders updated since."""
+    items = PurchaseOrderItem.objects.all()
+    if export.full:
+        return items
+    return items.filter(Q(updated_at__gt=export.since) | Q(purchase_order__updated_at__gt=export.since))
+
+
+def _export_tables(export):
+    """(table, columns, rows, partition function) of every exported table."""
+    def rows(queryset, columns):
+        return queryset.order_by("pk").values_list(*(field for _, field, _ in columns)).iterator(
+            chunk_size=EXPORT_BATCH_SIZE
+        )
+
+    def month(row):
+        return f"month={timezone.localtime(row[1]):%Y-%m}"
+
+    return [
+        ("products", PRODUCT_COLUMNS, rows(Product.objects.with_stock(), PRODUCT_COLUMNS), None),
+        ("suppliers", SUPPLIER_COLUMNS, rows(_changed(Supplier.objects.all(), export), SUPPLIER_COLUMNS), None),
+        (
+            "purchase_orders",
+            PURCHASE_ORDER_COLUMNS,
+            rows(_changed(PurchaseOrder.objects.all(), export), PURCHASE_ORDER_COLUMNS),
+            None,
+        ),
+        (
+            "purchase_order_items",
+            PURCHASE_ORDER_ITEM_COLUMNS,
+            rows(_changed_items(export), PURCHASE_ORDER_ITEM_COLUMNS),
+            None,
+        ),
+        ("inventory_movements", MOVEMENT_COLUMNS, _movement_rows(export), month),
+    ]
+
+
+def create_analytics_export(full: bool = False) -> AnalyticsExport:
+    """
+    Record a new export run and what it covers, without writing anything yet.
+
+    Args:
+        full (bool): Export every row; implied when no run has succeeded yet
+
+    Returns:
+        AnalyticsExport: The run, in the running state
+
+    Raises:
+        ValueError: If another export is still running
+    """
+    AnalyticsExport.objects.filter(
+        status=AnalyticsExport.STATUS_RUNNING,
+        heartbeat_at__lt=timezone.now() - EXPORT_TIMEOUT,
+    ).update(status=AnalyticsExport.STATUS_FAILED, finished_at=timezone.now(), error="Timed out")
+
+    previous = AnalyticsExport.objects.filter(status=AnalyticsExport.STATUS_SUCCEEDED).first()
+    full = full or previous is None
+    try:
+        with transaction.atomic():
+            export = AnalyticsExport.objects.create(
+                full=full,
+                since=None if full else previous.started_at,
+                since_movement_id=0 if full else previous.high_water_mark,
+            )
+    except IntegrityError:
+        raise ValueError("An analytics export is already running.")
+
+    # Movements newer than the grace period may still be uncommitted, the
+    # same reasoning as for the reconciliation high-water mark
+    mark = (
+        InventoryMovement.objects.filter(date__lte=export.started_at - RECONCILIATION_GRACE)
+        .aggregate(mark=Max("id"))["mark"]
+    )
+    export.high_water_mark = max(mark or 0, export.since_movement_id)
+    export.save(update_fields=["high_water_mark"])
+    return export
+
+
+class _Heartbeat:
+    """
+    Records every EXPORT_HEARTBEAT, from its own thread, that a run is still
+    being written, so its claim only expires when the process writing it dies.
+    """
+
+    def __init__(self, export):
+        self.export = export
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._beat, daemon=True)
+
+    def _beat(self):
+        try:
+            while not self.stopped.wait(EXPORT_HEARTBEAT.total_seconds()):
+                AnalyticsExport.objects.filter(
+                    pk=self.export.pk, status=AnalyticsExport.STATUS_RUNNING
+                ).update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception("Analytics export #%s stopped recording its heartbeat", self.export.pk)
+        finally:
+            connections.close_all()
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+
+def write_analytics_export(export: AnalyticsExport) -> AnalyticsExport:
+    """
+    Write the Parquet files of a run created by create_analytics_export.
+    A failed run is marked as failed, its files are removed and the error is
+    raised.
+
+    Args:
+        export (AnalyticsExport): The run to write
+
+    Returns:
+        AnalyticsExport: The finished run
+    """
+    try:
+        pa, pq = _import_pyarrow()
+        files = []
+        with _Heartbeat(export):
+            for table, columns, rows, partition in _export_tables(export):
+                writer = _ParquetTableWriter(pa, pq, export, table, columns)
+                for row in rows:
+                    writer.write(row, partition(row) if partition else "")
+                files.extend(writer.close())
+    except Exception as exc:
+        shutil.rmtree(os.path.join(export_root(), str(export.pk)), ignore_errors=True)
+        export.status = AnalyticsExport.STATUS_FAILED
+        export.error = str(exc)
+        raise
+    else:
+        export.files = files
+        export.status = AnalyticsExport.STATUS_SUCCEEDED
+    finally:
+        export.finished_at = timezone.now()
+        export.save(update_fields=["files", "status", "error", "finished_at"])
+    return export
+
+
+def run_analytics_export(full: bool = False) -> AnalyticsExport:
+    """Create and write an export run."""
+    return write_analytics_export(create_analytics_export(full=full))
+
+
+def _write_in_background(export) -> None:
+    try:
+        write_analytics_export(export)
+    except Exception:
+        logger.exception("Analytics export #%s failed", export.pk)
+    finally:
+        connections.close_all()
+
+
+def start_analytics_export(full: bool = False) -> AnalyticsExport:
+    """
+    Create an export run and write its files in a background thread.
+
+    Raises:
+        ImproperlyConfigured: If pyarrow is not installed
+        ValueError: If another export is still running
+    """
+    _import_pyarrow()
+    export = create_analytics_export(full=full)
+    threading.Thread(target=_write_in_background, args=(export,), daemon=True).start()
+    return export
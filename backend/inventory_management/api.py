@@ -1,30 +1,75 @@
-from .models import Product, InventoryMovement
+import asyncio
+import heapq
+import os
+from operator import itemgetter
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import close_old_connections
+from django.http import FileResponse
+from django.views import View
+from .models import (
+    Product,
+    InventoryMovement,
+    ArchivedInventoryMovement,
+    StockReconciliationRun,
+    AnalyticsExport,
+    DemandForecast,
+    InventoryValuation,
+    DailySalesRollup,
+    MonthlySalesRollup,
+    LOW_STOCK_THRESHOLD,
+    low_stock_condition,
+)
 from rest_framework import viewsets, permissions, status, filters
-from .serializers import ProductSerializer, InventoryMovementSerializer
+from .serializers import (
+    ProductSerializer,
+    InventoryMovementSerializer,
+    InventoryMovementBulkItemSerializer,
+    StockReconciliationRunSerializer,
+    AnalyticsExportSerializer,
+    DemandForecastSerializer,
+    InventoryValuationSerializer,
+)
+from .services import create_inventory_movements_bulk, get_stock_at, reconcile_stock
+from .report_cache import cache_report, get_cached_report, peek_cached_report, report_cache_key, report_cache_stats
+from .coalescing import coalesce, coalescing_stats
+from .exports import MOVEMENT_EXPORT_COLUMNS, PRODUCT_EXPORT_COLUMNS, stream_export
+from .analytics_export import export_root, start_analytics_export
+from .analytics import compute_inventory_analytics
+from .heavy_hitters import approximate_top_sellers
+from .valuation import inventory_value
+from .dashboard import get_dashboard
+from .conditional import ConditionalGetMixin, conditional_get, datetime_version
+from .search import FullTextSearchFilter
+from .autocomplete import suggest_product_names
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework.response import Response
 from accounts.permissions import IsAdminOrReadOnly, CanCreateSalesOrAdminOnly
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action
 from .filters import MovementFilter, ProductFilter
 from rest_framework.views import APIView
-from django.db.models.functions import TruncMonth, Cast
-from django.db.models import Sum, Count, F, DateField, ExpressionWrapper, Subquery, OuterRef
+from rest_framework.pagination import PageNumberPagination
+from django.db.models.functions import TruncMonth
+from django.db.models import Sum, Count, Max
 from datetime import datetime, timedelta
 from django.utils import timezone
 from suppliers.models import Supplier
 from purchasing.models import PurchaseOrder
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for handling products.
     Provides CRUD operations for products with filtering and searching capabilities.
     """
 
-    queryset = Product.objects.all().order_by("name")
+    queryset = Product.objects.all().prefetch_related("stock_stripes").order_by("name")
     serializer_class = ProductSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
 
     filter_backends = [
-        filters.SearchFilter,
+        FullTextSearchFilter,
         filters.OrderingFilter,
         DjangoFilterBackend,
     ]
@@ -36,13 +81,61 @@ class ProductViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def suggestions(self, request):
-        """Custom endpoint for product search suggestions"""
+        """
+        Product names for search suggestions. A plain ``search`` is answered
+        by the in-memory autocomplete index; other filters go through the
+        filter backends.
+        """
+        if set(request.query_params) <= {"search"}:
+            return Response(suggest_product_names(request.query_params.get("search", "")))
         queryset = self.filter_queryset(self.get_queryset())
-        suggestions = queryset.values_list("name", flat=True)[:10]
+        suggestions = coalesce(
+            "suggestions",
+            request.get_full_path(),
+            lambda: list(queryset.values_list("name", flat=True)[:10]),
+        )
         return Response(suggestions)
 
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<export_format>csv|ndjson)")
+    def export(self, request, export_format=None):
+        """Stream every product matching the filters as CSV or NDJSON."""
+        queryset = self.filter_queryset(self.get_queryset()).with_stock()
+        return stream_export(queryset, PRODUCT_EXPORT_COLUMNS, export_format, "products")
+
+    @action(detail=True, methods=["get"], url_path="stock-at")
+    def stock_at(self, request, pk=None):
+        """Stock of the product at the ``at`` timestamp (a bare date means end of that day)."""
+        product = self.get_object()
+        at = request.query_params.get("at", "")
+        invalid = Response(
+            {"error": "The 'at' parameter must be an ISO 8601 date or timestamp."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+        try:
+            # Dates first: parse_datetime also takes a bare date, as midnight
+            day = parse_date(at)
+            if day is not None:
+                moment = datetime.combine(day + timedelta(days=1), datetime.min.time()) - timedelta(microseconds=1)
+            else:
+                moment = parse_datetime(at)
+                if moment is None:
+                    return invalid
+            if timezone.is_naive(moment):
+                moment = timezone.make_aware(moment)
+        except (ValueError, OverflowError):
+            # Well formed but impossible, like 2025-02-30, or past date.max
+            return invalid
+
+        quantity, snapshot_date = get_stock_at(product, moment)
+        return Response({
+            "product": product.id,
+            "at": moment,
+            "quantity": quantity,
+            "snapshot_date": snapshot_date,
+        })
+
 
-class InventoryMovementViewSet(viewsets.ModelViewSet):
+class InventoryMovementViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """ViewSet for handling inventory movements.
     Provides read-only access to inventory movements with filtering capabilities.
     """
@@ -53,33 +146,387 @@ class InventoryMovementViewSet(viewsets.ModelViewSet):
 
     filterset_class = MovementFilter
 
+    def filter_queryset(self, queryset):
+        """With ``include_archived=true`` the list and export also read the archive table."""
+        queryset = super().filter_queryset(queryset)
+        include_archived = self.request.query_params.get("include_archived", "").lower()
+        if self.action in ("list", "export") and include_archived in ("true", "1", "yes"):
+            archived = MovementFilter(
+                self.request.query_params,
+                queryset=ArchivedInventoryMovement.objects.all(),
+                request=self.request,
+            ).qs
+            queryset = queryset.order_by().union(archived.order_by(), all=True).order_by("-date")
+        return queryset
+
     def perform_create(self, serializer):
         serializer.save()
 
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<export_format>csv|ndjson)")
+    def export(self, request, export_format=None):
+        """Stream every movement matching the MovementFilter parameters as CSV or NDJSON."""
+        queryset = self.filter_queryset(self.get_queryset())
+        return stream_export(queryset, MOVEMENT_EXPORT_COLUMNS, export_format, "inventory-movements")
+
+    @action(detail=False, methods=["post"])
+    def bulk(self, request):
+        """Create a batch of movements in one transaction.
+
+        Expects a JSON list of movements and reports success or failure per row.
+        """
+        if not isinstance(request.data, list) or not request.data:
+            return Response(
+                {"error": "Expected a non-empty list of movements."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(request.data) > settings.INVENTORY_BULK_MAX_MOVEMENTS:
+            return Response(
+                {"error": f"A bulk request takes at most {settings.INVENTORY_BULK_MAX_MOVEMENTS} movements."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        results = [None] * len(request.data)
+        valid_rows = []
+        valid_indexes = []
+        for index, row in enumerate(request.data):
+            serializer = InventoryMovementBulkItemSerializer(data=row)
+            if serializer.is_valid():
+                valid_rows.append(serializer.validated_data)
+                valid_indexes.append(index)
+            else:
+                results[index] = {"index": index, "success": False, "errors": serializer.errors}
+
+        if valid_rows:
+            outcomes = create_inventory_movements_bulk(valid_rows, user=request.user)
+            for index, (movement, error) in zip(valid_indexes, outcomes):
+                if movement is not None:
+                    results[index] = {"index": index, "success": True, "id": movement.id}
+                else:
+                    results[index] = {"index": index, "success": False, "errors": {"non_field_errors": [error]}}
+
+        created = sum(1 for result in results if result["success"])
+        if created == len(results):
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+
+        return Response(
+            {"created": created, "failed": len(results) - created, "results": results},
+            status=response_status,
+        )
+
+class StockReconciliationView(APIView):
+    """Latest stock reconciliation run (GET) or start a new one (POST)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        run = (
+            StockReconciliationRun.objects.filter(finished_at__isnull=False)
+            .prefetch_related("drifts__product")
+            .first()
+        )
+        if run is None:
+            return Response({"error": "Stock has not been reconciled yet."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(StockReconciliationRunSerializer(run).data)
+
+    def post(self, request, *args, **kwargs):
+        """
+        Runs in the request process; use the reconcile_stock command with
+        --workers for full checks of large catalogs.
+        """
+        run = reconcile_stock(
+            full=str(request.data.get("full", "")).lower() in ("true", "1", "yes"),
+            repair=str(request.data.get("repair", "")).lower() in ("true", "1", "yes"),
+        )
+        run = StockReconciliationRun.objects.prefetch_related("drifts__product").get(pk=run.pk)
+        return Response(StockReconciliationRunSerializer(run).data, status=status.HTTP_201_CREATED)
+
+
+class AnalyticsExportView(APIView):
+    """Recent Parquet export runs (GET) or start a new one in the background (POST)."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        exports = AnalyticsExport.objects.all()[:20]
+        return Response(AnalyticsExportSerializer(exports, many=True).data)
+
+    def post(self, request, *args, **kwargs):
+        try:
+            export = start_analytics_export(
+                full=str(request.data.get("full", "")).lower() in ("true", "1", "yes"),
+            )
+        except ImproperlyConfigured as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        except ValueError as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_409_CONFLICT)
+        return Response(AnalyticsExportSerializer(export).data, status=status.HTTP_202_ACCEPTED)
+
+
+class AnalyticsExportFileView(APIView):
+    """Download one Parquet file of a finished export run."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, pk, path, *args, **kwargs):
+        export = AnalyticsExport.objects.filter(pk=pk, status=AnalyticsExport.STATUS_SUCCEEDED).first()
+        # Only paths recorded by the run are served, never arbitrary files
+        if export is None or path not in {file["path"] for file in export.files}:
+            return Response({"error": "Export file not found."}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            open(os.path.join(export_root(), path), "rb"),
+            as_attachment=True,
+            filename=path.replace("/", "_"),
+            content_type="application/vnd.apache.parquet",
+        )
+
+
+class ReportCacheStatsView(APIView):
+    """Hit and miss counters of the report cache and request coalescing ratios."""
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response({**report_cache_stats(), "coalescing": coalescing_stats()})
+
+
+def report_params(request):
+    """The query parameters a report depends on, missing ones as empty strings."""
+    return {name: request.query_params.get(name, '') for name in ('start_date', 'end_date', 'product_id', 'approx')}
+
+
+class InventoryAnalyticsView(APIView):
+    """
+    ABC class, turnover, days of supply and sell-through of every product,
+    highest sales value first. ``start_date`` and ``end_date`` are inclusive
+    local dates (default: the last 90 days); ``abc`` keeps one class.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = PageNumberPagination
+    window_days = 90
+
+    def get(self, request, *args, **kwargs):
+        today = timezone.localdate()
+        try:
+            end_date = parse_date(request.query_params.get("end_date", "")) or today
+            start_date = parse_date(request.query_params.get("start_date", "")) or (
+                end_date - timedelta(days=self.window_days - 1)
+            )
+        except ValueError:
+            end_date = start_date = None
+        abc = request.query_params.get("abc") or None
+        if end_date is None or start_date > end_date or abc not in (None, "A", "B", "C"):
+            return Response(
+                {"error": "Expected ISO dates with start_date <= end_date and abc one of A, B or C."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        start = timezone.make_aware(datetime.combine(start_date, datetime.min.time()))
+        end = timezone.make_aware(datetime.combine(end_date + timedelta(days=1), datetime.min.time()))
+        key = report_cache_key({"analytics": "1", "start_date": start_date, "end_date": end_date})
+        try:
+            analytics = get_cached_report(key)
+            if analytics is None:
+                def compute_and_cache():
+                    result = compute_inventory_analytics(start, end)
+                    cache_report(key, result)
+                    return result
+
+                analytics = coalesce("analytics", key, compute_and_cache, recheck=lambda: peek_cached_report(key))
+        except ImproperlyConfigured as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(analytics.rows(abc), request, view=self)
+        return Response({
+            "start_date": start_date,
+            "end_date": end_date,
+            "products": len(analytics),
+            "abc_counts": analytics.abc_counts(),
+            **paginator.get_paginated_response(page).data,
+        })
+
+
+class DemandForecastView(APIView):
+    """
+    Stored demand forecasts, highest 28-day demand first; ``product_id``
+    keeps one product. Forecasts are refreshed by the refresh_forecasts command.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = PageNumberPagination
+
+    def get(self, request, *args, **kwargs):
+        forecasts = DemandForecast.objects.select_related("product").order_by("-next_28_days", "product_id")
+        product_id = request.query_params.get("product_id")
+        if product_id:
+            forecasts = forecasts.filter(product_id=product_id)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(forecasts, request, view=self)
+        return paginator.get_paginated_response(DemandForecastSerializer(page, many=True).data)
+
+
+class InventoryValuationView(APIView):
+    """
+    Value of the stock under the costing method: the totals and, paginated,
+    every product holding stock, highest value first. ``product_id`` keeps
+    one product.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = PageNumberPagination
+
+    def get(self, request, *args, **kwargs):
+        try:
+            totals = inventory_value()
+        except ImproperlyConfigured as exc:
+            return Response({"error": str(exc)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        valuations = (
+            InventoryValuation.objects.select_related("product")
+            .filter(quantity__gt=0)
+            .order_by("-value", "product_id")
+        )
+        product_id = request.query_params.get("product_id")
+        if product_id:
+            valuations = valuations.filter(product_id=product_id)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(valuations, request, view=self)
+        return Response({
+            **totals,
+            **paginator.get_paginated_response(InventoryValuationSerializer(page, many=True).data).data,
+        })
+
+
 class InventoryReportsView(APIView):
 
     permission_classes = [permissions.IsAdminUser]
 
     def get(self, request, *args, **kwargs):
-        """Endpoint to generate inventory reports."""
-        start_date_str = request.query_params.get('start_date')
-        end_date_str = request.query_params.get('end_date')
-        product_id = request.query_params.get('product_id')
+        """
+        Endpoint to generate inventory reports. The unfiltered dashboard is
+        served precomputed, filtered reports from the report cache when possible.
+        Both answer conditional requests: the dashboard is validated by when
+        its payload was generated, filtered reports by the inventory version.
+        """
+        params = report_params(request)
+        if not any(params.values()):
+            report = get_dashboard(lambda: self._build_report(params))
+            return conditional_get(request, lambda: Response(report), version=datetime_version(report["generated_at"]))
+        return conditional_get(request, lambda: Response(self._cached_report(params, lambda: self._build_report(params))))
+
+    @staticmethod
+    def _cached_report(params, build):
+        """
+        The cached report for ``params``. On a miss ``build`` runs once for
+        all requests asking for the same report at the same time.
+        """
+        key = report_cache_key(params)
+        report_data = get_cached_report(key)
+        if report_data is None:
+            def build_and_cache():
+                payload = build()
+                cache_report(key, payload)
+                return payload
+
+            report_data = coalesce("reports", key, build_and_cache, recheck=lambda: peek_cached_report(key))
+        return report_data
+
+    def _build_report(self, params):
+        """Compute the full report payload, one section after another."""
+        context = self._report_context(params)
+        parts = [section(context) for section in self._report_sections()]
+        return self._assemble_report(parts)
+
+    def _report_context(self, params):
+        """Parameters and derived values every report section reads."""
+        start_date_str = params.get('start_date')
+        end_date_str = params.get('end_date')
+        product_id = params.get('product_id')
 
         # new metrics for dashboard
-        today = timezone.now().date()
+        today = timezone.localdate()
         current_month_start = today.replace(day=1)
         last_month_end = current_month_start - timedelta(days=1)
-        last_month_start = last_month_end.replace(day=1)
-        due_date_threshold = today + timedelta(days=7)
 
-        base_queryset = InventoryMovement.objects.filter(movement_type=InventoryMovement.MOVEMENT_OUTPUT)
+        start = self._parse_datetime(start_date_str) if start_date_str else None
+        end = self._parse_datetime(end_date_str) if end_date_str else None
+        window = {}
+        if start:
+            window['date__gte'] = start
+        if end:
+            window['date__lte'] = end
+        if product_id:
+            window['product_id'] = product_id
+        base_queryset = InventoryMovement.objects.filter(
+            movement_type=InventoryMovement.MOVEMENT_OUTPUT, **window
+        )
+
+        return {
+            'start': start,
+            'end': end,
+            'product_id': product_id,
+            'window': window,
+            'base_queryset': base_queryset,
+            'current_month_start': current_month_start,
+            'last_month_start': last_month_end.replace(day=1),
+            'due_date_threshold': today + timedelta(days=7),
+            'use_rollups': self._rollups_cover(base_queryset, start, end),
+            'approx': params.get('approx', '').lower() in ('true', '1', 'yes'),
+        }
+
+    def _report_sections(self):
+        """Independent parts of the report; each runs its own queries."""
+        return [
+            self._product_kpis,
+            self._recent_movements,
+            self._sales,
+            self._top_selling_products,
+            self._stock_levels,
+            self._due_suppliers,
+            self._due_purchase_orders,
+        ]
+
+    @staticmethod
+    def _assemble_report(parts):
+        data = {}
+        for part in parts:
+            data.update(part)
+
+        # The data is formatted so that it is easy to use on the frontend.
+        return {
+            #Dashboard data
+            'kpis': {
+                'total_products': data['total_products'],
+                'low_stock_count': data['low_stock_count'],
+                'sales_current_month': data['sales_current_month'],
+                'sales_percentage_change': data['sales_percentage_change'],
+                'due_suppliers_count': data['due_suppliers_count'],
+                'due_purchase_orders_count': data['due_purchase_orders_count'],
+            },
+            'recent_movements': data['recent_movements'],
+
+            #Reports data
+            'sales_by_month': data['sales_by_month'],
+            'top_selling_products': data['top_selling_products'],
+            'stock_levels': data['stock_levels'],
+        }
+
+    @staticmethod
+    def _product_kpis(context):
+        # Both product KPIs in one pass over the products
+        return Product.objects.filter(is_active=True).aggregate(
+            total_products=Count('pk'),
+            low_stock_count=Count('pk', filter=low_stock_condition(LOW_STOCK_THRESHOLD)),
+        )
 
-        # For dashboard
-        total_products = Product.objects.filter(is_active=True).count()
-        low_stock_products_count = Product.objects.filter(is_active=True, quantity__lte=10).count()
-        recent_movements = InventoryMovement.objects.order_by('-date')[:5]
-        recent_movements_data = [
+    @staticmethod
+    def _recent_movements(context):
+        recent_movements = InventoryMovement.objects.select_related('product').order_by('-date')[:5]
+        return {'recent_movements': [
             {
                 'id': movement.id,
                 'product_name': movement.product.name,
@@ -88,29 +535,31 @@ class InventoryReportsView(APIView):
                 'date': movement.date
             }
             for movement in recent_movements
-        ]
+        ]}
 
-        if start_date_str:
-            base_queryset = base_queryset.filter(date__gte=datetime.fromisoformat(start_date_str))
-        if end_date_str:
-            base_queryset = base_queryset.filter(date__lte=datetime.fromisoformat(end_date_str))
-        if product_id:
-            base_queryset = base_queryset.filter(product_id=product_id)
-
-        # Sales for the current month
-        sales_current_month_data = InventoryMovement.objects.filter(
-            movement_type=InventoryMovement.MOVEMENT_OUTPUT,
-            date__gte=current_month_start
-        ).aggregate(total=Sum('quantity'))
-        sales_current_month = sales_current_month_data['total'] or 0
-
-        # Sales for the previous month
-        sales_last_month_data = InventoryMovement.objects.filter(
-            movement_type=InventoryMovement.MOVEMENT_OUTPUT,
-            date__gte=last_month_start,
-            date__lt=current_month_start
-        ).aggregate(total=Sum('quantity'))
-        sales_last_month = sales_last_month_data['total'] or 0
+    def _sales(self, context):
+        """Monthly sales and the month-over-month KPI."""
+        if context['use_rollups']:
+            sales_by_month = self._rollup_sales_by_month(context['start'], context['end'], context['product_id'])
+        else:
+            sales_by_month = self._ledger_sales_by_month(context['base_queryset'], context['window'])
+        sales_by_month = list(sales_by_month)
+
+        # Sales for the current and previous month. Without a window the
+        # monthly sales above already hold them.
+        current_month_start, last_month_start = context['current_month_start'], context['last_month_start']
+        if context['window']:
+            monthly_totals = dict(
+                MonthlySalesRollup.objects
+                .filter(month__in=[current_month_start, last_month_start])
+                .values('month')
+                .annotate(total=Sum('quantity'))
+                .values_list('month', 'total')
+            )
+        else:
+            monthly_totals = {sale['month']: sale['total_quantity'] for sale in sales_by_month}
+        sales_current_month = monthly_totals.get(current_month_start, 0)
+        sales_last_month = monthly_totals.get(last_month_start, 0)
 
         # Calculation of percentage change
         percentage_change = 0
@@ -118,7 +567,152 @@ class InventoryReportsView(APIView):
             percentage_change = ((sales_current_month - sales_last_month) / sales_last_month) * 100
         elif sales_current_month > 0:
             percentage_change = 100 # If last month was 0 and this month is not, it is a 100% increase (or infinite).
-        
+
+        return {
+            'sales_current_month': sales_current_month,
+            'sales_percentage_change': round(percentage_change, 2),
+            'sales_by_month': [
+                {'month': sale['month'].strftime('%Y-%m'), 'total_quantity': sale['total_quantity']}
+                for sale in sales_by_month
+            ],
+        }
+
+    def _top_selling_products(self, context):
+        if context['approx'] and not context['product_id']:
+            top_selling_products = self._approximate_top_sellers(context['start'], context['end'])
+        elif context['use_rollups']:
+            top_selling_products = self._rollup_top_sellers(context['start'], context['end'], context['product_id'])
+        else:
+            top_selling_products = self._ledger_top_sellers(context['base_queryset'], context['window'])
+        return {'top_selling_products': list(top_selling_products)}
+
+    @staticmethod
+    def _stock_levels(context):
+        #Report current stock for products (striped products report the sum of their stripes)
+        active = Product.objects.filter(is_active=True)
+        # Plain products come off the (is_active, quantity) index; ordering by
+        # with_stock() would compute the stock of every product first
+        plain = active.filter(stripe_count=0).order_by('-quantity').values_list('name', 'quantity')[:10]
+        striped = active.filter(stripe_count__gt=0).with_stock().values_list('name', 'stock')
+        return {'stock_levels': [
+            {'name': name, 'quantity': stock}
+            for name, stock in heapq.nlargest(10, [*plain, *striped], key=itemgetter(1))
+        ]}
+
+    @staticmethod
+    def _due_suppliers(context):
+        # We count suppliers whose latest order is past due or about to become past due,
+        # from the due date kept on the supplier, so this is one indexed range count.
+        due_suppliers_count = Supplier.objects.filter(
+            next_payment_due_date__lte=context['due_date_threshold']
+        ).count()
+        return {'due_suppliers_count': due_suppliers_count}
+
+    @staticmethod
+    def _due_purchase_orders(context):
+        # We count unpaid purchase orders that are past due or about to become past due.
+        due_pos_count = PurchaseOrder.objects.filter(
+            is_paid=False,
+            payment_due_date__isnull=False, # Asegurarse de que tenga fecha de vencimiento
+            payment_due_date__lte=context['due_date_threshold']
+        ).count()
+        return {'due_purchase_orders_count': due_pos_count}
+
+    @staticmethod
+    def _parse_datetime(value):
+        moment = datetime.fromisoformat(value)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return moment
+
+    @staticmethod
+    def _last_archived():
+        """Date of the newest archived movement, None while the archive is empty."""
+        return ArchivedInventoryMovement.objects.aggregate(last=Max('date'))['last']
+
+    def _rollups_cover(self, base_queryset, start, end):
+        """
+        Whether the daily rollups give the exact sales of the window: both
+        bounds fall on local midnight and no sale sits on the (inclusive)
+        end instant itself.
+        """
+        for moment in (start, end):
+            if moment and timezone.localtime(moment).time() != datetime.min.time():
+                return False
+        if end is None:
+            return True
+        if base_queryset.filter(date=end).exists():
+            return False
+        last_archived = self._last_archived()
+        return not (
+            last_archived and end <= last_archived
+            and ArchivedInventoryMovement.objects.filter(
+                movement_type=InventoryMovement.MOVEMENT_OUTPUT, date=end
+            ).exists()
+        )
+
+    @staticmethod
+    def _rollups(start, end, product_id):
+        """Daily rollups for a window, monthly ones when there is none."""
+        daily = start is not None or end is not None
+        rollups = DailySalesRollup.objects.all() if daily else MonthlySalesRollup.objects.all()
+        if product_id:
+            rollups = rollups.filter(product_id=product_id)
+        if start:
+            rollups = rollups.filter(date__gte=timezone.localdate(start))
+        if end:
+            rollups = rollups.filter(date__lt=timezone.localdate(end))
+        return rollups, daily
+
+    def _rollup_sales_by_month(self, start, end, product_id):
+        rollups, daily = self._rollups(start, end, product_id)
+        if daily:
+            rollups = rollups.annotate(month=TruncMonth('date'))
+        return rollups.values('month').annotate(total_quantity=Sum('quantity')).order_by('month')
+
+    def _rollup_top_sellers(self, start, end, product_id):
+        rollups, _ = self._rollups(start, end, product_id)
+        # Ranked by product id, so only the five winners are joined to their names
+        top = (
+            rollups
+            .values('product_id')
+            .annotate(total_quantity_sold=Sum('quantity'))
+            .order_by('-total_quantity_sold')
+            .values_list('product_id', 'total_quantity_sold')[:5]
+        )
+        return self._named_top_sellers(list(top))
+
+    @staticmethod
+    def _named_top_sellers(top):
+        """Top seller rows of (product id, units sold, ...) tuples, best first."""
+        names = dict(Product.objects.filter(pk__in=[row[0] for row in top]).values_list('pk', 'name'))
+        return [
+            {'product__name': names[product_id], 'total_quantity_sold': count}
+            for product_id, count, *_ in top
+            if product_id in names
+        ]
+
+    def _approximate_top_sellers(self, start, end):
+        """Top sellers from the heavy-hitters sketches, by local day."""
+        return self._named_top_sellers(approximate_top_sellers(
+            timezone.localdate(start) if start else None,
+            timezone.localdate(end) if end else None,
+        ))
+
+    def _archived_sales(self, window):
+        """
+        Archived OUT movements of the window, or None when the window does not
+        reach back past the newest archived movement.
+        """
+        last_archived = self._last_archived()
+        if last_archived and window.get('date__gte', last_archived) <= last_archived:
+            return ArchivedInventoryMovement.objects.filter(
+                movement_type=InventoryMovement.MOVEMENT_OUTPUT, **window
+            )
+        return None
+
+    def _ledger_sales_by_month(self, base_queryset, window):
+        """Monthly sales aggregated from the raw OUT movements."""
         # Group together output movements by month and summarize quantities
         sales_by_month = (
             base_queryset
@@ -127,70 +721,108 @@ class InventoryReportsView(APIView):
             .annotate(total_quantity=Sum('quantity'))
             .order_by('month')
         )
-    
-        # Report on best-selling products
+        archived_queryset = self._archived_sales(window)
+        if archived_queryset is None:
+            return sales_by_month
+
+        archived_by_month = (
+            archived_queryset
+            .annotate(month=TruncMonth('date'))
+            .values('month')
+            .annotate(total_quantity=Sum('quantity'))
+        )
+        monthly = {}
+        for sale in [*sales_by_month, *archived_by_month]:
+            monthly[sale['month']] = monthly.get(sale['month'], 0) + sale['total_quantity']
+        return [{'month': month, 'total_quantity': total} for month, total in sorted(monthly.items())]
+
+    def _ledger_top_sellers(self, base_queryset, window):
+        """Best-selling products aggregated from the raw OUT movements."""
         top_selling_products = (
             base_queryset
             .values('product__name')
             .annotate(total_quantity_sold=Sum('quantity'))
-            .order_by('-total_quantity_sold')[:5]
+            .order_by('-total_quantity_sold')
         )
+        archived_queryset = self._archived_sales(window)
+        if archived_queryset is None:
+            return top_selling_products[:5]
 
-        #Report current stock for products
-        stock_levels = (
-            Product.objects
-            .filter(is_active=True)
-            .order_by('-quantity')
-            .values('name', 'quantity')[:10]
+        archived_by_product = (
+            archived_queryset
+            .values('product__name')
+            .annotate(total_quantity_sold=Sum('quantity'))
         )
+        per_product = {}
+        for product in [*top_selling_products, *archived_by_product]:
+            name = product['product__name']
+            per_product[name] = per_product.get(name, 0) + product['total_quantity_sold']
+        return [
+            {'product__name': name, 'total_quantity_sold': total}
+            for name, total in sorted(per_product.items(), key=lambda item: -item[1])[:5]
+        ]
 
-        # We count suppliers with invoices that are past due or about to become past due.
-        # Use subquery to get the latest purchase order date for each supplier
 
-        
-        due_suppliers_count = Supplier.objects.annotate(
-            latest_order_date=Subquery(
-                PurchaseOrder.objects.filter(
-                    supplier=OuterRef('pk')
-                ).order_by('-order_date').values('order_date')[:1]
-            )
-        ).annotate(
-            due_date=ExpressionWrapper(
-                F('latest_order_date') + timedelta(days=1) * F('payment_terms'),
-                output_field=DateField()
-            )
-        ).filter(
-            due_date__lte=due_date_threshold,
-            latest_order_date__isnull=False  # Only count suppliers with at least one purchase order
-        ).count()
+def _run_report_section(section, context):
+    """Run one report section in a worker thread on that thread's own connection."""
+    close_old_connections()
+    try:
+        return section(context)
+    finally:
+        close_old_connections()
 
-        # We count unpaid purchase orders that are past due or about to become past due.
-        due_pos_count = PurchaseOrder.objects.filter(
-            is_paid=False,
-            payment_due_date__isnull=False, # Asegurarse de que tenga fecha de vencimiento
-            payment_due_date__lte=due_date_threshold
-        ).count()
 
-        # The data is formatted so that it is easy to use on the frontend.
-        report_data = {
-            #Dashboard data
-            'kpis': {
-                'total_products': total_products,
-                'low_stock_count': low_stock_products_count,
-                'sales_current_month': sales_current_month,
-                'sales_percentage_change': round(percentage_change, 2),
-                'due_suppliers_count': due_suppliers_count,
-                'due_purchase_orders_count': due_pos_count,
-            },
-            'recent_movements': recent_movements_data,
+class AsyncInventoryReportsView(View):
+    """
+    ASGI variant of InventoryReportsView with the same payload, permissions
+    and cache.
+
+    Authentication, permission checks and rendering are delegated to
+    InventoryReportsView. The independent report sections then run
+    concurrently, each in a worker thread with its own database connection,
+    so latency is that of the slowest section rather than the sum of all of
+    them. Set DB_CONN_MAX_AGE so the worker threads keep their connections.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        api_view = InventoryReportsView()
+        api_view.setup(request, *args, **kwargs)
+        drf_request = api_view.initialize_request(request, *args, **kwargs)
+        api_view.request = drf_request
+        api_view.headers = api_view.default_response_headers
+        try:
+            await sync_to_async(api_view.initial)(drf_request, *args, **kwargs)
+            response = Response(await self._report(api_view, drf_request))
+        except Exception as exc:
+            response = api_view.handle_exception(exc)
+        response = api_view.finalize_response(drf_request, response, *args, **kwargs)
+        return response.render()
+
+    @staticmethod
+    async def _report(api_view, request):
+        params = report_params(request)
+        if not any(params.values()):
+            return await sync_to_async(get_dashboard)(lambda: api_view._build_report(params))
+
+        return await sync_to_async(_cached_report_in_thread, thread_sensitive=False)(api_view, params)
+
+
+def _cached_report_in_thread(api_view, params):
+    # Runs in its own thread so requests waiting for the same report do not
+    # block the event loop; the build itself goes back to the loop.
+    try:
+        return api_view._cached_report(
+            params, lambda: async_to_sync(build_report_concurrently)(api_view, params)
+        )
+    finally:
+        close_old_connections()
 
-            #Reports data
-            'sales_by_month': [
-                {'month': sale['month'].strftime('%Y-%m'), 'total_quantity': sale['total_quantity']}
-                for sale in sales_by_month
-            ],
-            'top_selling_products' : list(top_selling_products),
-            'stock_levels': list(stock_levels)
-        }
 
-        return Response(report_data)
+async def build_report_concurrently(api_view, params):
+    """Build the report payload with every section running at the same time."""
+    context = await sync_to_async(api_view._report_context)(params)
+    parts = await asyncio.gather(*(
+        sync_to_async(_run_report_section, thread_sensitive=False)(section, context)
+        for section in api_view._report_sections()
+    ))
+    return api_view._assemble_report(parts)
@@ -0,0 +1,228 @@
+"""
+Product name autocomplete for the suggestions endpoint.
+
+Each worker keeps a prefix index of the names of the active products in
+memory: the normalized names, and every word of them, in sorted arrays that
+are searched with bisect. A lookup is a few binary searches plus a walk over
+at most ``limit`` matches, so it needs no query and no filter backends.
+
+- Names that start with the typed text come first, in name order.
+- Then names with words starting with every typed word.
+- Case and accents are ignored, so "cafe" finds "Café".
+
+Saving or deleting a product bumps the catalog version (stock updates do
+not). That version lives in the reports cache, which other processes may
+not share, so the index is also stamped with the latest product change and
+the product count, read from the database at most every
+AUTOCOMPLETE_CHECK_SECONDS. A worker whose index is older rebuilds it in a
+background thread and answers from the old one meanwhile; only its first
+lookup builds the index during the request.
+
+When nothing matches, PostgreSQL with pg_trgm fills in names similar to
+the typed text, so a typo like "monitr" still suggests "Monitor".
+"""
+import logging
+import re
+import threading
+import time
+import unicodedata
+from array import array
+from bisect import bisect_left
+
+from django.conf import settings
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection, connections
+from django.db.models import BooleanField, Count, Max
+from django.db.models.expressions import RawSQL
+
+from .coalescing import coalesce
+from .models import Product
+from .report_cache import get_catalog_version
+from .search import has_trigram
+
+logger = logging.getLogger(__name__)
+
+SUGGESTION_LIMIT = 10
+# Sorts after every character that can appear in a name
+_PREFIX_END = chr(0x10FFFF)
+_WORD = re.compile(r"[^\W_]+")
+
+
+def normalize(text: str) -> str:
+    """Lowercase words of ``text`` without accents, separated by single spaces."""
+    if text.isascii():
+        text = text.lower()
+    else:
+        text = unicodedata.normalize("NFKD", text).casefold()
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(_WORD.findall(text))
+
+
+class PrefixIndex:
+    """Sorted arrays of product names and their words, for prefix lookups."""
+
+    def __init__(self, products, version: tuple = None, read_at: float = 0.0):
+        """
+        Args:
+            products: (id, name) pairs
+            version (tuple, optional): Catalog stamp the products were read at
+            read_at (float): Monotonic time the stamp was read at
+        """
+        self.version = version
+        self.read_at = read_at
+        rows = sorted((normalize(name), name, pk) for pk, name in products)
+        self.keys = [key for key, _, _ in rows]
+        self.names = [name for _, name, _ in rows]
+        words, word_rows = [], array("l")
+        for row, key in enumerate(self.keys):
+            for word in set(key.split()):
+                words.append(word)
+                word_rows.append(row)
+        # A stable sort keeps the words of each spelling in name order
+        order = sorted(range(len(words)), key=words.__getitem__)
+        self.words = [words[position] for position in order]
+        self.word_rows = array("l", (word_rows[position] for position in order))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _range(self, values: list, prefix: str) -> range:
+        return range(bisect_left(values, prefix), bisect_left(values, prefix + _PREFIX_END))
+
+    def lookup(self, text: str, limit: int = SUGGESTION_LIMIT) -> list:
+        """Row numbers of the first ``limit`` names matching ``text``, best first."""
+        prefix = normalize(text)
+        rows = list(self._range(self.keys, prefix)[:limit])
+        typed = prefix.split()
+        if len(rows) == limit or not typed:
+            return rows
+
+        # Walk the rarest typed word; the other ones are checked per name
+        ranges = [self._range(self.words, word) for word in typed]
+        rarest = min(range(len(typed)), key=lambda position: len(ranges[position]))
+        others = typed[:rarest] + typed[rarest + 1:]
+        found = set(rows)
+        for position in ranges[rarest]:
+            row = self.word_rows[position]
+            if row in found:
+                continue
+            if others:
+                words = self.keys[row].split()
+                if not all(any(word.startswith(other) for word in words) for other in others):
+                    continue
+            found.add(row)
+            rows.append(row)
+            if len(rows) == limit:
+                break
+        return rows
+
+    def suggest(self, text: str, limit: int = SUGGESTION_LIMIT) -> list:
+        """Names of the first ``limit`` products matching ``text``."""
+        return [self.names[row] for row in self.lookup(text, limit)]
+
+
+_lock = threading.Lock()
+_index = None
+_rebuilding = False
+_trigram = None
+# (catalog version, latest product change, product count, monotonic time read)
+_stamp = None
+
+
+def catalog_stamp(fresh: bool = False) -> tuple:
+    """
+    (catalog version, latest product change, product count) the index is
+    compared with. The database part is reused for AUTOCOMPLETE_CHECK_SECONDS
+    unless ``fresh``, or the catalog version has moved since it was read.
+    """
+    global _stamp
+    version = get_catalog_version()
+    with _lock:
+        stamp = _stamp
+    now = time.monotonic()
+    if fresh or stamp is None or stamp[0] != version or now - stamp[3] >= settings.AUTOCOMPLETE_CHECK_SECONDS:
+        products = Product.objects.aggregate(changed=Max("updated_at"), count=Count("pk"))
+        stamp = (version, products["changed"], products["count"], now)
+        with _lock:
+            _stamp = stamp
+    return stamp[:3]
+
+
+def build_prefix_index() -> PrefixIndex:
+    """Index the names of every active product."""
+    # Read first, so a product saved during the build leaves the index stale
+    read_at = time.monotonic()
+    version = catalog_stamp(fresh=True)
+    products = Product.objects.filter(is_active=True).values_list("pk", "name").iterator(chunk_size=10000)
+    return PrefixIndex(products, version, read_at)
+
+
+def _install(index: PrefixIndex) -> PrefixIndex:
+    global _index
+    with _lock:
+        if _index is None or index.read_at >= _index.read_at:
+            _index = index
+    return index
+
+
+def _rebuild_in_background() -> None:
+    global _rebuilding
+    try:
+        _install(build_prefix_index())
+    except Exception:
+        # The next lookup that finds the index stale tries again
+        logger.exception("Background autocomplete index rebuild failed")
+    finally:
+        with _lock:
+            _rebuilding = False
+        connections.close_all()
+
+
+def get_prefix_index() -> PrefixIndex:
+    """This worker's prefix index, with a rebuild started when it is stale."""
+    global _rebuilding
+    version = catalog_stamp()
+    with _lock:
+        index = _index
+        rebuild = index is not None and index.version != version and not _rebuilding
+        if rebuild:
+            _rebuilding = True
+    if index is None:
+        return coalesce("suggestions", "index:" + ":".join(map(str, version)), lambda: _install(build_prefix_index()))
+    if rebuild:
+        threading.Thread(target=_rebuild_in_background, daemon=True).start()
+    return index
+
+
+def refresh_prefix_index() -> PrefixIndex:
+    """Rebuild this worker's prefix index now."""
+    return _install(build_prefix_index())
+
+
+def _similar_names(text: str, limit: int) -> list:
+    """Names of active products most similar to ``text``, by trigram word similarity."""
+    global _trigram
+    if _trigram is None:
+        _trigram = has_trigram(connection)
+    if not _trigram or not text.strip():
+        return []
+    # "<%" is true above pg_trgm.word_similarity_threshold and uses the trigram index
+    similar = RawSQL("%s <%% name", (text,), output_field=BooleanField())
+    return list(
+        Product.objects.filter(similar, is_active=True)
+        .annotate(similarity=TrigramWordSimilarity(text, "name"))
+        .order_by("-similarity", "name")
+        .values_list("name", flat=True)[:limit]
+    )
+
+
+def suggest_product_names(text: str, limit: int = SUGGESTION_LIMIT) -> list:
+    """
+    Names of up to ``limit`` active products for the typed ``text``: prefix
+    matches from the in-memory index, or fuzzy matches from the database
+    when there are none.
+    """
+    names = get_prefix_index().suggest(text, limit)
+    if not names:
+        names = _similar_names(text, limit)
+    return names
@@ -0,0 +1,122 @@
+"""
+Single-flight coalescing of identical expensive reads.
+
+When many requests ask for the same thing at once, only the first one (the
+leader) computes it; the others wait for that computation and share its
+result. Within one worker process this is done with an in-memory table of
+in-flight calls. With COALESCE_ACROSS_WORKERS enabled on PostgreSQL the
+leader additionally takes an advisory lock on the key, so leaders in other
+workers queue up behind it and then find its result in the shared store
+(the report cache, the dashboard row) instead of computing it again.
+
+Every call counts as either ``computed`` or ``shared`` per endpoint; the
+counters live in the reports cache next to the report hit/miss counters.
+"""
+import hashlib
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+from .report_cache import REPORTS_CACHE, increment_counter
+
+COALESCED_ENDPOINTS = ("reports", "dashboard", "suggestions", "analytics")
+COUNTER_KEY = "inventory:coalescing:{endpoint}:{outcome}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_lock = threading.Lock()
+_in_flight = {}
+
+
+def _advisory_lock_id(key: str) -> int:
+    """Signed 64 bit lock id for ``key``, as pg_advisory_lock expects."""
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _compute_across_workers(key, compute, recheck):
+    """Run ``compute`` under the key's advisory lock; returns (result, shared)."""
+    if recheck is None or not settings.COALESCE_ACROSS_WORKERS or connection.vendor != "postgresql":
+        return compute(), False
+
+    lock_id = _advisory_lock_id(key)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_advisory_lock(%s)", [lock_id])
+    try:
+        # A leader in another worker may have stored the result while we waited
+        result = recheck()
+        if result is not None:
+            return result, True
+        return compute(), False
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(%s)", [lock_id])
+
+
+def coalesce(endpoint: str, key: str, compute, recheck=None):
+    """
+    Return ``compute()``, running it once for all concurrent callers with the
+    same ``endpoint`` and ``key``.
+
+    Args:
+        endpoint (str): Name the call is counted under, one of COALESCED_ENDPOINTS
+        key (str): Identifies the computation; equal keys must give equal results
+        compute (callable): Computes the result. When ``recheck`` is given it
+            must also store the result where ``recheck`` finds it.
+        recheck (callable, optional): Looks the result up in a store shared by
+            all workers, None when absent. Without it calls are only coalesced
+            within this process.
+
+    Returns:
+        The result of the leader's ``compute()``. An exception raised by it is
+        raised in every caller that waited for it.
+    """
+    flight_key = f"{endpoint}:{key}"
+    with _lock:
+        call = _in_flight.get(flight_key)
+        leader = call is None
+        if leader:
+            call = _in_flight[flight_key] = _Call()
+
+    if leader:
+        shared = False
+        try:
+            call.result, shared = _compute_across_workers(flight_key, compute, recheck)
+        except Exception as exc:
+            call.error = exc
+        finally:
+            with _lock:
+                del _in_flight[flight_key]
+            call.done.set()
+    else:
+        call.done.wait()
+        shared = True
+
+    increment_counter(COUNTER_KEY.format(endpoint=endpoint, outcome="shared" if shared else "computed"))
+    if call.error is not None:
+        raise call.error
+    return call.result
+
+
+def coalescing_stats() -> dict:
+    """Computed and shared call counts and the coalescing ratio per endpoint."""
+    cache = caches[REPORTS_CACHE]
+    stats = {}
+    for endpoint in COALESCED_ENDPOINTS:
+        computed = cache.get(COUNTER_KEY.format(endpoint=endpoint, outcome="computed"), 0)
+        shared = cache.get(COUNTER_KEY.format(endpoint=endpoint, outcome="shared"), 0)
+        calls = computed + shared
+        stats[endpoint] = {
+            "computed": computed,
+            "shared": shared,
+            "coalescing_ratio": round(shared / calls, 4) if calls else None,
+        }
+    return stats
@@ -0,0 +1,90 @@
+"""
+Conditional GET for the list, detail and report endpoints.
+
+Every write that can change what these endpoints return bumps the global
+inventory version (see report_cache), a nanosecond timestamp kept in the
+reports cache. It doubles as a validator: the ETag hashes it with the URL,
+the user and the negotiated media type, and Last-Modified is its time. A
+request whose If-None-Match (or, without one, If-Modified-Since) still
+matches is answered 304 Not Modified before the view runs its queries or
+serializer.
+
+The inventory version only describes the data when every worker sees the
+same one, so without a shared reports cache these responses carry no
+validators and are always answered in full.
+"""
+import hashlib
+from datetime import datetime, time
+from functools import partial
+
+from django.utils import timezone
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .report_cache import get_inventory_version, is_shared
+
+
+def datetime_version(moment: datetime) -> int:
+    """A version stamp, in nanoseconds like the inventory version, for data generated at ``moment``."""
+    return round(moment.timestamp() * 10**6) * 1000
+
+
+def _validators(request, version: int) -> tuple:
+    """(ETag, Last-Modified as a timestamp) of the response to ``request`` at ``version``."""
+    # Reports depend on today's date too (month and due-date KPIs)
+    today = timezone.localdate()
+    key = f"{version}:{today}:{request.user.pk}:{request.accepted_media_type}:{request.get_full_path()}"
+    etag = quote_etag(hashlib.blake2b(key.encode(), digest_size=16).hexdigest())
+    start_of_day = timezone.make_aware(datetime.combine(today, time.min)).timestamp()
+    return etag, int(max(version // 10**9, start_of_day))
+
+
+def _not_modified(request, etag: str, last_modified: int) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    if if_none_match:
+        # Weak comparison, as for any GET
+        tags = {tag.removeprefix("W/") for tag in parse_etags(if_none_match)}
+        return "*" in tags or etag in tags
+    if_modified_since = parse_http_date_safe(request.headers.get("If-Modified-Since", ""))
+    return if_modified_since is not None and last_modified <= if_modified_since
+
+
+def conditional_get(request, respond, version: int = None):
+    """
+    The response of ``respond()`` with ETag and Last-Modified headers, or an
+    empty 304 when the client's copy is still current.
+
+    Args:
+        request: The DRF request, after content negotiation
+        respond (callable): Builds the full response
+        version (int, optional): Version stamp of the data in nanoseconds;
+            the inventory version when not given, and then only if the
+            reports cache is shared
+    """
+    # Read before the data, so a write landing in between tags the response
+    # as older than it is, never newer
+    if version is None:
+        if not is_shared():
+            return respond()
+        version = get_inventory_version()
+    etag, last_modified = _validators(request, version)
+    if _not_modified(request, etag, last_modified):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = respond()
+        if response.status_code != status.HTTP_200_OK:
+            return response
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return response
+
+
+class ConditionalGetMixin:
+    """Conditional GET for the list and retrieve actions of a viewset."""
+
+    def list(self, request, *args, **kwargs):
+        return conditional_get(request, partial(super().list, request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        return conditional_get(request, partial(super().retrieve, request, *args, **kwargs))
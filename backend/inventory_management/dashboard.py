@@ -0,0 +1,92 @@
+"""
+Precomputed payload of the unfiltered reports dashboard.
+
+The payload is rebuilt every few seconds by the precompute_dashboard command
+and stored in a single row, so opening the dashboard costs one primary key
+lookup however large the ledger grows. A request that finds the payload
+stale still gets it immediately and starts a refresh in the background.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .coalescing import coalesce
+from .models import DashboardSnapshot
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_ID = 1
+# A refresh still unfinished after this long is assumed to have died
+REFRESH_TIMEOUT = timedelta(minutes=5)
+
+
+def refresh_dashboard(build) -> DashboardSnapshot:
+    """
+    Recompute the dashboard payload and store it.
+
+    Args:
+        build (callable): Returns the unfiltered report payload
+
+    Returns:
+        DashboardSnapshot: The stored snapshot
+    """
+    generated_at = timezone.now()
+    payload = build()
+    snapshot, _ = DashboardSnapshot.objects.update_or_create(
+        pk=SNAPSHOT_ID,
+        defaults={"payload": payload, "generated_at": generated_at, "refreshing_since": None},
+    )
+    return snapshot
+
+
+def _claim_refresh() -> bool:
+    """Mark a refresh as running; False when another one already is."""
+    now = timezone.now()
+    return bool(
+        DashboardSnapshot.objects.filter(pk=SNAPSHOT_ID)
+        .filter(Q(refreshing_since__isnull=True) | Q(refreshing_since__lt=now - REFRESH_TIMEOUT))
+        .update(refreshing_since=now)
+    )
+
+
+def _refresh_in_background(build) -> None:
+    try:
+        refresh_dashboard(build)
+    except Exception:
+        # The claim expires after REFRESH_TIMEOUT and a later request retries
+        logger.exception("Background dashboard refresh failed")
+    finally:
+        connections.close_all()
+
+
+def get_dashboard(build) -> dict:
+    """
+    The stored dashboard payload plus its ``generated_at`` time.
+
+    A payload older than DASHBOARD_STALE_AFTER seconds is still returned, and
+    one background refresh is started. The payload is only built during the
+    request when none has been stored yet, once for all requests waiting on it.
+
+    Args:
+        build (callable): Returns the unfiltered report payload
+
+    Returns:
+        dict: Report payload with a ``generated_at`` key
+    """
+    def stored():
+        return DashboardSnapshot.objects.filter(pk=SNAPSHOT_ID).first()
+
+    snapshot = stored()
+    if snapshot is None:
+        snapshot = coalesce("dashboard", str(SNAPSHOT_ID), lambda: refresh_dashboard(build), recheck=stored)
+    elif (
+        timezone.now() - snapshot.generated_at > timedelta(seconds=settings.DASHBOARD_STALE_AFTER)
+        and _claim_refresh()
+    ):
+        threading.Thread(target=_refresh_in_background, args=(build,), daemon=True).start()
+    return {**snapshot.payload, "generated_at": snapshot.generated_at}
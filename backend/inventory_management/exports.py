@@ -0,0 +1,78 @@
+"""
+Streaming CSV and NDJSON exports.
+
+Rows are read with ``QuerySet.iterator(chunk_size=...)``, a server-side
+cursor on PostgreSQL, and written to the response as they arrive, so memory
+use stays the same however many rows are exported.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_CHUNK_SIZE = 2000
+
+# (column name, queryset field)
+MOVEMENT_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("date", "date"),
+    ("product_id", "product_id"),
+    ("product_name", "product__name"),
+    ("movement_type", "movement_type"),
+    ("quantity", "quantity"),
+    ("unit_price", "unit_price"),
+    ("user", "user__username"),
+]
+PRODUCT_EXPORT_COLUMNS = [
+    ("id", "id"),
+    ("name", "name"),
+    ("description", "description"),
+    ("price", "price"),
+    ("quantity", "stock"),
+    ("is_active", "is_active"),
+]
+
+
+class _Echo:
+    """File-like object whose write returns the value instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(names, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(names)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(names, rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + "\n"
+
+
+def stream_export(queryset, columns, export_format: str, filename: str) -> StreamingHttpResponse:
+    """
+    Stream ``queryset`` as a CSV or NDJSON attachment.
+
+    Args:
+        queryset (QuerySet): Rows to export, already filtered and ordered
+        columns (list): (column name, queryset field) pairs
+        export_format (str): A key of EXPORT_FORMATS
+        filename (str): Attachment name without extension
+
+    Returns:
+        StreamingHttpResponse: The export
+    """
+    names = [name for name, _ in columns]
+    rows = queryset.values_list(*(field for _, field in columns)).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    lines = _csv_lines(names, rows) if export_format == "csv" else _ndjson_lines(names, rows)
+    response = StreamingHttpResponse(lines, content_type=EXPORT_FORMATS[export_format])
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -1,5 +1,5 @@
 from django_filters import rest_framework as filters
-from .models import InventoryMovement, Product
+from .models import InventoryMovement, Product, LOW_STOCK_THRESHOLD
 
 class ProductFilter(filters.FilterSet):
     """ 
@@ -12,7 +12,7 @@ class ProductFilter(filters.FilterSet):
     
     def filter_low_stock(self, queryset, name, value):
         if value:
-            return queryset.filter(quantity__lte=10)
+            return queryset.low_stock(LOW_STOCK_THRESHOLD)
         return queryset
 
 class MovementFilter(filters.FilterSet):
@@ -0,0 +1,159 @@
+"""
+Batch demand forecasting for every active product.
+
+Daily sales series come from the daily sales rollups, which hold the OUT
+movements per product and day. Products are forecast in primary key
+ranges; each range becomes a (products x days) matrix and additive
+Holt-Winters smoothing with a weekly season runs over its columns, so one
+step of the recursion updates every product in the range at once. The
+results are upserted into DemandForecast, which the forecast report reads
+directly.
+
+NumPy is an optional dependency, only needed to refresh the forecasts.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .analytics import _import_numpy
+from .models import DailySalesRollup, DemandForecast, Product
+from .services import _map_tasks, _movement_filters, _product_ranges
+
+HISTORY_DAYS = 16 * 7
+HORIZON_DAYS = 28
+SEASON_LENGTH = 7
+# Smoothing of the level, trend and season
+ALPHA = 0.3
+BETA = 0.05
+GAMMA = 0.2
+
+
+def holt_winters(series, horizon: int = HORIZON_DAYS, season_length: int = SEASON_LENGTH,
+                 alpha: float = ALPHA, beta: float = BETA, gamma: float = GAMMA):
+    """
+    Additive Holt-Winters forecasts of many series at once.
+
+    Args:
+        series (numpy.ndarray): One row per series, one column per day; at
+            least two seasons long
+        horizon (int): Days to forecast
+        season_length (int): Days per season
+
+    Returns:
+        tuple: (forecasts of shape (series, horizon), clipped at zero;
+        mean absolute one-day-ahead error of each series)
+    """
+    np = _import_numpy()
+    days = series.shape[1]
+    m = season_length
+    # Initial state from the first two seasons
+    level = series[:, :m].mean(axis=1)
+    trend = (series[:, m:2 * m].mean(axis=1) - level) / m
+    season = series[:, :m] - level[:, None]
+
+    abs_error = np.zeros(series.shape[0])
+    for day in range(days):
+        observed = series[:, day]
+        seasonal = season[:, day % m]
+        abs_error += np.abs(observed - (level + trend + seasonal))
+        new_level = alpha * (observed - seasonal) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, day % m] = gamma * (observed - new_level) + (1 - gamma) * seasonal
+        level = new_level
+
+    steps = np.arange(1, horizon + 1)
+    forecasts = level[:, None] + trend[:, None] * steps + season[:, (days + steps - 1) % m]
+    return np.clip(forecasts, 0, None), abs_error / days
+
+
+def _sales_matrix(np, product_ids, filters, first_day, days):
+    """Units sold per product (rows, in ``product_ids`` order) and day since ``first_day``."""
+    rows = (
+        DailySalesRollup.objects.filter(
+            **_movement_filters(filters),
+            date__gte=first_day,
+            date__lt=first_day + timedelta(days=days),
+        )
+        .values_list("product_id", "date", "quantity")
+        .iterator(chunk_size=20000)
+    )
+    first_ordinal = first_day.toordinal()
+    sales = np.fromiter(
+        ((product_id, day.toordinal() - first_ordinal, quantity) for product_id, day, quantity in rows),
+        dtype=[("product", np.int64), ("day", np.int64), ("quantity", np.float64)],
+    )
+    positions = np.minimum(np.searchsorted(product_ids, sales["product"]), len(product_ids) - 1)
+    # Inactive products have rollups but no row
+    known = product_ids[positions] == sales["product"]
+    matrix = np.zeros((len(product_ids), days))
+    # Added, not assigned: a striped product has several rows per day
+    np.add.at(matrix, (positions[known], sales["day"][known]), sales["quantity"][known])
+    return matrix
+
+
+def _forecast_range(filters: dict) -> int:
+    """
+    Forecast the active products matching ``filters`` and store the results.
+    Runs inside pool workers, so it only takes picklable arguments.
+
+    Returns:
+        int: Number of products forecast
+    """
+    np = _import_numpy()
+    today = timezone.localdate()
+    product_ids = np.array(
+        Product.objects.filter(**filters, is_active=True).order_by("pk").values_list("pk", flat=True),
+        dtype=np.int64,
+    )
+    with transaction.atomic():
+        DemandForecast.objects.filter(**_movement_filters(filters), product__is_active=False).delete()
+        if not len(product_ids):
+            return 0
+
+        # The history ends yesterday, the last complete day
+        series = _sales_matrix(np, product_ids, filters, today - timedelta(days=HISTORY_DAYS), HISTORY_DAYS)
+        forecasts, fit_errors = holt_winters(series)
+        generated_at = timezone.now()
+        DemandForecast.objects.bulk_create(
+            [
+                DemandForecast(
+                    product_id=product_id,
+                    generated_at=generated_at,
+                    start_date=today,
+                    daily=daily,
+                    next_7_days=round(sum(daily[:7]), 2),
+                    next_28_days=round(sum(daily), 2),
+                    fit_error=round(fit_error, 4),
+                )
+                for product_id, daily, fit_error in zip(
+                    product_ids.tolist(), np.round(forecasts, 2).tolist(), fit_errors.tolist()
+                )
+            ],
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["generated_at", "start_date", "daily", "next_7_days", "next_28_days", "fit_error"],
+        )
+    return len(product_ids)
+
+
+def refresh_demand_forecasts(workers: int = 1, range_size: int = 5000, progress=None) -> int:
+    """
+    Recompute the demand forecast of every active product from its daily
+    sales, and drop the forecasts of inactive products.
+
+    Args:
+        workers (int): Worker processes, 1 forecasts ranges in this process
+        range_size (int): Products per range
+        progress (callable, optional): Called with the running number of products forecast
+
+    Returns:
+        int: Number of products forecast
+    """
+    _import_numpy()
+    forecast = 0
+    for count in _map_tasks(_forecast_range, _product_ranges(range_size), workers):
+        forecast += count
+        if progress:
+            progress(forecast)
+    return forecast
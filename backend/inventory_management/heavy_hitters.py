@@ -0,0 +1,240 @@
+"""
+Approximate top sellers from Space-Saving heavy-hitters sketches.
+
+Every committed OUT movement is added to an in-memory sketch of its day
+(local date) in the worker that wrote it. Every SALES_SKETCH_FLUSH_SECONDS
+those pending sketches are merged into one persisted SalesSketch row per
+day, so all workers read the same totals and a restarted worker loses
+nothing that was flushed. A top-N query merges the sketches of the days in
+its window: its cost depends on the number of days and the sketch capacity,
+never on the number of movements.
+
+A Space-Saving sketch keeps at most SKETCH_CAPACITY products per day. Any
+product selling more than 1/SKETCH_CAPACITY of a day's units is guaranteed
+to be in it, and each estimate is at most its recorded error too high.
+"""
+import atexit
+import heapq
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import DailySalesRollup, SalesSketch
+
+logger = logging.getLogger(__name__)
+
+SKETCH_CAPACITY = 500
+
+
+class SpaceSaving:
+    """
+    Space-Saving summary of the heaviest items of a weighted stream.
+
+    The smallest counter is found through a min-heap of (count, item)
+    entries. Counts only grow, so a change pushes a new entry and the old
+    one is dropped once it reaches the top with a count that is no longer
+    current: an add costs O(log capacity) instead of a scan of every counter.
+    """
+
+    def __init__(self, capacity: int = SKETCH_CAPACITY, counters=None):
+        self.capacity = capacity
+        # item -> [estimated count, maximum overestimate]
+        self.counters = {int(item): list(counter) for item, counter in (counters or {}).items()}
+        # Built on the first eviction; outdated entries are skipped lazily
+        self._heap = None
+
+    def _push(self, item, count: int) -> None:
+        if self._heap is None:
+            return
+        heapq.heappush(self._heap, (count, item))
+        if len(self._heap) > 4 * self.capacity:
+            # Mostly outdated entries by now; rebuilding is amortized over the adds
+            self._heap = None
+
+    def _smallest(self) -> tuple:
+        """(count, item) of the smallest counter of a non-empty summary."""
+        if self._heap is None:
+            self._heap = [(counter[0], item) for item, counter in self.counters.items()]
+            heapq.heapify(self._heap)
+        heap = self._heap
+        while True:
+            count, item = heap[0]
+            counter = self.counters.get(item)
+            if counter is not None and counter[0] == count:
+                return count, item
+            heapq.heappop(heap)
+
+    def add(self, item, weight: int = 1, error: int = 0) -> None:
+        counter = self.counters.get(item)
+        if counter is not None:
+            counter[0] += weight
+            counter[1] += error
+            if weight:
+                self._push(item, counter[0])
+        elif len(self.counters) < self.capacity:
+            self.counters[item] = [weight, error]
+            self._push(item, weight)
+        else:
+            # The new item takes over the smallest counter, whose count
+            # becomes its possible overestimate
+            floor, victim = self._smallest()
+            heapq.heappop(self._heap)
+            del self.counters[victim]
+            self.counters[item] = [floor + weight, floor + error]
+            self._push(item, floor + weight)
+
+    def _floor(self) -> int:
+        """Most an item missing from a full summary can have been counted."""
+        if len(self.counters) < self.capacity or not self.counters:
+            return 0
+        return self._smallest()[0]
+
+    def merge(self, other: "SpaceSaving") -> "SpaceSaving":
+        """
+        Add another summary into this one in O(capacity log capacity): counts
+        are summed, an item missing from a full side gets that side's floor
+        as both count and error, and the heaviest ``capacity`` items are kept.
+        """
+        floors = (self._floor(), other._floor())
+        combined = {}
+        for item in self.counters.keys() | other.counters.keys():
+            mine = self.counters.get(item, (floors[0], floors[0]))
+            theirs = other.counters.get(item, (floors[1], floors[1]))
+            combined[item] = [mine[0] + theirs[0], mine[1] + theirs[1]]
+        heaviest = sorted(combined.items(), key=lambda entry: -entry[1][0])[:self.capacity]
+        self.counters = dict(heaviest)
+        self._heap = None
+        return self
+
+    def top(self, limit: int) -> list:
+        """The ``limit`` heaviest items as (item, estimated count, maximum overestimate)."""
+        ranked = sorted(self.counters.items(), key=lambda entry: (-entry[1][0], entry[0]))
+        return [(item, count, error) for item, (count, error) in ranked[:limit]]
+
+    def to_json(self) -> dict:
+        return {str(item): counter for item, counter in self.counters.items()}
+
+
+_lock = threading.Lock()
+_pending = {}
+_last_flush = time.monotonic()
+
+
+def record_sales(sales: dict) -> None:
+    """
+    Add sold quantities, keyed by (product id, local date), to this worker's
+    pending sketches. Called once the movement transaction has committed.
+    """
+    with _lock:
+        for (product_id, day), quantity in sales.items():
+            _pending.setdefault(day, SpaceSaving()).add(product_id, quantity)
+        due = time.monotonic() - _last_flush >= settings.SALES_SKETCH_FLUSH_SECONDS
+    if due:
+        flush_sales_sketches()
+
+
+def flush_sales_sketches() -> None:
+    """Merge this worker's pending sketches into the persisted ones."""
+    global _last_flush
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+
+    for day, sketch in sorted(pending.items()):
+        try:
+            _persist_sketch(day, sketch)
+        except Exception:
+            logger.exception("Could not persist the sales sketch of %s", day)
+            with _lock:
+                _pending.setdefault(day, SpaceSaving()).merge(sketch)
+
+
+def _persist_sketch(day, sketch: SpaceSaving) -> None:
+    with transaction.atomic():
+        SalesSketch.objects.get_or_create(date=day)
+        row = SalesSketch.objects.select_for_update().get(date=day)
+        row.counters = SpaceSaving(counters=row.counters).merge(sketch).to_json()
+        row.save(update_fields=["counters", "updated_at"])
+
+
+def _flush_at_exit() -> None:
+    """
+    Persist the pending sketches of a worker shutting down cleanly. Processes
+    that recorded no sales (migrate, shells, most commands) never touch the
+    database, and a database that cannot take them only logs a warning.
+    """
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    for day, sketch in sorted(pending.items()):
+        try:
+            _persist_sketch(day, sketch)
+        except DatabaseError as error:
+            logger.warning("Dropped the unflushed sales sketch of %s at exit: %s", day, error)
+
+
+# Do not lose the last seconds of sales when a worker shuts down cleanly
+atexit.register(_flush_at_exit)
+
+
+def approximate_top_sellers(start_date=None, end_date=None, limit: int = 5) -> list:
+    """
+    Approximate best sellers of the days from ``start_date`` to ``end_date``
+    (inclusive, open-ended when None), including this worker's unflushed sales.
+
+    Returns:
+        list: (product id, estimated units sold, maximum overestimate), best first
+    """
+    days = SalesSketch.objects.all()
+    if start_date:
+        days = days.filter(date__gte=start_date)
+    if end_date:
+        days = days.filter(date__lte=end_date)
+
+    merged = SpaceSaving()
+    for counters in days.values_list("counters", flat=True):
+        merged.merge(SpaceSaving(counters=counters))
+    with _lock:
+        pending = [
+            sketch for day, sketch in _pending.items()
+            if (not start_date or day >= start_date) and (not end_date or day <= end_date)
+        ]
+        for sketch in pending:
+            merged.merge(sketch)
+    return merged.top(limit)
+
+
+def rebuild_sales_sketches(days: int = 90, until=None) -> int:
+    """
+    Rewrite the persisted sketches of the last ``days`` days up to ``until``
+    (default today) from the exact daily sales rollups.
+
+    Returns:
+        int: Number of days written
+    """
+    until = until or timezone.localdate()
+    first = until - timedelta(days=days - 1)
+    written = 0
+    for offset in range(days):
+        day = first + timedelta(days=offset)
+        heaviest = (
+            DailySalesRollup.objects.filter(date=day)
+            .values("product_id")
+            .annotate(total=Sum("quantity"))
+            .order_by("-total")
+            .values_list("product_id", "total")[:SKETCH_CAPACITY]
+        )
+        counters = {str(product_id): [total, 0] for product_id, total in heaviest}
+        if not counters:
+            SalesSketch.objects.filter(date=day).delete()
+            continue
+        SalesSketch.objects.update_or_create(date=day, defaults={"counters": counters})
+        written += 1
+    return written
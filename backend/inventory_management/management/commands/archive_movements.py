@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory_management.models import InventoryMovement
+from inventory_management.services import archive_movements
+
+
+class Command(BaseCommand):
+    help = (
+        "Move old inventory movements from the live ledger to the archive "
+        "table, keeping per-product carry-forward balances."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than-days",
+            type=int,
+            default=548,
+            help="Archive movements older than this many days (default is about 18 months)",
+        )
+        parser.add_argument("--chunk-size", type=int, default=5000, help="Movements moved per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many movements would be archived")
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options["older_than_days"])
+
+        if options["dry_run"]:
+            pending = InventoryMovement.objects.filter(date__lt=before).count()
+            self.stdout.write(f"{pending} movements dated before {before:%Y-%m-%d} would be archived")
+            return
+
+        archived = archive_movements(
+            before,
+            chunk_size=options["chunk_size"],
+            progress=lambda total: self.stdout.write(f"Archived {total} movements..."),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {archived} movements dated before {before:%Y-%m-%d}"
+        ))
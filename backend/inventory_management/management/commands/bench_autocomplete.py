@@ -0,0 +1,89 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from inventory_management.api import ProductViewSet
+from inventory_management.autocomplete import refresh_prefix_index
+
+
+def _percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return statistics.median(samples), cuts[98]
+
+
+def _typed_terms(names, count, rng):
+    """What users type: the first 2+ characters of the name or of one of its later words."""
+    terms = []
+    for name in rng.choices(names, k=count):
+        words = name.split()
+        text = " ".join(words[rng.randrange(len(words)) if rng.random() < 0.3 else 0:]) or name
+        terms.append(text[:rng.randint(2, max(2, min(len(text), 12)))])
+    return terms
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the latency of the product suggestions endpoint as the "
+        "frontend calls it, answered by the in-memory autocomplete index, "
+        "and fail when its p99 is over the target. With --compare the same "
+        "terms also go through the filter backends, as before the index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000, help="Timed requests per mode")
+        parser.add_argument("--warmup", type=int, default=50, help="Untimed requests per mode")
+        parser.add_argument("--target-ms", type=float, default=10.0, help="Highest acceptable p99 latency")
+        parser.add_argument("--seed", type=int, default=0, help="Seed of the random search terms")
+        parser.add_argument("--compare", action="store_true", help="Also time the filter backend path")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        index = refresh_prefix_index()
+        self.stdout.write(f"Indexed {len(index)} active products in {time.perf_counter() - started:.2f} s")
+        if not len(index):
+            raise CommandError("There are no active products to suggest.")
+
+        rng = random.Random(options["seed"])
+        terms = _typed_terms(index.names, options["warmup"] + options["requests"], rng)
+        self.view = ProductViewSet.as_view({"get": "suggestions"})
+        self.factory = APIRequestFactory()
+        # Never saved; the endpoint only needs an authenticated user
+        self.user = User(username="bench_autocomplete")
+
+        modes = [("index", {})]
+        if options["compare"]:
+            # Any parameter besides search sends the request through the filter backends
+            modes.append(("filters", {"is_active": "true"}))
+        results = {}
+        self.stdout.write(f"{options['requests']} requests per mode")
+        for mode, params in modes:
+            samples = self._time(terms, params)[options["warmup"]:]
+            results[mode] = _percentiles(samples)
+            p50, p99 = results[mode]
+            self.stdout.write(f"  {mode:<8} p50 {p50 * 1000:8.2f} ms   p99 {p99 * 1000:8.2f} ms")
+        if options["compare"]:
+            self.stdout.write(f"Index p99 speedup: {results['filters'][1] / results['index'][1]:.1f}x")
+
+        p99_ms = results["index"][1] * 1000
+        if p99_ms > options["target_ms"]:
+            raise CommandError(f"Suggestions p99 of {p99_ms:.2f} ms is over the {options['target_ms']:g} ms target.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Suggestions p99 of {p99_ms:.2f} ms is within the {options['target_ms']:g} ms target."
+        ))
+
+    def _time(self, terms, params):
+        samples = []
+        for term in terms:
+            request = self.factory.get("/api/products/suggestions/", {"search": term, **params})
+            force_authenticate(request, user=self.user)
+            started = time.perf_counter()
+            response = self.view(request)
+            response.render()
+            samples.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"Suggestions for {term!r} answered {response.status_code}.")
+        return samples
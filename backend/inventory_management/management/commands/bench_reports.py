@@ -0,0 +1,65 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from inventory_management.api import InventoryReportsView, build_report_concurrently
+
+
+def _percentiles(samples):
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return statistics.median(samples), cuts[98]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare report latency of the sync view (queries one after another) "
+        "with the async view (independent queries run concurrently). The "
+        "report cache and the precomputed dashboard are bypassed so every "
+        "request runs its queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100, help="Timed requests per mode")
+        parser.add_argument("--warmup", type=int, default=5, help="Untimed requests per mode")
+        parser.add_argument("--start-date", help="start_date query parameter")
+        parser.add_argument("--end-date", help="end_date query parameter")
+        parser.add_argument("--product-id", help="product_id query parameter")
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in ("start_date", "end_date", "product_id") if options[name]}
+        self.params = params
+        self.view = InventoryReportsView()
+        total = options["warmup"] + options["requests"]
+
+        sync_samples = self._time_sync(total)[options["warmup"]:]
+        async_samples = asyncio.run(self._time_async(total))[options["warmup"]:]
+        connections.close_all()
+
+        self.stdout.write(f"{options['requests']} requests per mode, params {params or 'none'}")
+        results = {}
+        for mode, samples in (("sync", sync_samples), ("async", async_samples)):
+            results[mode] = _percentiles(samples)
+            p50, p99 = results[mode]
+            self.stdout.write(f"  {mode:<6} p50 {p50 * 1000:8.2f} ms   p99 {p99 * 1000:8.2f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Async p50 speedup: {results['sync'][0] / results['async'][0]:.2f}x, "
+            f"p99 speedup: {results['sync'][1] / results['async'][1]:.2f}x"
+        ))
+
+    def _time_sync(self, total):
+        samples = []
+        for _ in range(total):
+            started = time.perf_counter()
+            self.view._build_report(self.params)
+            samples.append(time.perf_counter() - started)
+        return samples
+
+    async def _time_async(self, total):
+        samples = []
+        for _ in range(total):
+            started = time.perf_counter()
+            await build_report_concurrently(self.view, self.params)
+            samples.append(time.perf_counter() - started)
+        return samples
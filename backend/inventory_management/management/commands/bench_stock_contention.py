@@ -0,0 +1,149 @@
+import multiprocessing
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.models import Count, Sum
+
+from inventory_management.models import Product, InventoryMovement, InventoryValuation
+from inventory_management.services import create_inventory_movement, enable_stock_striping
+
+
+def _run_worker(args):
+    """Issue OUT movements of one unit against the same product."""
+    product_id, movements = args
+    # Each process needs its own database connection
+    connections.close_all()
+
+    accepted = rejected = 0
+    started = time.perf_counter()
+    for _ in range(movements):
+        product = Product.objects.get(pk=product_id)
+        try:
+            create_inventory_movement(
+                product=product,
+                quantity=1,
+                movement_type=InventoryMovement.MOVEMENT_OUTPUT,
+                user=None,
+            )
+            accepted += 1
+        except ValueError:
+            rejected += 1
+    connections.close_all()
+    return accepted, rejected, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test concurrent OUT movements on a single product and verify "
+        "that no update is lost and stock never drops below zero. With "
+        "--stripes the same load is repeated against a striped product so the "
+        "two modes can be compared (use 32+ workers to see the difference). "
+        "Every movement also updates the sales rollups and the valuation, "
+        "which are checked against the ledger and the stock too."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8, help="Number of writer processes")
+        parser.add_argument("--movements", type=int, default=200, help="OUT movements issued per worker")
+        parser.add_argument(
+            "--initial-stock",
+            type=int,
+            default=None,
+            help="Starting stock (defaults to 3/4 of all movements, so some must be rejected)",
+        )
+        parser.add_argument(
+            "--stripes",
+            type=int,
+            default=0,
+            help="Also run the benchmark against a product striped over this many rows",
+        )
+        parser.add_argument("--keep", action="store_true", help="Keep the benchmark products afterwards")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        movements = options["movements"]
+        initial_stock = options["initial_stock"]
+        if initial_stock is None:
+            initial_stock = workers * movements * 3 // 4
+
+        modes = [0]
+        if options["stripes"]:
+            modes.append(options["stripes"])
+
+        results = {}
+        for stripes in modes:
+            results[stripes] = self._run_scenario(
+                workers, movements, initial_stock, stripes, options["keep"]
+            )
+
+        if len(results) > 1:
+            single, striped = results[0], results[options["stripes"]]
+            self.stdout.write(
+                f"\nStriped vs single-row throughput: {striped / single:.2f}x"
+            )
+
+    def _run_scenario(self, workers, movements, initial_stock, stripes, keep):
+        total = workers * movements
+        product = Product.objects.create(
+            name=f"bench-contention-{uuid.uuid4().hex[:8]}",
+            price=Decimal("1.00"),
+        )
+        if initial_stock:
+            # Received through the ledger so the OUT movements have cost layers to consume
+            create_inventory_movement(product, initial_stock, InventoryMovement.MOVEMENT_INPUT, user=None)
+        if stripes:
+            enable_stock_striping(product, stripes=stripes)
+
+        mode = f"{stripes} stripes" if stripes else "single row"
+        self.stdout.write(
+            f"\n[{mode}] {workers} workers x {movements} OUT movements against "
+            f"product #{product.pk} with {initial_stock} units in stock"
+        )
+
+        connections.close_all()
+        started = time.perf_counter()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            outcomes = pool.map(_run_worker, [(product.pk, movements)] * workers)
+        elapsed = time.perf_counter() - started
+
+        accepted = sum(outcome[0] for outcome in outcomes)
+        rejected = sum(outcome[1] for outcome in outcomes)
+        product = Product.objects.prefetch_related("stock_stripes").get(pk=product.pk)
+        stock = product.current_quantity
+        ledger_out = (
+            product.movements.filter(movement_type=InventoryMovement.MOVEMENT_OUTPUT)
+            .aggregate(total=Sum("quantity"))["total"]
+            or 0
+        )
+        rollups = product.daily_sales.aggregate(total=Sum("quantity"), rows=Count("pk"))
+        valued = InventoryValuation.objects.get(product=product).quantity
+        pending = product.pending_costs.count()
+        throughput = total / elapsed
+
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s ({throughput:.0f} movements/s)")
+        self.stdout.write(f"Accepted: {accepted}  Rejected: {rejected}")
+        self.stdout.write(f"Final stock: {stock}  Ledger OUT total: {ledger_out}")
+        self.stdout.write(f"Daily sales rollup total: {rollups['total'] or 0} in {rollups['rows']} rows")
+        self.stdout.write(f"Valued units: {valued}  Costs still queued: {pending}")
+
+        consistent = (
+            stock >= 0
+            and ledger_out == accepted
+            and stock == initial_stock - accepted
+            and accepted == min(total, initial_stock)
+            and (rollups["total"] or 0) == accepted
+            and valued == stock
+            and not pending
+        )
+
+        if not keep:
+            product.delete()
+
+        if consistent:
+            self.stdout.write(self.style.SUCCESS("Stock, rollups and valuation are consistent: no lost updates."))
+        else:
+            self.stdout.write(self.style.ERROR("Stock, rollups or valuation are INCONSISTENT under contention."))
+        return throughput
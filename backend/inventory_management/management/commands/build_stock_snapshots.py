@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from inventory_management.models import StockSnapshot
+from inventory_management.services import build_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = (
+        "Build daily per-product stock snapshots. Runs incrementally from each "
+        "product's latest snapshot; schedule it once a day."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--until", help="Last day to snapshot (YYYY-MM-DD), defaults to yesterday")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Products processed per chunk")
+        parser.add_argument("--rebuild", action="store_true", help="Delete all snapshots and rebuild from the full history")
+
+    def handle(self, *args, **options):
+        until = None
+        if options["until"]:
+            until = parse_date(options["until"])
+            if until is None:
+                raise CommandError("--until must be a date in YYYY-MM-DD format.")
+
+        if options["rebuild"]:
+            deleted, _ = StockSnapshot.objects.all().delete()
+            self.stdout.write(f"Deleted {deleted} existing snapshots")
+
+        created = build_stock_snapshots(until=until, batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Created {created} stock snapshots"))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from inventory_management.partitions import (
+    add_months,
+    ensure_month_partitions,
+    is_partitioned,
+    is_postgresql,
+    month_start,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Pre-create monthly partitions of the inventory movement table. "
+        "Schedule it at least monthly so new movements never fall into the "
+        "default partition."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future months to create partitions for",
+        )
+
+    def handle(self, *args, **options):
+        if not is_postgresql(connection):
+            self.stdout.write("Partitioning is only used on PostgreSQL; nothing to do.")
+            return
+
+        current_month = month_start(timezone.now().date())
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not is_partitioned(cursor):
+                raise CommandError(
+                    "The inventory movement table is not partitioned; run migrate first."
+                )
+            created = ensure_month_partitions(
+                cursor, current_month, add_months(current_month, options["months_ahead"])
+            )
+
+        for name in created:
+            self.stdout.write(f"Created partition {name}")
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partition(s)"))
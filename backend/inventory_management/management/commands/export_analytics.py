@@ -0,0 +1,27 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory_management.analytics_export import export_root, run_analytics_export
+
+
+class Command(BaseCommand):
+    help = (
+        "Write products, movements, suppliers and purchase orders to Parquet "
+        "files for analysts. Only rows changed since the previous export are "
+        "written unless --full is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Export every row, not only changed ones")
+
+    def handle(self, *args, **options):
+        try:
+            export = run_analytics_export(full=options["full"])
+        except (ImproperlyConfigured, ValueError) as exc:
+            raise CommandError(str(exc))
+
+        for file in export.files:
+            self.stdout.write(f"{file['path']}: {file['rows']} rows")
+        self.stdout.write(self.style.SUCCESS(
+            f"Export #{export.pk} ({'full' if export.full else 'incremental'}) written to {export_root()}"
+        ))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from inventory_management.api import InventoryReportsView
+from inventory_management.dashboard import refresh_dashboard
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the unfiltered reports dashboard every --interval seconds "
+        "and store it, so dashboard requests never wait for the report queries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=30, help="Seconds between refreshes")
+        parser.add_argument("--once", action="store_true", help="Refresh once and exit")
+
+    def handle(self, *args, **options):
+        view = InventoryReportsView()
+        while True:
+            started = time.perf_counter()
+            snapshot = refresh_dashboard(lambda: view._build_report({}))
+            self.stdout.write(
+                f"Dashboard refreshed at {snapshot.generated_at:%Y-%m-%d %H:%M:%S} "
+                f"in {(time.perf_counter() - started) * 1000:.0f} ms"
+            )
+            if options["once"]:
+                return
+            time.sleep(options["interval"])
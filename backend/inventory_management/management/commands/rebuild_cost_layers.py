@@ -0,0 +1,27 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory_management.services import rebuild_cost_layers
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the cost layers and inventory valuations from the movement "
+        "ledger (including the archive) under INVENTORY_COSTING_METHOD. Run "
+        "once after deploying valuation, and after changing the costing method."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes rebuilding product ranges")
+        parser.add_argument("--range-size", type=int, default=1000, help="Products per range and transaction")
+
+    def handle(self, *args, **options):
+        try:
+            rebuilt = rebuild_cost_layers(
+                workers=options["workers"],
+                range_size=options["range_size"],
+                progress=lambda total: self.stdout.write(f"Revalued {total} products..."),
+            )
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt cost layers for {rebuilt} products"))
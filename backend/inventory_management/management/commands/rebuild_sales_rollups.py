@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from inventory_management.services import rebuild_sales_rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the daily and monthly sales rollups from the movement ledger "
+        "(including the archive). Run once after deploying the rollup tables, "
+        "or to repair them after editing movements by hand."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes rebuilding product ranges")
+        parser.add_argument("--range-size", type=int, default=1000, help="Products per range and transaction")
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_sales_rollups(
+            workers=options["workers"],
+            range_size=options["range_size"],
+            progress=lambda total: self.stdout.write(f"Rebuilt {total} products..."),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt sales rollups for {rebuilt} products"))
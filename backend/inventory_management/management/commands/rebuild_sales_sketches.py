@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from inventory_management.heavy_hitters import rebuild_sales_sketches
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrite the persisted top-seller sketches of recent days from the "
+        "daily sales rollups. Run once after deploying the sketches, or to "
+        "replace drifted approximations with exact counts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Days back from today to rewrite")
+
+    def handle(self, *args, **options):
+        written = rebuild_sales_sketches(days=options["days"])
+        self.stdout.write(self.style.SUCCESS(f"Rewrote sales sketches for {written} days"))
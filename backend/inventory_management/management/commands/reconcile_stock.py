@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from inventory_management.services import reconcile_stock
+
+
+class Command(BaseCommand):
+    help = (
+        "Check recorded product stock against the movement ledger. Only "
+        "products with movements since the previous run are checked unless "
+        "--full is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--full", action="store_true", help="Check every product, not only changed ones")
+        parser.add_argument("--repair", action="store_true", help="Overwrite drifted stock with the ledger value")
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes checking product ranges")
+        parser.add_argument("--range-size", type=int, default=10000, help="Products per range handed to a worker")
+        parser.add_argument("--batch-size", type=int, default=5000, help="Movements fetched per round trip")
+
+    def handle(self, *args, **options):
+        run = reconcile_stock(
+            full=options["full"],
+            repair=options["repair"],
+            workers=options["workers"],
+            range_size=options["range_size"],
+            batch_size=options["batch_size"],
+            progress=lambda checked: self.stdout.write(f"Checked {checked} products..."),
+        )
+
+        for drift in run.drifts.select_related("product"):
+            state = "repaired" if drift.repaired else "not repaired"
+            self.stdout.write(self.style.WARNING(
+                f"{drift.product.name} (#{drift.product_id}): recorded {drift.recorded_quantity}, "
+                f"ledger {drift.expected_quantity} ({state})"
+            ))
+        self.stdout.write(self.style.SUCCESS(
+            f"Checked {run.products_checked} products ({'full' if run.full else 'incremental'} run), "
+            f"{run.drift_count} drifted, {run.repaired_count} repaired"
+        ))
@@ -0,0 +1,26 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory_management.forecasting import refresh_demand_forecasts
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the demand forecast of every active product from its daily "
+        "sales. Meant to run nightly, after midnight, so the last day is complete."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes forecasting product ranges")
+        parser.add_argument("--range-size", type=int, default=5000, help="Products per range and transaction")
+
+    def handle(self, *args, **options):
+        try:
+            forecast = refresh_demand_forecasts(
+                workers=options["workers"],
+                range_size=options["range_size"],
+                progress=lambda total: self.stdout.write(f"Forecast {total} products..."),
+            )
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(self.style.SUCCESS(f"Refreshed demand forecasts for {forecast} products"))
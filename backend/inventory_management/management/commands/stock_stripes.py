@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory_management.models import Product
+from inventory_management.services import (
+    disable_stock_striping,
+    enable_stock_striping,
+    rebalance_stock_stripes,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage striped stock for hot products. Without --enable/--disable it "
+        "rebalances every striped product, optionally in a loop."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--enable", type=int, metavar="PRODUCT_ID", help="Stripe the stock of this product")
+        parser.add_argument("--disable", type=int, metavar="PRODUCT_ID", help="Fold this product's stripes back into one row")
+        parser.add_argument("--stripes", type=int, default=8, help="Number of stripes used with --enable")
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Keep rebalancing every N seconds instead of running once",
+        )
+
+    def handle(self, *args, **options):
+        if options["enable"] or options["disable"]:
+            product_id = options["enable"] or options["disable"]
+            try:
+                product = Product.objects.get(pk=product_id)
+            except Product.DoesNotExist:
+                raise CommandError(f"Product {product_id} does not exist.")
+
+            try:
+                if options["enable"]:
+                    enable_stock_striping(product, stripes=options["stripes"])
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{product.name}: {product.quantity} units spread over {product.stripe_count} stripes"
+                    ))
+                else:
+                    disable_stock_striping(product)
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{product.name}: striping disabled, {product.quantity} units in stock"
+                    ))
+            except ValueError as e:
+                raise CommandError(str(e))
+            return
+
+        while True:
+            rebalanced = 0
+            for product in Product.objects.filter(stripe_count__gt=0):
+                if rebalance_stock_stripes(product):
+                    rebalanced += 1
+            self.stdout.write(f"Rebalanced {rebalanced} striped product(s)")
+
+            if not options["interval"]:
+                break
+            time.sleep(options["interval"])
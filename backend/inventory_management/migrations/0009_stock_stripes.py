@@ -0,0 +1,31 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0008_product_quantity_non_negative'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='stripe_count',
+            field=models.PositiveSmallIntegerField(default=0, help_text='Number of stock stripes for hot products (0 keeps all stock in quantity)'),
+        ),
+        migrations.CreateModel(
+            name='StockStripe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveSmallIntegerField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_stripes', to='inventory_management.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'index'), name='unique_stock_stripe_index'), models.CheckConstraint(condition=models.Q(('quantity__gte', 0)), name='stock_stripe_quantity_non_negative')],
+            },
+        ),
+    ]
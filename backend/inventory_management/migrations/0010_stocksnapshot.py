@@ -0,0 +1,26 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0009_stock_stripes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.IntegerField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory_management.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='unique_stock_snapshot_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,113 @@
+"""Convert the inventory movement table to monthly range partitions on PostgreSQL.
+
+Partitioned tables need the partition key in their primary key, so the table
+gets a composite (id, date) key while Django keeps treating ``id`` as the
+primary key; ids stay unique through the shared sequence. Existing rows are
+copied into the new table, which takes a while on large ledgers. Other
+database backends are left untouched.
+"""
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+from inventory_management.partitions import (
+    DEFAULT_PARTITION,
+    MOVEMENT_TABLE,
+    add_months,
+    ensure_month_partitions,
+    is_partitioned,
+    is_postgresql,
+    month_start,
+)
+
+UNPARTITIONED_TABLE = f"{MOVEMENT_TABLE}_unpartitioned"
+
+
+def _add_keys_and_indexes(apps, cursor, primary_key):
+    user_table = apps.get_model(settings.AUTH_USER_MODEL)._meta.db_table
+    cursor.execute(f"ALTER TABLE {MOVEMENT_TABLE} ADD PRIMARY KEY ({primary_key})")
+    cursor.execute(
+        f"ALTER TABLE {MOVEMENT_TABLE} ADD CONSTRAINT {MOVEMENT_TABLE}_product_id_fk "
+        f"FOREIGN KEY (product_id) REFERENCES inventory_management_product (id) "
+        f"DEFERRABLE INITIALLY DEFERRED"
+    )
+    cursor.execute(
+        f"ALTER TABLE {MOVEMENT_TABLE} ADD CONSTRAINT {MOVEMENT_TABLE}_user_id_fk "
+        f"FOREIGN KEY (user_id) REFERENCES {user_table} (id) "
+        f"DEFERRABLE INITIALLY DEFERRED"
+    )
+    cursor.execute(f"CREATE INDEX {MOVEMENT_TABLE}_product_id_idx ON {MOVEMENT_TABLE} (product_id)")
+    cursor.execute(f"CREATE INDEX {MOVEMENT_TABLE}_user_id_idx ON {MOVEMENT_TABLE} (user_id)")
+
+
+def partition_movements(apps, schema_editor):
+    if not is_postgresql(schema_editor.connection):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if is_partitioned(cursor):
+            return
+
+        cursor.execute(f"ALTER TABLE {MOVEMENT_TABLE} RENAME TO {UNPARTITIONED_TABLE}")
+        cursor.execute(
+            f"CREATE TABLE {MOVEMENT_TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS) "
+            f"PARTITION BY RANGE (date)"
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {MOVEMENT_TABLE} DEFAULT")
+
+        cursor.execute(f"SELECT min(date) FROM {UNPARTITIONED_TABLE}")
+        first_movement = cursor.fetchone()[0]
+        today = timezone.now().date()
+        first_month = first_movement.date() if first_movement else today
+        ensure_month_partitions(cursor, first_month, add_months(month_start(today), 3))
+
+        # Keys and indexes are built after the copy, once the old table and
+        # its index names are gone
+        cursor.execute(f"INSERT INTO {MOVEMENT_TABLE} SELECT * FROM {UNPARTITIONED_TABLE}")
+        cursor.execute(f"DROP TABLE {UNPARTITIONED_TABLE}")
+        _add_keys_and_indexes(apps, cursor, "id, date")
+
+        cursor.execute(f"CREATE SEQUENCE {MOVEMENT_TABLE}_id_seq OWNED BY {MOVEMENT_TABLE}.id")
+        cursor.execute(
+            f"SELECT setval('{MOVEMENT_TABLE}_id_seq', "
+            f"COALESCE((SELECT max(id) FROM {MOVEMENT_TABLE}), 0) + 1, false)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {MOVEMENT_TABLE} ALTER COLUMN id "
+            f"SET DEFAULT nextval('{MOVEMENT_TABLE}_id_seq')"
+        )
+
+
+def unpartition_movements(apps, schema_editor):
+    if not is_postgresql(schema_editor.connection):
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        if not is_partitioned(cursor):
+            return
+
+        cursor.execute(f"ALTER TABLE {MOVEMENT_TABLE} RENAME TO {UNPARTITIONED_TABLE}")
+        cursor.execute(f"CREATE TABLE {MOVEMENT_TABLE} (LIKE {UNPARTITIONED_TABLE})")
+        cursor.execute(f"INSERT INTO {MOVEMENT_TABLE} SELECT * FROM {UNPARTITIONED_TABLE}")
+        cursor.execute(f"DROP TABLE {UNPARTITIONED_TABLE} CASCADE")
+
+        _add_keys_and_indexes(apps, cursor, "id")
+        cursor.execute(
+            f"ALTER TABLE {MOVEMENT_TABLE} ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY"
+        )
+        cursor.execute(
+            f"SELECT setval(pg_get_serial_sequence('{MOVEMENT_TABLE}', 'id'), "
+            f"COALESCE((SELECT max(id) FROM {MOVEMENT_TABLE}), 0) + 1, false)"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0010_stocksnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_movements, unpartition_movements),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0012_hot_lookup_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStockBalance',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='archived_balance', serialize=False, to='inventory_management.product')),
+                ('quantity', models.IntegerField(default=0)),
+                ('archived_before', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedInventoryMovement',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField()),
+                ('date', models.DateTimeField()),
+                ('unit_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('movement_type', models.CharField(choices=[('IN', 'Input'), ('OUT', 'Output'), ('ADJ', 'Adjusting')], max_length=3)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_movements', to='inventory_management.product')),
+                ('user', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_inventory_movements', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'date'], name='archived_product_date_idx'), models.Index(fields=['date'], name='archived_date_idx')],
+            },
+        ),
+    ]
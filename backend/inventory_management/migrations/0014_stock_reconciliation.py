@@ -0,0 +1,42 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0013_movement_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockReconciliationRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('full', models.BooleanField(default=False, help_text='Checked every product instead of only changed ones')),
+                ('repair', models.BooleanField(default=False)),
+                ('high_water_mark', models.BigIntegerField(default=0, help_text='Movements up to this id were covered; the next run starts after it')),
+                ('products_checked', models.PositiveIntegerField(default=0)),
+                ('drift_count', models.PositiveIntegerField(default=0)),
+                ('repaired_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockDrift',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('recorded_quantity', models.IntegerField()),
+                ('expected_quantity', models.IntegerField()),
+                ('repaired', models.BooleanField(default=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_drifts', to='inventory_management.product')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='drifts', to='inventory_management.stockreconciliationrun')),
+            ],
+        ),
+    ]
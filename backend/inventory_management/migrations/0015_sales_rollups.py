@@ -0,0 +1,40 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:06
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0014_stock_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='inventory_management.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['date'], name='daily_sales_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'date'), name='unique_daily_sales_per_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MonthlySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_sales', to='inventory_management.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['month'], name='monthly_sales_month_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'month'), name='unique_monthly_sales_per_month')],
+            },
+        ),
+    ]
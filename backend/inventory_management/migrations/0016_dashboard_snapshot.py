@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:23
+
+import rest_framework.utils.encoders
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0015_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(encoder=rest_framework.utils.encoders.JSONEncoder)),
+                ('generated_at', models.DateTimeField()),
+                ('refreshing_since', models.DateTimeField(blank=True, help_text='Set while a refresh is running so only one runs at a time', null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0016_dashboard_snapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsExport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('status', models.CharField(choices=[('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='running', max_length=10)),
+                ('full', models.BooleanField(default=False, help_text='Exported every row instead of only changed ones')),
+                ('since', models.DateTimeField(blank=True, help_text='Suppliers and purchase orders updated after this time were exported', null=True)),
+                ('since_movement_id', models.BigIntegerField(default=0, help_text='Movements after this id were exported')),
+                ('high_water_mark', models.BigIntegerField(default=0, help_text='Movements up to this id were exported; the next run starts after it')),
+                ('files', models.JSONField(default=list, help_text='Written files with their table and row count')),
+                ('error', models.TextField(blank=True)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'running')), fields=('status',), name='one_running_analytics_export')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0017_analytics_export'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('generated_at', models.DateTimeField()),
+                ('start_date', models.DateField(help_text='Day of the first forecast value')),
+                ('daily', models.JSONField(help_text='Forecast units sold per day, from start_date on')),
+                ('next_7_days', models.FloatField()),
+                ('next_28_days', models.FloatField()),
+                ('fit_error', models.FloatField(help_text='Mean absolute one-day-ahead error over the history')),
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='demand_forecast', to='inventory_management.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-next_28_days'], name='forecast_next_28_days_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0018_demand_forecast'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('counters', models.JSONField(default=dict, help_text='Product id -> [estimated units sold, maximum overestimate]')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0019_sales_sketch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryValuation',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='valuation', serialize=False, to='inventory_management.product')),
+                ('quantity', models.IntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-value'], name='valuation_value_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CostLayer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('received_at', models.DateTimeField()),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.PositiveIntegerField(help_text='Units of the layer not consumed yet')),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='cost_layers', to='inventory_management.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'received_at', 'id'], name='cost_layer_fifo_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+from inventory_management.partitions import is_postgresql
+from inventory_management.search import PRODUCT_SEARCH, install_search_vector, uninstall_search_vector
+
+
+def install(apps, schema_editor):
+    if is_postgresql(schema_editor.connection):
+        with schema_editor.connection.cursor() as cursor:
+            install_search_vector(cursor, *PRODUCT_SEARCH)
+
+
+def uninstall(apps, schema_editor):
+    if is_postgresql(schema_editor.connection):
+        with schema_editor.connection.cursor() as cursor:
+            uninstall_search_vector(cursor, PRODUCT_SEARCH[0])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0020_cost_layers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,26 @@
+"""Trigram index on active product names for fuzzy autocomplete, on PostgreSQL with pg_trgm."""
+from django.db import migrations
+
+from inventory_management.partitions import is_postgresql
+from inventory_management.search import install_trigram_index, uninstall_trigram_index
+
+
+def install(apps, schema_editor):
+    if is_postgresql(schema_editor.connection):
+        install_trigram_index(schema_editor.connection)
+
+
+def uninstall(apps, schema_editor):
+    if is_postgresql(schema_editor.connection):
+        uninstall_trigram_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0021_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(install, uninstall),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0022_product_name_trigram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('stripe_count__gt', 0)), fields=['stripe_count'], name='product_striped_idx'),
+        ),
+    ]
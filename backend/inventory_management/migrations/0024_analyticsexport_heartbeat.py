@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0023_product_striped_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticsexport',
+            name='heartbeat_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, help_text='Last time the run was known to be alive'),
+        ),
+    ]
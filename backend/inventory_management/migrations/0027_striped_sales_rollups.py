@@ -0,0 +1,39 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0026_archived_date_brin'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='dailysalesrollup',
+            name='unique_daily_sales_per_day',
+        ),
+        migrations.RemoveConstraint(
+            model_name='monthlysalesrollup',
+            name='unique_monthly_sales_per_month',
+        ),
+        migrations.AddField(
+            model_name='dailysalesrollup',
+            name='stripe',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='monthlysalesrollup',
+            name='stripe',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='dailysalesrollup',
+            constraint=models.UniqueConstraint(fields=('product', 'date', 'stripe'), name='unique_daily_sales_per_stripe'),
+        ),
+        migrations.AddConstraint(
+            model_name='monthlysalesrollup',
+            constraint=models.UniqueConstraint(fields=('product', 'month', 'stripe'), name='unique_monthly_sales_per_stripe'),
+        ),
+    ]
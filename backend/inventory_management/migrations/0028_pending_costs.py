@@ -0,0 +1,29 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0027_striped_sales_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingCost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('movement_id', models.BigIntegerField(help_text='Orders movements made at the same time')),
+                ('movement_type', models.CharField(choices=[('IN', 'Input'), ('OUT', 'Output'), ('ADJ', 'Adjusting')], max_length=3)),
+                ('quantity', models.PositiveIntegerField()),
+                ('unit_cost', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('moved_at', models.DateTimeField()),
+                ('product', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='pending_costs', to='inventory_management.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product', 'moved_at', 'movement_id'], name='pending_cost_order_idx')],
+            },
+        ),
+    ]
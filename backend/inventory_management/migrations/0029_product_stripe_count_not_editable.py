@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0028_pending_costs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='product',
+            name='stripe_count',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, help_text='Number of stock stripes for hot products (0 keeps all stock in quantity)'),
+        ),
+    ]
@@ -1,6 +1,54 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models, transaction
 from django.core.validators import MinValueValidator
 from django.conf import settings 
+from django.db.models import Case, F, OuterRef, Q, Subquery, Sum, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+from .report_cache import bump_catalog_version, bump_inventory_version
+
+
+# Stock level at or below which a product counts as low stock
+LOW_STOCK_THRESHOLD = 10
+
+
+def low_stock_condition(threshold: int = LOW_STOCK_THRESHOLD) -> Q:
+    """The ProductQuerySet.low_stock filter, to count low stock products in an aggregate too."""
+    striped_low = (
+        StockStripe.objects.values("product")
+        .annotate(total=Sum("quantity"))
+        .filter(total__lte=threshold)
+        .values("product")
+    )
+    return Q(stripe_count=0, quantity__lte=threshold) | Q(stripe_count__gt=0, pk__in=striped_low)
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_stock(self):
+        """Annotate ``stock``: the sum of the stripes for striped products, else ``quantity``."""
+        stripe_total = (
+            StockStripe.objects.filter(product=OuterRef("pk"))
+            .values("product")
+            .annotate(total=Sum("quantity"))
+            .values("total")
+        )
+        return self.annotate(
+            stock=Case(
+                When(stripe_count__gt=0, then=Coalesce(Subquery(stripe_total), 0)),
+                default=F("quantity"),
+            )
+        )
+
+    def low_stock(self, threshold: int = LOW_STOCK_THRESHOLD):
+        """
+        Products whose stock, summed over the stripes for striped products,
+        is at most ``threshold``. Unlike filtering on ``with_stock()``, each
+        branch can be served by a partial index.
+        """
+        return self.filter(low_stock_condition(threshold))
 
 
 class Product(models.Model):
@@ -9,11 +57,82 @@ class Product(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     quantity = models.IntegerField(validators=[MinValueValidator(0)], default=0)
     is_active = models.BooleanField(default=True)
+    # Not touched by stock updates, which only save the stock fields
+    updated_at = models.DateTimeField(auto_now=True)
+    # Only changed with its stripes, by the striping services
+    stripe_count = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        help_text="Number of stock stripes for hot products (0 keeps all stock in quantity)"
+    )
+    # Kept up to date by a database trigger on PostgreSQL, see search
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = ProductQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(quantity__gte=0),
+                name="product_quantity_non_negative",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["is_active", "quantity"], name="product_active_quantity_idx"),
+            models.Index(
+                fields=["quantity"],
+                condition=models.Q(quantity__lte=LOW_STOCK_THRESHOLD),
+                name="product_low_stock_idx",
+            ),
+            # Few products are striped; lets low_stock() find them without a scan
+            models.Index(
+                fields=["stripe_count"],
+                condition=models.Q(stripe_count__gt=0),
+                name="product_striped_idx",
+            ),
+            # The autocomplete indexes poll the latest product change
+            models.Index(fields=["updated_at"], name="product_updated_at_idx"),
+        ]
+
+    @property
+    def current_quantity(self):
+        """Stock on hand; for striped products quantity is only refreshed by rebalancing."""
+        if not self.stripe_count:
+            return self.quantity
+        return sum(stripe.quantity for stripe in self.stock_stripes.all())
 
     def __str__(self):
         return self.name
 
 
+class StockStripe(models.Model):
+    """A slice of a striped product's stock.
+
+    Writers on hot products pick a random stripe, so concurrent movements lock
+    different rows instead of queueing on the product row.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_stripes"
+    )
+    index = models.PositiveSmallIntegerField()
+    quantity = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "index"], name="unique_stock_stripe_index"
+            ),
+            models.CheckConstraint(
+                condition=models.Q(quantity__gte=0),
+                name="stock_stripe_quantity_non_negative",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - stripe {self.index}: {self.quantity}"
+
+
 class InventoryMovement(models.Model):
     product = models.ForeignKey(
         Product, on_delete=models.CASCADE, related_name="movements"
@@ -51,6 +170,13 @@ class InventoryMovement(models.Model):
         default=MOVEMENT_INPUT,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["date"], name="movement_date_idx"),
+            models.Index(fields=["movement_type", "date"], name="movement_type_date_idx"),
+            models.Index(fields=["product", "date"], name="movement_product_date_idx"),
+        ]
+
     @property
     def total_value(self):
         """Calculate total value of the movement"""
@@ -62,3 +188,381 @@ class InventoryMovement(models.Model):
         user_info = f" by {self.user.username}" if self.user else ""
         price_info = f" at ${self.unit_price}" if self.unit_price else ""
         return f"{self.product.name} - {self.get_movement_type_display()} - {self.quantity}{price_info}{user_info}"
+
+
+class StockSnapshot(models.Model):
+    """Stock of a product at the end of a day (UTC).
+
+    Snapshots are only written for days that had movements, so the latest
+    snapshot before a moment plus the movements after it gives the stock at
+    that moment without replaying the whole ledger.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_snapshots"
+    )
+    date = models.DateField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "date"], name="unique_stock_snapshot_per_day"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.date}: {self.quantity}"
+
+
+class ArchivedInventoryMovement(models.Model):
+    """An old inventory movement moved out of the live ledger.
+
+    Columns mirror InventoryMovement in the same order so both tables can be
+    read together with a UNION; ids are kept from the live table.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.CASCADE,
+        related_name="archived_movements",
+        db_index=False,
+    )
+    quantity = models.IntegerField()
+    date = models.DateTimeField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="archived_inventory_movements",
+        db_index=False,
+    )
+    movement_type = models.CharField(
+        max_length=3, choices=InventoryMovement.MOVEMENT_TYPE_CHOICES
+    )
+
+    class Meta:
+        # On PostgreSQL date ranges use a BRIN index instead (migration 0026):
+        # rows are archived oldest first, so a few kB summarize millions of them
+        indexes = [
+            models.Index(fields=["product", "date"], name="archived_product_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.get_movement_type_display()} - {self.quantity} (archived)"
+
+
+class ArchivedStockBalance(models.Model):
+    """Stock carried forward from a product's archived movements.
+
+    Every movement of the product dated before ``archived_before`` lives in
+    the archive, so replaying the live ledger from here gives exact stock.
+    """
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="archived_balance",
+    )
+    quantity = models.IntegerField(default=0)
+    archived_before = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product.name}: {self.quantity} before {self.archived_before}"
+
+
+class DailySalesRollup(models.Model):
+    """Units sold (OUT movements) of a product on one day, kept in step with the ledger.
+
+    Sales of a striped product are spread over up to ``stripe_count`` rows
+    per day, so concurrent sales do not queue on one row; readers sum them.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="daily_sales", db_index=False
+    )
+    date = models.DateField()
+    stripe = models.PositiveSmallIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "date", "stripe"], name="unique_daily_sales_per_stripe"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["date"], name="daily_sales_date_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.date} - {self.quantity} sold"
+
+
+class MonthlySalesRollup(models.Model):
+    """Units sold (OUT movements) of a product in one calendar month, striped like the daily rollup."""
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="monthly_sales", db_index=False
+    )
+    month = models.DateField(help_text="First day of the month")
+    stripe = models.PositiveSmallIntegerField(default=0)
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "month", "stripe"], name="unique_monthly_sales_per_stripe"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["month"], name="monthly_sales_month_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.month:%Y-%m} - {self.quantity} sold"
+
+
+class StockReconciliationRun(models.Model):
+    """One run of the stock reconciliation engine."""
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    full = models.BooleanField(default=False, help_text="Checked every product instead of only changed ones")
+    repair = models.BooleanField(default=False)
+    high_water_mark = models.BigIntegerField(
+        default=0,
+        help_text="Movements up to this id were covered; the next run starts after it"
+    )
+    products_checked = models.PositiveIntegerField(default=0)
+    drift_count = models.PositiveIntegerField(default=0)
+    repaired_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-started_at"]
+
+    def __str__(self):
+        return f"Reconciliation #{self.pk} - {self.products_checked} checked, {self.drift_count} drifted"
+
+
+class StockDrift(models.Model):
+    """A product whose recorded stock did not match its movement ledger."""
+
+    run = models.ForeignKey(
+        StockReconciliationRun, on_delete=models.CASCADE, related_name="drifts"
+    )
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="stock_drifts"
+    )
+    recorded_quantity = models.IntegerField()
+    expected_quantity = models.IntegerField()
+    repaired = models.BooleanField(default=False)
+
+    def __str__(self):
+        return f"{self.product.name}: {self.recorded_quantity} recorded, {self.expected_quantity} expected"
+
+
+class DashboardSnapshot(models.Model):
+    """Precomputed payload of the unfiltered reports dashboard, kept in a single row."""
+
+    # Stored exactly as the API renders it
+    payload = models.JSONField(encoder=JSONEncoder)
+    generated_at = models.DateTimeField()
+    refreshing_since = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Set while a refresh is running so only one runs at a time"
+    )
+
+    def __str__(self):
+        return f"Dashboard generated at {self.generated_at:%Y-%m-%d %H:%M:%S}"
+
+
+class SalesSketch(models.Model):
+    """Persisted heavy-hitters summary of one day's sales, see heavy_hitters."""
+
+    date = models.DateField(unique=True)
+    counters = models.JSONField(
+        default=dict,
+        help_text="Product id -> [estimated units sold, maximum overestimate]"
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Sales sketch {self.date} - {len(self.counters)} products"
+
+
+class DemandForecast(models.Model):
+    """Latest demand forecast of an active product, refreshed nightly by refresh_forecasts."""
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, related_name="demand_forecast"
+    )
+    generated_at = models.DateTimeField()
+    start_date = models.DateField(help_text="Day of the first forecast value")
+    daily = models.JSONField(help_text="Forecast units sold per day, from start_date on")
+    next_7_days = models.FloatField()
+    next_28_days = models.FloatField()
+    fit_error = models.FloatField(help_text="Mean absolute one-day-ahead error over the history")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-next_28_days"], name="forecast_next_28_days_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.next_28_days:.1f} units in 28 days"
+
+
+class AnalyticsExport(models.Model):
+    """One run of the Parquet export read by analysts."""
+
+    STATUS_RUNNING = "running"
+    STATUS_SUCCEEDED = "succeeded"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_RUNNING, "Running"),
+        (STATUS_SUCCEEDED, "Succeeded"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    heartbeat_at = models.DateTimeField(default=timezone.now, help_text="Last time the run was known to be alive")
+    finished_at = models.DateTimeField(null=True, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_RUNNING)
+    full = models.BooleanField(default=False, help_text="Exported every row instead of only changed ones")
+    since = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Suppliers and purchase orders updated after this time were exported"
+    )
+    since_movement_id = models.BigIntegerField(
+        default=0,
+        help_text="Movements after this id were exported"
+    )
+    high_water_mark = models.BigIntegerField(
+        default=0,
+        help_text="Movements up to this id were exported; the next run starts after it"
+    )
+    files = models.JSONField(default=list, help_text="Written files with their table and row count")
+    error = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ["-started_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["status"],
+                condition=models.Q(status="running"),
+                name="one_running_analytics_export",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Analytics export #{self.pk} - {self.status}"
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender="suppliers.Supplier")
+@receiver(post_delete, sender="suppliers.Supplier")
+@receiver(post_save, sender="purchasing.PurchaseOrder")
+@receiver(post_delete, sender="purchasing.PurchaseOrder")
+@receiver(post_save, sender="purchasing.PurchaseOrderItem")
+@receiver(post_delete, sender="purchasing.PurchaseOrderItem")
+@receiver(m2m_changed, sender="suppliers.Supplier_products")
+def invalidate_cached_reports(sender, **kwargs):
+    """
+    Products, suppliers and purchase orders all feed the report KPIs, and
+    the version also validates the conditional GETs of their endpoints.
+    """
+    bump_inventory_version()
+
+
+# Product fields the autocomplete index is built from
+CATALOG_FIELDS = {"name", "is_active"}
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_catalog(sender, update_fields=None, **kwargs):
+    """Rebuild the autocomplete indexes, unless only stock fields were saved."""
+    if update_fields is None or CATALOG_FIELDS & set(update_fields):
+        bump_catalog_version()
+
+
+class CostLayer(models.Model):
+    """Units received at one unit cost that are still in stock, consumed oldest first.
+
+    Only kept under FIFO costing. There is no foreign key to the movement
+    that created the layer, so archiving the ledger never touches layers.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="cost_layers", db_index=False
+    )
+    received_at = models.DateTimeField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.PositiveIntegerField(help_text="Units of the layer not consumed yet")
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "received_at", "id"], name="cost_layer_fifo_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.quantity} at {self.unit_cost}"
+
+
+class InventoryValuation(models.Model):
+    """Units and value of a product's stock under the costing method, kept in step with the ledger."""
+
+    product = models.OneToOneField(
+        Product,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="valuation",
+    )
+    quantity = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-value"], name="valuation_value_idx"),
+        ]
+
+    @property
+    def average_cost(self):
+        return self.value / self.quantity if self.quantity else None
+
+    def __str__(self):
+        return f"{self.product.name}: {self.quantity} units worth {self.value:.2f}"
+
+
+class PendingCost(models.Model):
+    """A movement of a striped product that is not in its valuation yet.
+
+    Queued in the movement's transaction and applied once it commits, see
+    valuation.py. Like CostLayer it keeps what costing needs instead of a
+    foreign key to the movement, so archiving the ledger never touches it.
+    """
+
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="pending_costs", db_index=False
+    )
+    movement_id = models.BigIntegerField(help_text="Orders movements made at the same time")
+    movement_type = models.CharField(max_length=3, choices=InventoryMovement.MOVEMENT_TYPE_CHOICES)
+    quantity = models.PositiveIntegerField()
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2)
+    moved_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "moved_at", "movement_id"], name="pending_cost_order_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.product.name} - {self.get_movement_type_display()} - {self.quantity} not valued yet"
@@ -0,0 +1,95 @@
+"""PostgreSQL monthly range partitioning of the inventory movement table.
+
+The movement table is partitioned by month on ``date`` so date-range filters
+and monthly reports only scan the partitions they need. Rows outside every
+monthly partition land in a default partition until their month is created.
+Everything here is a no-op on other database backends.
+"""
+from datetime import date
+
+MOVEMENT_TABLE = "inventory_management_inventorymovement"
+DEFAULT_PARTITION = f"{MOVEMENT_TABLE}_default"
+
+
+def is_postgresql(connection):
+    return connection.vendor == "postgresql"
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(day, months):
+    month_index = day.year * 12 + day.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{MOVEMENT_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def _bound(month):
+    # Interpolated as a literal: DDL statements can not take bind parameters
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+
+def is_partitioned(cursor):
+    cursor.execute(
+        "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+        [MOVEMENT_TABLE],
+    )
+    return cursor.fetchone() is not None
+
+
+def existing_partitions(cursor):
+    cursor.execute(
+        """
+        SELECT child.relname FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = %s::regclass
+        """,
+        [MOVEMENT_TABLE],
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def create_month_partition(cursor, month):
+    """
+    Create the partition for one month; returns False if it already exists.
+
+    Rows for that month that already landed in the default partition are
+    moved into the new partition before it is attached. Must run inside a
+    transaction.
+    """
+    name = partition_name(month)
+    if name in existing_partitions(cursor):
+        return False
+
+    start, end = _bound(month), _bound(add_months(month, 1))
+    cursor.execute(
+        f"CREATE TABLE {name} (LIKE {MOVEMENT_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    )
+    cursor.execute(
+        f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE date >= {start} AND date < {end}
+            RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved
+        """
+    )
+    cursor.execute(
+        f"ALTER TABLE {MOVEMENT_TABLE} ATTACH PARTITION {name} FOR VALUES FROM ({start}) TO ({end})"
+    )
+    return True
+
+
+def ensure_month_partitions(cursor, first_month, last_month):
+    """Create every missing monthly partition between two months, inclusive."""
+    created = []
+    month = month_start(first_month)
+    while month <= last_month:
+        if create_month_partition(cursor, month):
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
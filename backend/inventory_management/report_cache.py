@@ -0,0 +1,144 @@
+"""
+Versioned cache for inventory report responses.
+
+Every write that can change a report bumps a global inventory version.
+Cached reports are keyed by the version they were computed at, so a bump
+makes all older entries unreachable without having to find and delete them;
+they simply expire.
+
+A separate catalog version only moves when product names or active flags
+may have changed; the autocomplete index is rebuilt from it.
+"""
+import time
+from functools import partial
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+
+REPORTS_CACHE = "reports"
+VERSION_KEY = "inventory:version"
+CATALOG_VERSION_KEY = "inventory:catalog:version"
+HITS_KEY = "inventory:reports:hits"
+MISSES_KEY = "inventory:reports:misses"
+
+
+def _cache():
+    return caches[REPORTS_CACHE]
+
+
+def is_shared() -> bool:
+    """Whether every worker process sees the same reports cache, and so the same versions."""
+    return not isinstance(_cache(), (LocMemCache, DummyCache))
+
+
+@checks.register(checks.Tags.caches)
+def check_shared_cache(app_configs=None, **kwargs):
+    """Outside DEBUG, warn when workers would each keep their own inventory version."""
+    if settings.DEBUG or is_shared():
+        return []
+    return [
+        checks.Warning(
+            "The reports cache is not shared between worker processes, so each worker "
+            "serves reports up to its TIMEOUT old after writes made by the others.",
+            hint="Set REPORTS_CACHE_BACKEND to a file, Redis or Memcached cache.",
+            id="inventory_management.W001",
+        )
+    ]
+
+
+def _new_version(key: str = VERSION_KEY) -> None:
+    # A timestamp instead of an increment: concurrent bumps can not collapse
+    # into the same value, even on backends without an atomic incr.
+    _cache().set(key, time.time_ns(), timeout=None)
+
+
+def _get_version(key: str) -> int:
+    cache = _cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def increment_counter(key: str) -> None:
+    """Add one to a counter kept in the reports cache."""
+    cache = _cache()
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # Evicted between add and incr; losing one count is fine
+        pass
+
+
+def get_inventory_version() -> int:
+    """Current global inventory version."""
+    return _get_version(VERSION_KEY)
+
+
+def bump_inventory_version() -> None:
+    """
+    Invalidate every cached report. Call from any write that changes data a
+    report shows.
+
+    The version moves immediately, so the writing request never reads an old
+    report, and again when the transaction commits, so a report computed by
+    another request while the transaction was still open is not kept.
+    """
+    _new_version()
+    transaction.on_commit(_new_version)
+
+
+def get_catalog_version() -> int:
+    """Current version of the product names and active flags."""
+    return _get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version() -> None:
+    """Mark the product catalog changed, now and again on commit like bump_inventory_version."""
+    _new_version(CATALOG_VERSION_KEY)
+    transaction.on_commit(partial(_new_version, CATALOG_VERSION_KEY))
+
+
+def report_cache_key(params: dict) -> str:
+    """Cache key for a report with the given query parameters."""
+    # Today is part of the key because the month and due-date KPIs depend on it
+    query = urlencode(sorted(params.items()))
+    return f"inventory:reports:{get_inventory_version()}:{timezone.localdate()}:{query}"
+
+
+def get_cached_report(key: str):
+    """Cached payload for ``key`` or None, counting the hit or miss."""
+    payload = _cache().get(key)
+    increment_counter(MISSES_KEY if payload is None else HITS_KEY)
+    return payload
+
+
+def peek_cached_report(key: str):
+    """Cached payload for ``key`` or None, without counting a lookup."""
+    return _cache().get(key)
+
+
+def cache_report(key: str, payload: dict) -> None:
+    _cache().set(key, payload)
+
+
+def report_cache_stats() -> dict:
+    """Hit and miss counters of the report cache, and the current version."""
+    cache = _cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        "version": get_inventory_version(),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": round(hits / lookups, 4) if lookups else None,
+    }
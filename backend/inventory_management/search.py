@@ -0,0 +1,139 @@
+"""
+PostgreSQL full-text search for the catalog endpoints.
+
+Searchable tables get a stored ``search_vector`` column that a trigger
+rebuilds from the weighted text columns whenever one of them is written,
+so bulk inserts and queryset updates keep it current too, plus a GIN index
+on it. FullTextSearchFilter matches the ``search`` parameter against that
+column and orders the results by rank. Every search word matches as a
+prefix, so typing "lapt" finds "laptop".
+
+On other database backends the column stays empty and the filter falls
+back to DRF's SearchFilter over the view's ``search_fields``.
+
+Product names also get a pg_trgm trigram index when the extension can be
+installed; autocomplete uses it for fuzzy matches.
+"""
+import logging
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from rest_framework import filters
+
+logger = logging.getLogger(__name__)
+
+# No stemming or stop words: names, codes and mixed-language descriptions
+# are matched as written
+SEARCH_CONFIG = "simple"
+SEARCH_RANK = "search_rank"
+
+# (table, [(column, weight)]) of every searchable table
+PRODUCT_SEARCH = (
+    "inventory_management_product",
+    [("name", "A"), ("description", "B")],
+)
+TRIGRAM_INDEX = "product_name_trgm_idx"
+SUPPLIER_SEARCH = (
+    "suppliers_supplier",
+    [("name", "A"), ("tax_id", "A"), ("contact_person", "B"), ("email", "C")],
+)
+
+
+def _vector_sql(columns, row=""):
+    # Hyphens become spaces, or "NIT-801" would be indexed as "nit" and the
+    # negative number "-801", which a search for "801" does not match
+    return " || ".join(
+        f"setweight(to_tsvector('{SEARCH_CONFIG}', translate(coalesce({row}{column}, ''), '-', ' ')), '{weight}')"
+        for column, weight in columns
+    )
+
+
+def install_search_vector(cursor, table, columns) -> None:
+    """Create the trigger and GIN index of a table's search_vector and fill it."""
+    cursor.execute(
+        f"CREATE OR REPLACE FUNCTION {table}_search_vector() RETURNS trigger AS $$ "
+        f"BEGIN NEW.search_vector := {_vector_sql(columns, 'NEW.')}; RETURN NEW; END "
+        f"$$ LANGUAGE plpgsql"
+    )
+    cursor.execute(
+        f"CREATE TRIGGER {table}_search_vector BEFORE INSERT OR UPDATE OF "
+        f"{', '.join(column for column, _ in columns)} ON {table} "
+        f"FOR EACH ROW EXECUTE FUNCTION {table}_search_vector()"
+    )
+    cursor.execute(f"UPDATE {table} SET search_vector = {_vector_sql(columns)}")
+    cursor.execute(f"CREATE INDEX {table}_search_idx ON {table} USING gin (search_vector)")
+
+
+def uninstall_search_vector(cursor, table) -> None:
+    cursor.execute(f"DROP INDEX IF EXISTS {table}_search_idx")
+    cursor.execute(f"DROP TRIGGER IF EXISTS {table}_search_vector ON {table}")
+    cursor.execute(f"DROP FUNCTION IF EXISTS {table}_search_vector()")
+
+
+def install_trigram_index(connection) -> bool:
+    """
+    Create pg_trgm and a trigram index on the names of active products.
+    Installing the extension needs its files on the server (it ships in
+    postgresql-contrib); without them this logs a warning and returns False.
+    """
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as exc:
+        logger.warning("pg_trgm is not available, autocomplete will not fuzzy match: %s", exc)
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {TRIGRAM_INDEX} ON {PRODUCT_SEARCH[0]} "
+            f"USING gin (name gin_trgm_ops) WHERE is_active"
+        )
+    return True
+
+
+def uninstall_trigram_index(connection) -> None:
+    # The extension stays, something else may use it
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP INDEX IF EXISTS {TRIGRAM_INDEX}")
+
+
+def has_trigram(connection) -> bool:
+    """Whether fuzzy matching with pg_trgm is available on ``connection``."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        return cursor.fetchone() is not None
+
+
+def search_query(terms):
+    """
+    A prefix query requiring every word of ``terms``, or None when they
+    hold no words. Only letters and digits are kept, so user input can
+    never break the tsquery syntax.
+    """
+    words = [word for term in terms for word in re.findall(r"[^\W_]+", term)]
+    if not words:
+        return None
+    return SearchQuery(" & ".join(f"{word}:*" for word in words), search_type="raw", config=SEARCH_CONFIG)
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter replacement that searches the indexed ``search_vector`` on
+    PostgreSQL, best matches first. An explicit ``ordering`` parameter still
+    wins when OrderingFilter runs after it.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        if connection.vendor != "postgresql":
+            return super().filter_queryset(request, queryset, view)
+        query = search_query(self.get_search_terms(request))
+        if query is None:
+            return queryset
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(**{SEARCH_RANK: SearchRank(F("search_vector"), query)})
+            .order_by(f"-{SEARCH_RANK}", "pk")
+        )
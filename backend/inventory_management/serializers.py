@@ -1,11 +1,12 @@
 from rest_framework import serializers
-from .models import Product, InventoryMovement
+from .models import Product, InventoryMovement, StockReconciliationRun, StockDrift, AnalyticsExport, DemandForecast, InventoryValuation
 from decimal import Decimal
 from .services import create_inventory_movement
 from django.db import transaction
 
 
 class ProductSerializer(serializers.ModelSerializer):
+    quantity = serializers.IntegerField(source="current_quantity", read_only=True)
     initial_quantity = serializers.IntegerField(
         write_only=True,
         required=False,
@@ -62,6 +63,16 @@ class ProductSerializer(serializers.ModelSerializer):
         product.refresh_from_db()  # Ensure the product has the latest data
         return product
 
+    def update(self, instance, validated_data):
+        validated_data.pop("initial_quantity", None)
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        # Only write the edited columns so a concurrent movement's stock
+        # update is never overwritten with a stale quantity. updated_at is
+        # listed too: other workers' autocomplete indexes are stamped with it.
+        instance.save(update_fields=[*validated_data, "updated_at"])
+        return instance
+
 
 class InventoryMovementSerializer(serializers.ModelSerializer):
     product_name = serializers.CharField(source="product.name", read_only=True)
@@ -117,4 +128,96 @@ class InventoryMovementSerializer(serializers.ModelSerializer):
         except ValueError as e:
             raise serializers.ValidationError(
                 f"Error creating inventory movement: {str(e)}"
-            )
\ No newline at end of file
+            )
+
+
+class InventoryMovementBulkItemSerializer(serializers.Serializer):
+    """Validates a single row of a bulk movement request.
+
+    Product existence and status are checked by the bulk service in one
+    query for the whole batch instead of once per row.
+    """
+
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+    movement_type = serializers.ChoiceField(choices=InventoryMovement.MOVEMENT_TYPE_CHOICES)
+    unit_price = serializers.DecimalField(
+        max_digits=10, decimal_places=2, required=False, allow_null=True
+    )
+
+
+class StockDriftSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source="product.name", read_only=True)
+
+    class Meta:
+        model = StockDrift
+        fields = ["product", "product_name", "recorded_quantity", "expected_quantity", "repaired"]
+
+
+class StockReconciliationRunSerializer(serializers.ModelSerializer):
+    drifts = StockDriftSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = StockReconciliationRun
+        fields = [
+            "id",
+            "started_at",
+            "finished_at",
+            "full",
+            "repair",
+            "high_water_mark",
+            "products_checked",
+            "drift_count",
+            "repaired_count",
+            "drifts",
+        ]
+
+
+class AnalyticsExportSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AnalyticsExport
+        fields = [
+            "id",
+            "started_at",
+            "finished_at",
+            "status",
+            "full",
+            "since",
+            "since_movement_id",
+            "high_water_mark",
+            "files",
+            "error",
+        ]
+
+
+class DemandForecastSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source="product.name", read_only=True)
+
+    class Meta:
+        model = DemandForecast
+        fields = [
+            "product",
+            "product_name",
+            "generated_at",
+            "start_date",
+            "daily",
+            "next_7_days",
+            "next_28_days",
+            "fit_error",
+        ]
+
+
+class InventoryValuationSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source="product.name", read_only=True)
+    value = serializers.DecimalField(max_digits=16, decimal_places=2, read_only=True)
+    average_cost = serializers.DecimalField(max_digits=16, decimal_places=4, read_only=True)
+
+    class Meta:
+        model = InventoryValuation
+        fields = [
+            "product",
+            "product_name",
+            "quantity",
+            "value",
+            "average_cost",
+        ]
@@ -1,7 +1,321 @@
-from django.db import transaction
-from .models import Product, InventoryMovement
+import heapq
+import multiprocessing
+import random
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+
+from functools import partial
+
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F, Max, Min, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import (
+    Product,
+    InventoryMovement,
+    StockStripe,
+    StockSnapshot,
+    ArchivedInventoryMovement,
+    ArchivedStockBalance,
+    StockReconciliationRun,
+    StockDrift,
+    DailySalesRollup,
+    MonthlySalesRollup,
+    CostLayer,
+    InventoryValuation,
+    PendingCost,
+)
+from .report_cache import bump_inventory_version
+from .heavy_hitters import record_sales as record_sketch_sales
+from .valuation import FIFO, ProductCosts, apply_pending_costs, costing_method, record_costs, save_costs
 from django.contrib.auth.models import User
 
+
+def _apply_movement(product: Product, current_quantity: int, quantity: int, movement_type: str) -> int:
+    """
+    Compute the stock level that results from applying a movement.
+
+    Args:
+        product (Product): The product being moved (used for error messages)
+        current_quantity (int): Stock level before the movement
+        quantity (int): Quantity to move
+        movement_type (str): Type of movement (IN, OUT, ADJ)
+
+    Returns:
+        int: Stock level after the movement
+    """
+    if movement_type == InventoryMovement.MOVEMENT_INPUT:
+        return current_quantity + quantity
+    if movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+        if current_quantity < quantity:
+            raise ValueError(
+                f"Insufficient stock of {product.name} for output movement."
+            )
+        return current_quantity - quantity
+    if movement_type == InventoryMovement.MOVEMENT_ADJUSTMENT:
+        return quantity
+    raise ValueError(f"Invalid movement type: {movement_type}")
+
+
+def _update_stock(product: Product, quantity: int, movement_type: str) -> None:
+    """
+    Apply a movement to the product's stock directly in the database.
+
+    OUT movements only match the row while it still holds enough stock, so
+    two concurrent writers can not both pass the check on the same units.
+    The in-memory product is refreshed with the resulting quantity.
+
+    ``product.stripe_count`` may be stale when striping was enabled or
+    disabled since the product was loaded. Each path only matches rows in
+    the layout it expects, and when nothing matched the stripe count is
+    read again and the movement retried on the other path.
+    """
+    if movement_type not in (
+        InventoryMovement.MOVEMENT_INPUT,
+        InventoryMovement.MOVEMENT_OUTPUT,
+        InventoryMovement.MOVEMENT_ADJUSTMENT,
+    ):
+        raise ValueError(f"Invalid movement type: {movement_type}")
+
+    # Striping can only flip so many times while one movement is written
+    for _ in range(3):
+        if product.stripe_count:
+            if _update_striped_stock(product, quantity, movement_type):
+                return
+        elif _update_product_stock(product, quantity, movement_type):
+            return
+        stripe_count = Product.objects.filter(pk=product.pk).values_list("stripe_count", flat=True).first()
+        if stripe_count is None:
+            raise ValueError(f"Product {product.name} does not exist.")
+        product.stripe_count = stripe_count
+    raise ValueError(f"Stock of {product.name} was restriped during the movement, try again.")
+
+
+def _update_product_stock(product: Product, quantity: int, movement_type: str) -> bool:
+    """
+    Apply a movement to ``Product.quantity`` of an unstriped product.
+
+    Returns:
+        bool: False when the product is striped (or gone) after all
+    """
+    products = Product.objects.filter(pk=product.pk, stripe_count=0)
+    if movement_type == InventoryMovement.MOVEMENT_INPUT:
+        updated = products.update(quantity=F("quantity") + quantity)
+    elif movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+        updated = products.filter(quantity__gte=quantity).update(
+            quantity=F("quantity") - quantity
+        )
+        if not updated and products.exists():
+            raise ValueError(
+                f"Insufficient stock of {product.name} for output movement."
+            )
+    else:
+        updated = products.update(quantity=quantity)
+
+    if not updated:
+        return False
+    product.refresh_from_db(fields=["quantity"])
+    return True
+
+
+def _spread(total: int, count: int) -> list:
+    """Split a stock total into ``count`` stripe quantities that differ by at most one."""
+    base, remainder = divmod(total, count)
+    return [base + 1 if index < remainder else base for index in range(count)]
+
+
+def _lock_stripes(product: Product) -> list:
+    """Lock every stripe of a product, always in index order to avoid deadlocks."""
+    return list(
+        StockStripe.objects.select_for_update()
+        .filter(product=product)
+        .order_by("index")
+    )
+
+
+def _set_stripes(stripes: list, total: int) -> None:
+    """Spread a new total across stripes the caller has already locked."""
+    for stripe, quantity in zip(stripes, _spread(total, len(stripes))):
+        stripe.quantity = quantity
+    StockStripe.objects.bulk_update(stripes, ["quantity"])
+
+
+def _update_striped_stock(product: Product, quantity: int, movement_type: str) -> bool:
+    """
+    Apply a movement to a striped product.
+
+    IN and OUT movements touch a single randomly chosen stripe. An OUT movement
+    takes a stripe no other writer holds; when none of those can cover it, it
+    falls back to locking all stripes and draining them together. ADJ
+    movements always take that path.
+
+    Returns:
+        bool: False when the product has no stripe at the chosen index (it
+        was restriped or unstriped since it was loaded)
+    """
+    stripes = StockStripe.objects.filter(product=product)
+    if movement_type == InventoryMovement.MOVEMENT_INPUT:
+        if not stripes.filter(index=random.randrange(product.stripe_count)).update(
+            quantity=F("quantity") + quantity
+        ):
+            return False
+    elif movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+        # Never wait on a busy stripe here: an UPDATE that waits for one keeps
+        # it locked even when it then turns out short, and two writers holding
+        # each other's stripes that way deadlock
+        free = (
+            stripes.select_for_update(skip_locked=True)
+            .filter(quantity__gte=quantity)
+            .order_by("?")
+            .values_list("pk", flat=True)
+            .first()
+        )
+        if free is not None:
+            StockStripe.objects.filter(pk=free).update(quantity=F("quantity") - quantity)
+        else:
+            locked = _lock_stripes(product)
+            if not locked:
+                return False
+            if sum(stripe.quantity for stripe in locked) < quantity:
+                raise ValueError(
+                    f"Insufficient stock of {product.name} for output movement."
+                )
+            remaining = quantity
+            for stripe in locked:
+                taken = min(stripe.quantity, remaining)
+                stripe.quantity -= taken
+                remaining -= taken
+            StockStripe.objects.bulk_update(locked, ["quantity"])
+    else:
+        locked = _lock_stripes(product)
+        if not locked:
+            return False
+        _set_stripes(locked, quantity)
+
+    product.quantity = stripes.aggregate(total=Sum("quantity"))["total"] or 0
+    return True
+
+
+@transaction.atomic
+def enable_stock_striping(product: Product, stripes: int = 8) -> Product:
+    """
+    Spread a product's stock across ``stripes`` rows for high write concurrency.
+
+    Calling it on an already striped product re-stripes it with the new count.
+
+    Args:
+        product (Product): The hot product
+        stripes (int): Number of stripe rows to create
+
+    Returns:
+        Product: The product with its new stripe count
+    """
+    if stripes < 1:
+        raise ValueError("A striped product needs at least one stripe.")
+
+    locked = Product.objects.select_for_update().get(pk=product.pk)
+    total = locked.quantity
+    if locked.stripe_count:
+        total = sum(stripe.quantity for stripe in _lock_stripes(locked))
+        locked.stock_stripes.all().delete()
+
+    StockStripe.objects.bulk_create([
+        StockStripe(product=locked, index=index, quantity=quantity)
+        for index, quantity in enumerate(_spread(total, stripes))
+    ])
+    Product.objects.filter(pk=locked.pk).update(stripe_count=stripes, quantity=total)
+    product.stripe_count = stripes
+    product.quantity = total
+    return product
+
+
+@transaction.atomic
+def disable_stock_striping(product: Product) -> Product:
+    """Fold a striped product's stock back into ``Product.quantity``."""
+    locked = Product.objects.select_for_update().get(pk=product.pk)
+    total = sum(stripe.quantity for stripe in _lock_stripes(locked))
+    # Its next movements are valued right away, after the queued ones
+    apply_pending_costs([locked.pk], wait=True)
+    locked.stock_stripes.all().delete()
+    Product.objects.filter(pk=locked.pk).update(stripe_count=0, quantity=total)
+    product.stripe_count = 0
+    product.quantity = total
+    return product
+
+
+@transaction.atomic
+def rebalance_stock_stripes(product: Product) -> bool:
+    """
+    Even out a striped product's stripes when one of them runs low.
+
+    A stripe is low when it holds less than half of its fair share. The cached
+    total in ``Product.quantity`` is refreshed either way so filters on it stay
+    close to the real stock.
+
+    Returns:
+        bool: True if the stripes were redistributed
+    """
+    Product.objects.select_for_update().filter(pk=product.pk).first()
+    stripes = _lock_stripes(product)
+    if not stripes:
+        return False
+
+    total = sum(stripe.quantity for stripe in stripes)
+    quantities = [stripe.quantity for stripe in stripes]
+    rebalanced = (
+        min(quantities) * 2 * len(stripes) < total
+        and max(quantities) - min(quantities) > 1
+    )
+    if rebalanced:
+        _set_stripes(stripes, total)
+
+    Product.objects.filter(pk=product.pk).exclude(quantity=total).update(quantity=total)
+    product.quantity = total
+    return rebalanced
+
+
+def _increment_rollup(model, lookup: dict, quantity: int) -> None:
+    """Add to one rollup row, creating it if this is its first sale."""
+    if model.objects.filter(**lookup).update(quantity=F("quantity") + quantity):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(quantity=quantity, **lookup)
+    except IntegrityError:
+        # A concurrent writer created the row first
+        model.objects.filter(**lookup).update(quantity=F("quantity") + quantity)
+
+
+def _record_sales(sales: dict, stripe_counts: dict = None) -> None:
+    """
+    Add sold quantities, keyed by (product id, local date), to the daily and
+    monthly sales rollups, and to the top-seller sketches once the movement
+    write transaction commits.
+
+    A striped product's sales go to a random one of its ``stripe_count``
+    rollup rows, so concurrent sales of a hot product do not wait on each
+    other's row lock here after avoiding it on the stock.
+
+    Args:
+        sales (dict): Units sold by (product id, local date)
+        stripe_counts (dict, optional): Stripe count by product id
+    """
+    stripe_counts = stripe_counts or {}
+    daily, monthly = {}, {}
+    for (product_id, day), quantity in sales.items():
+        stripes = stripe_counts.get(product_id) or 1
+        for key, totals in (((product_id, day), daily), ((product_id, day.replace(day=1)), monthly)):
+            key += (random.randrange(stripes),)
+            totals[key] = totals.get(key, 0) + quantity
+
+    # Sorted so concurrent writers lock rollup rows in the same order
+    for (product_id, day, stripe), quantity in sorted(daily.items()):
+        _increment_rollup(DailySalesRollup, {"product_id": product_id, "date": day, "stripe": stripe}, quantity)
+    for (product_id, month, stripe), quantity in sorted(monthly.items()):
+        _increment_rollup(MonthlySalesRollup, {"product_id": product_id, "month": month, "stripe": stripe}, quantity)
+    if sales:
+        transaction.on_commit(partial(record_sketch_sales, dict(sales)))
+
+
 @transaction.atomic
 def create_inventory_movement(
     product: Product,
@@ -33,21 +347,9 @@ def create_inventory_movement(
     if unit_price is None and movement_type in [InventoryMovement.MOVEMENT_INPUT, InventoryMovement.MOVEMENT_OUTPUT]:
         unit_price = product.price
 
-    # update product stock
-    if movement_type == InventoryMovement.MOVEMENT_INPUT:
-        product.quantity += quantity
-    elif movement_type == InventoryMovement.MOVEMENT_OUTPUT:
-        if product.quantity < quantity:
-            raise ValueError(
-                f"Insufficient stock of {product.name} for output movement."
-            )
-        product.quantity -= quantity
-    elif movement_type == InventoryMovement.MOVEMENT_ADJUSTMENT:
-        product.quantity = quantity
-    else:
-        raise ValueError(f"Invalid movement type: {movement_type}")
-
-    product.save()
+    # update product stock with a single conditional UPDATE so concurrent
+    # movements never read a stale quantity or take stock below zero
+    _update_stock(product, quantity, movement_type)
 
     movement = InventoryMovement.objects.create(
         product=product, 
@@ -56,4 +358,765 @@ def create_inventory_movement(
         user=user,
         unit_price=unit_price
     )
+    if movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+        _record_sales({(product.pk, timezone.localdate(movement.date)): quantity}, {product.pk: product.stripe_count})
+    # Last, so the product's valuation row is locked for as short as possible
+    record_costs([movement])
+    bump_inventory_version()
     return movement
+
+
+@transaction.atomic
+def create_inventory_movements_bulk(rows: list, user: User) -> list:
+    """
+    Create many inventory movements in a single transaction.
+
+    Rows are applied per product in the order they were given, so an OUT row
+    can consume stock added by an earlier IN row of the same batch. Rows that
+    fail (unknown or inactive product, insufficient stock) are skipped and
+    reported; the remaining rows are written with one bulk insert and every
+    touched product is updated once.
+
+    Args:
+        rows (list): Dicts with product (id), quantity, movement_type and
+            optionally unit_price
+        user (User, optional): User performing the movements
+
+    Returns:
+        list: One (movement, error) tuple per row, in input order. Exactly one
+            of the two is set.
+    """
+    product_ids = sorted({row["product"] for row in rows})
+    # Locked in primary key order, so overlapping batches can not deadlock
+    products = Product.objects.select_for_update().order_by("pk").in_bulk(product_ids)
+
+    results = [None] * len(rows)
+    balances = {}
+    pending = []
+
+    # Striped products start from the total of their locked stripes
+    stripes = {}
+    for product in products.values():
+        if product.stripe_count:
+            stripes[product.pk] = _lock_stripes(product)
+            product.quantity = sum(stripe.quantity for stripe in stripes[product.pk])
+
+    for index, row in enumerate(rows):
+        product = products.get(row["product"])
+        if product is None:
+            results[index] = (None, f"Product {row['product']} does not exist.")
+            continue
+        if not product.is_active:
+            results[index] = (None, f"Product {product.name} is not active.")
+            continue
+
+        quantity = row["quantity"]
+        movement_type = row["movement_type"]
+        try:
+            balances[product.pk] = _apply_movement(
+                product, balances.get(product.pk, product.quantity), quantity, movement_type
+            )
+        except ValueError as e:
+            results[index] = (None, str(e))
+            continue
+
+        unit_price = row.get("unit_price")
+        if unit_price is None and movement_type in [InventoryMovement.MOVEMENT_INPUT, InventoryMovement.MOVEMENT_OUTPUT]:
+            unit_price = product.price
+
+        pending.append((index, InventoryMovement(
+            product=product,
+            quantity=quantity,
+            movement_type=movement_type,
+            user=user,
+            unit_price=unit_price,
+        )))
+
+    if pending:
+        movements = InventoryMovement.objects.bulk_create([movement for _, movement in pending])
+        sales = {}
+        for (index, _), movement in zip(pending, movements):
+            results[index] = (movement, None)
+            if movement.movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+                key = (movement.product_id, timezone.localdate(movement.date))
+                sales[key] = sales.get(key, 0) + movement.quantity
+        _record_sales(sales, {product.pk: product.stripe_count for product in products.values()})
+        record_costs(movements)
+
+        touched = []
+        for product_id, new_quantity in balances.items():
+            product = products[product_id]
+            product.quantity = new_quantity
+            touched.append(product)
+            if product.pk in stripes:
+                _set_stripes(stripes[product.pk], new_quantity)
+        Product.objects.bulk_update(touched, ["quantity"])
+        bump_inventory_version()
+
+    return results
+
+
+def _day_start(day: date) -> datetime:
+    """Start of a day in UTC, the boundary stock snapshots are taken at."""
+    return datetime.combine(day, time.min, tzinfo=dt_timezone.utc)
+
+
+def _replay_movements(balance: int, movements) -> int:
+    """Apply (movement_type, quantity) pairs to a balance; ADJ resets it."""
+    for movement_type, quantity in movements:
+        if movement_type == InventoryMovement.MOVEMENT_INPUT:
+            balance += quantity
+        elif movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+            balance -= quantity
+        elif movement_type == InventoryMovement.MOVEMENT_ADJUSTMENT:
+            balance = quantity
+    return balance
+
+
+def _movement_history(product: Product, start: datetime, end: datetime, archived: ArchivedStockBalance = None):
+    """
+    (movement_type, quantity) pairs of a product in ledger order, from ``start``
+    (inclusive, None for the beginning) up to ``end`` (inclusive).
+
+    The archive is only read when the window reaches before the product's
+    carry-forward point.
+    """
+    columns = ("date", "id", "movement_type", "quantity")
+    live = product.movements.filter(date__lte=end)
+    if start:
+        live = live.filter(date__gte=start)
+    rows = list(live.values_list(*columns))
+
+    if archived and (start is None or start < archived.archived_before):
+        old = product.archived_movements.filter(date__lte=end)
+        if start:
+            old = old.filter(date__gte=start)
+        rows.extend(old.values_list(*columns))
+
+    rows.sort(key=lambda row: (row[0], row[1]))
+    return [(movement_type, quantity) for _, _, movement_type, quantity in rows]
+
+
+def get_stock_at(product: Product, moment: datetime) -> tuple:
+    """
+    Compute a product's stock at a point in time.
+
+    Starts from the latest snapshot taken before the moment's day, or from
+    the archive carry-forward balance if that is more recent, and replays
+    only the movements recorded after it.
+
+    Args:
+        product (Product): The product to look up
+        moment (datetime): Aware timestamp; movements at exactly this time count
+
+    Returns:
+        tuple: (quantity, snapshot date used or None)
+    """
+    snapshot = (
+        product.stock_snapshots
+        .filter(date__lt=moment.astimezone(dt_timezone.utc).date())
+        .order_by("-date")
+        .first()
+    )
+    archived = ArchivedStockBalance.objects.filter(product=product).first()
+
+    start, balance = None, 0
+    if snapshot:
+        start, balance = _day_start(snapshot.date + timedelta(days=1)), snapshot.quantity
+    if archived and archived.archived_before <= moment and (start is None or archived.archived_before > start):
+        start, balance, snapshot = archived.archived_before, archived.quantity, None
+
+    quantity = _replay_movements(balance, _movement_history(product, start, moment, archived))
+    return quantity, snapshot.date if snapshot else None
+
+
+def _with_replay_start(products, before: date = None):
+    """
+    Values rows (pk, last snapshot date and quantity, archive carry-forward
+    point and balance) telling where each product's ledger replay can start.
+    With ``before``, only snapshots of earlier days are considered.
+    """
+    latest = StockSnapshot.objects.filter(product=OuterRef("pk")).order_by("-date")
+    if before:
+        latest = latest.filter(date__lt=before)
+    return products.annotate(
+        last_snapshot_date=Subquery(latest.values("date")[:1]),
+        last_snapshot_quantity=Subquery(latest.values("quantity")[:1]),
+    ).values_list(
+        "pk",
+        "last_snapshot_date",
+        "last_snapshot_quantity",
+        "archived_balance__archived_before",
+        "archived_balance__quantity",
+    )
+
+
+def _replay_starts(rows, until: datetime = None) -> dict:
+    """
+    Map rows from ``_with_replay_start`` to {pk: (resume_from, balance)},
+    using the latest snapshot or the archive carry-forward, whichever is
+    more recent. ``resume_from`` is None when the whole ledger must be read.
+    Carry-forward points after ``until`` are ignored.
+    """
+    starts = {}
+    for pk, last_date, last_quantity, archived_before, archived_quantity in rows:
+        resume_from, balance = None, 0
+        if last_date:
+            resume_from, balance = _day_start(last_date + timedelta(days=1)), last_quantity
+        if (
+            archived_before
+            and (until is None or archived_before <= until)
+            and (resume_from is None or archived_before > resume_from)
+        ):
+            resume_from, balance = archived_before, archived_quantity
+        starts[pk] = (resume_from, balance)
+    return starts
+
+
+def get_stocks_before(moment: datetime, batch_size: int = 10000) -> dict:
+    """
+    Compute the stock of every product just before a point in time, the
+    batch counterpart of ``get_stock_at`` for the end of a [start, end) window.
+
+    Each product starts from its latest snapshot taken before the moment's
+    day, or its archive carry-forward balance if that is more recent, and
+    only the movements recorded after it are replayed. The archive is only
+    read for products carried forward after the moment.
+
+    Args:
+        moment (datetime): Aware timestamp; movements at exactly this time do not count
+        batch_size (int): Products per chunk
+
+    Returns:
+        dict: {product id: quantity}
+    """
+    day = moment.astimezone(dt_timezone.utc).date()
+    stocks = {}
+    last_pk = 0
+    while True:
+        chunk = list(
+            _with_replay_start(Product.objects.filter(pk__gt=last_pk).order_by("pk"), before=day)[:batch_size]
+        )
+        if not chunk:
+            break
+        last_pk = chunk[-1][0]
+        starts = _replay_starts(chunk, until=moment)
+        in_archive = [
+            pk for pk, _, _, archived_before, _ in chunk
+            if archived_before and (starts[pk][0] is None or starts[pk][0] < archived_before)
+        ]
+
+        stocks.update((pk, balance) for pk, (_, balance) in starts.items())
+        columns = ("product_id", "date", "id", "movement_type", "quantity")
+        live = InventoryMovement.objects.filter(product_id__in=starts, date__lt=moment)
+        archived = ArchivedInventoryMovement.objects.filter(product_id__in=in_archive, date__lt=moment)
+        resume_points = [resume_from for resume_from, _ in starts.values() if resume_from]
+        if len(resume_points) == len(starts):
+            live = live.filter(date__gte=min(resume_points))
+        rows = heapq.merge(
+            live.order_by("product_id", "date", "id").values_list(*columns).iterator(chunk_size=batch_size),
+            archived.order_by("product_id", "date", "id").values_list(*columns).iterator(chunk_size=batch_size),
+        )
+        for product_id, moved_at, _, movement_type, quantity in rows:
+            resume_from = starts[product_id][0]
+            if resume_from and moved_at < resume_from:
+                continue
+            stocks[product_id] = _replay_movements(stocks[product_id], [(movement_type, quantity)])
+    return stocks
+
+
+def _build_snapshot_chunk(starts: dict, cutoff: datetime, batch_size: int) -> int:
+    """Write the missing daily snapshots for one chunk of products."""
+    movements = InventoryMovement.objects.filter(product_id__in=starts, date__lt=cutoff)
+    resume_points = [resume_from for resume_from, _ in starts.values() if resume_from]
+    if len(resume_points) == len(starts):
+        movements = movements.filter(date__gte=min(resume_points))
+
+    snapshots = []
+    current_product = current_day = None
+    balance = 0
+    rows = (
+        movements.order_by("product_id", "date", "id")
+        .values_list("product_id", "date", "movement_type", "quantity")
+        .iterator(chunk_size=batch_size)
+    )
+    for product_id, moved_at, movement_type, quantity in rows:
+        resume_from, start_balance = starts[product_id]
+        if resume_from and moved_at < resume_from:
+            continue
+        day = moved_at.astimezone(dt_timezone.utc).date()
+
+        if product_id != current_product or day != current_day:
+            if current_product is not None:
+                snapshots.append(StockSnapshot(product_id=current_product, date=current_day, quantity=balance))
+            if product_id != current_product:
+                balance = start_balance
+            current_product, current_day = product_id, day
+
+        balance = _replay_movements(balance, [(movement_type, quantity)])
+
+    if current_product is not None:
+        snapshots.append(StockSnapshot(product_id=current_product, date=current_day, quantity=balance))
+
+    StockSnapshot.objects.bulk_create(snapshots, batch_size=batch_size)
+    return len(snapshots)
+
+
+def build_stock_snapshots(until: date = None, batch_size: int = 1000) -> int:
+    """
+    Write daily stock snapshots for every product up to and including ``until``.
+
+    Each product resumes from its latest snapshot (or its archive carry-forward
+    balance, whichever is more recent), so repeated runs only process
+    movements recorded since the previous run. Products are handled in
+    primary key chunks to keep memory bounded.
+
+    Args:
+        until (date, optional): Last day to snapshot, defaults to yesterday (UTC)
+        batch_size (int): Products per chunk and rows per insert
+
+    Returns:
+        int: Number of snapshots created
+    """
+    if until is None:
+        until = timezone.now().astimezone(dt_timezone.utc).date() - timedelta(days=1)
+    cutoff = _day_start(until + timedelta(days=1))
+
+    created = 0
+    last_pk = 0
+    while True:
+        chunk = list(_with_replay_start(Product.objects.filter(pk__gt=last_pk).order_by("pk"))[:batch_size])
+        if not chunk:
+            break
+
+        starts = _replay_starts(chunk)
+        created += _build_snapshot_chunk(starts, cutoff, batch_size)
+        last_pk = chunk[-1][0]
+    return created
+
+
+def _archive_movement_chunk(before: datetime, chunk_size: int) -> int:
+    """Move the oldest chunk of live movements dated before ``before`` to the archive."""
+    live = InventoryMovement.objects.filter(date__lt=before).order_by("date", "id")
+    dates = list(live.values_list("date", flat=True)[:chunk_size])
+    if not dates:
+        return 0
+
+    # Archive whole timestamps only, so "everything before the boundary is
+    # archived" holds after every chunk.
+    boundary = before
+    if len(dates) == chunk_size:
+        boundary = dates[-1] if dates[-1] > dates[0] else dates[0] + timedelta(microseconds=1)
+
+    movements = list(live.filter(date__lt=boundary).select_for_update())
+    ArchivedInventoryMovement.objects.bulk_create([
+        ArchivedInventoryMovement(
+            id=movement.id,
+            product_id=movement.product_id,
+            quantity=movement.quantity,
+            date=movement.date,
+            unit_price=movement.unit_price,
+            user_id=movement.user_id,
+            movement_type=movement.movement_type,
+        )
+        for movement in movements
+    ])
+
+    by_product = {}
+    for movement in movements:
+        by_product.setdefault(movement.product_id, []).append(
+            (movement.movement_type, movement.quantity)
+        )
+    balances = ArchivedStockBalance.objects.select_for_update().in_bulk(list(by_product))
+    new_balances = []
+    for product_id, history in by_product.items():
+        balance = balances.get(product_id)
+        if balance is None:
+            balance = ArchivedStockBalance(product_id=product_id, quantity=0)
+            new_balances.append(balance)
+        balance.quantity = _replay_movements(balance.quantity, history)
+        balance.archived_before = boundary
+    ArchivedStockBalance.objects.bulk_create(new_balances)
+    ArchivedStockBalance.objects.bulk_update(
+        [balance for balance in balances.values()], ["quantity", "archived_before"]
+    )
+
+    InventoryMovement.objects.filter(
+        date__lt=boundary, pk__in=[movement.pk for movement in movements]
+    ).delete()
+    return len(movements)
+
+
+def archive_movements(before: datetime, chunk_size: int = 5000, progress=None) -> int:
+    """
+    Move every live movement dated before ``before`` into the archive table.
+
+    Works in chunks of about ``chunk_size`` rows, each in its own transaction,
+    and keeps a per-product carry-forward balance of the archived rows so
+    stock replays (snapshots, point-in-time stock) stay exact.
+
+    Args:
+        before (datetime): Archive movements dated strictly before this moment
+        chunk_size (int): Rows moved per transaction
+        progress (callable, optional): Called with the running total after each chunk
+
+    Returns:
+        int: Number of movements archived
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            moved = _archive_movement_chunk(before, chunk_size)
+            if moved:
+                # The live movement list changes
+                bump_inventory_version()
+        if not moved:
+            return archived
+        archived += moved
+        if progress:
+            progress(archived)
+
+
+def _product_ranges(range_size: int) -> list:
+    """Filter kwargs covering every product in primary key ranges of ``range_size``."""
+    bounds = Product.objects.aggregate(first=Min("pk"), last=Max("pk"))
+    if bounds["first"] is None:
+        return []
+    return [
+        {"pk__gte": start, "pk__lte": start + range_size - 1}
+        for start in range(bounds["first"], bounds["last"] + 1, range_size)
+    ]
+
+
+def _movement_filters(filters: dict) -> dict:
+    """The product filter kwargs of a range, applied to a movement's product column."""
+    return {f"product_id{lookup[2:]}": value for lookup, value in filters.items()}
+
+
+def _map_tasks(func, tasks: list, workers: int):
+    """Yield ``func(task)`` for every task, in a forked process pool when workers > 1."""
+    if workers > 1 and len(tasks) > 1:
+        # Forked workers must not share the parent's database connection
+        connections.close_all()
+        with multiprocessing.get_context("fork").Pool(workers) as pool:
+            yield from pool.imap_unordered(func, tasks)
+    else:
+        yield from map(func, tasks)
+
+
+# Movements newer than this may belong to transactions that have not committed
+# yet, so they stay above the high-water mark and the next run re-checks them.
+RECONCILIATION_GRACE = timedelta(minutes=5)
+
+
+def _check_stock_range(filters: dict, batch_size: int = 5000) -> tuple:
+    """
+    Compare the recorded stock of the products matching ``filters`` with
+    their movement ledger. Runs inside pool workers, so it only takes
+    picklable arguments.
+
+    Returns:
+        tuple: (products checked, [(product id, recorded, expected), ...])
+    """
+    products = Product.objects.filter(**filters)
+    starts = _replay_starts(_with_replay_start(products))
+    if not starts:
+        return 0, []
+    recorded = dict(products.with_stock().values_list("pk", "stock"))
+
+    movements = InventoryMovement.objects.filter(**_movement_filters(filters))
+    resume_points = [resume_from for resume_from, _ in starts.values() if resume_from]
+    if len(resume_points) == len(starts):
+        movements = movements.filter(date__gte=min(resume_points))
+
+    expected = {pk: balance for pk, (_, balance) in starts.items()}
+    rows = (
+        movements.order_by("product_id", "date", "id")
+        .values_list("product_id", "date", "movement_type", "quantity")
+        .iterator(chunk_size=batch_size)
+    )
+    for product_id, moved_at, movement_type, quantity in rows:
+        if product_id not in starts:
+            continue
+        resume_from = starts[product_id][0]
+        if resume_from and moved_at < resume_from:
+            continue
+        expected[product_id] = _replay_movements(expected[product_id], [(movement_type, quantity)])
+
+    drifts = [
+        (pk, recorded[pk], balance)
+        for pk, balance in expected.items()
+        if pk in recorded and recorded[pk] != balance
+    ]
+    return len(starts), drifts
+
+
+def _verify_stock(product_id: int, repair: bool):
+    """
+    Re-check one product with its stock locked, so movements committed while
+    the range was being scanned cannot show up as drift, and optionally
+    overwrite the recorded stock with the ledger value.
+
+    Returns:
+        tuple: (recorded, expected, repaired), or None if the product is gone
+    """
+    with transaction.atomic():
+        product = Product.objects.select_for_update().filter(pk=product_id).first()
+        if product is None:
+            return None
+        stripes = _lock_stripes(product) if product.stripe_count else []
+        recorded = sum(stripe.quantity for stripe in stripes) if stripes else product.quantity
+        expected, _ = get_stock_at(product, timezone.now())
+
+        # A negative ledger balance cannot be stored, it needs a manual adjustment
+        if recorded == expected or not repair or expected < 0:
+            return recorded, expected, False
+
+        if stripes:
+            _set_stripes(stripes, expected)
+        product.quantity = expected
+        product.save(update_fields=["quantity"])
+        return recorded, expected, True
+
+
+def reconcile_stock(
+    full: bool = False,
+    repair: bool = False,
+    workers: int = 1,
+    range_size: int = 10000,
+    batch_size: int = 5000,
+    progress=None,
+) -> StockReconciliationRun:
+    """
+    Check recorded stock against the movement ledger and record any drift.
+
+    Products are split into primary key ranges that are checked in a process
+    pool, each streaming its movements through a server-side cursor and
+    replaying them from the latest snapshot or archive carry-forward.
+    Incremental runs only re-check products with movements above the previous
+    run's high-water mark; a full run is needed to catch stock edited without
+    a movement.
+
+    Args:
+        full (bool): Check every product; forced when there is no previous run
+        repair (bool): Overwrite drifted stock with the ledger value
+        workers (int): Worker processes, 1 checks ranges in this process
+        range_size (int): Products per range handed to a worker
+        batch_size (int): Rows fetched per round trip while streaming movements
+        progress (callable, optional): Called with the running number of products checked
+
+    Returns:
+        StockReconciliationRun: The finished run
+    """
+    previous = (
+        StockReconciliationRun.objects.filter(finished_at__isnull=False)
+        .order_by("-started_at")
+        .first()
+    )
+    run = StockReconciliationRun.objects.create(full=full or previous is None, repair=repair)
+    mark = (
+        InventoryMovement.objects.filter(date__lte=run.started_at - RECONCILIATION_GRACE)
+        .aggregate(mark=Max("id"))["mark"]
+    )
+    run.high_water_mark = max(mark or 0, previous.high_water_mark if previous else 0)
+
+    if run.full:
+        tasks = _product_ranges(range_size)
+    else:
+        changed = sorted(
+            InventoryMovement.objects.filter(id__gt=previous.high_water_mark)
+            .order_by()
+            .values_list("product_id", flat=True)
+            .distinct()
+        )
+        tasks = [{"pk__in": changed[i:i + range_size]} for i in range(0, len(changed), range_size)]
+
+    found = []
+    for checked, drifts in _map_tasks(partial(_check_stock_range, batch_size=batch_size), tasks, workers):
+        run.products_checked += checked
+        found.extend(drifts)
+        if progress:
+            progress(run.products_checked)
+
+    records = []
+    for product_id, _, _ in found:
+        verified = _verify_stock(product_id, repair)
+        if verified is None or verified[0] == verified[1]:
+            continue
+        recorded, expected, repaired = verified
+        records.append(StockDrift(
+            run=run,
+            product_id=product_id,
+            recorded_quantity=recorded,
+            expected_quantity=expected,
+            repaired=repaired,
+        ))
+    StockDrift.objects.bulk_create(records)
+
+    run.drift_count = len(records)
+    run.repaired_count = sum(1 for record in records if record.repaired)
+    run.finished_at = timezone.now()
+    run.save()
+    return run
+
+
+def _lock_product_range(filters: dict) -> list:
+    """
+    Lock the products matching ``filters`` and their stock stripes, so
+    movement writes to them wait until the transaction ends.
+
+    Returns:
+        list: The locked product ids, in order
+    """
+    product_ids = list(
+        Product.objects.select_for_update()
+        .filter(**filters)
+        .order_by("pk")
+        .values_list("pk", flat=True)
+    )
+    if product_ids:
+        list(
+            StockStripe.objects.select_for_update()
+            .filter(product_id__in=product_ids)
+            .order_by("product_id", "index")
+            .values_list("pk", flat=True)
+        )
+    return product_ids
+
+
+def _rebuild_sales_rollup_range(filters: dict) -> int:
+    """Recompute the sales rollups of the products matching ``filters`` from the ledger."""
+    with transaction.atomic():
+        # Movement writes to these products wait until their rollups are replaced
+        product_ids = _lock_product_range(filters)
+        if not product_ids:
+            return 0
+        DailySalesRollup.objects.filter(product_id__in=product_ids).delete()
+        MonthlySalesRollup.objects.filter(product_id__in=product_ids).delete()
+
+        daily = {}
+        for model in (InventoryMovement, ArchivedInventoryMovement):
+            rows = (
+                model.objects.filter(movement_type=InventoryMovement.MOVEMENT_OUTPUT, **_movement_filters(filters))
+                .annotate(day=TruncDate("date"))
+                .values("product_id", "day")
+                .annotate(total=Sum("quantity"))
+                .values_list("product_id", "day", "total")
+            )
+            for product_id, day, total in rows:
+                daily[(product_id, day)] = daily.get((product_id, day), 0) + total
+
+        monthly = {}
+        for (product_id, day), quantity in daily.items():
+            key = (product_id, day.replace(day=1))
+            monthly[key] = monthly.get(key, 0) + quantity
+
+        DailySalesRollup.objects.bulk_create(
+            [DailySalesRollup(product_id=product_id, date=day, quantity=quantity) for (product_id, day), quantity in daily.items()],
+            batch_size=1000,
+        )
+        MonthlySalesRollup.objects.bulk_create(
+            [MonthlySalesRollup(product_id=product_id, month=month, quantity=quantity) for (product_id, month), quantity in monthly.items()],
+            batch_size=1000,
+        )
+    return len(product_ids)
+
+
+def rebuild_sales_rollups(workers: int = 1, range_size: int = 1000, progress=None) -> int:
+    """
+    Recompute the daily and monthly sales rollups from the live and archived
+    movement ledger.
+
+    Products are rebuilt in primary key ranges, each in its own transaction
+    and optionally in a process pool. Each range locks its products and
+    stripes while its rollups are replaced, so it can run while movements
+    are being written.
+
+    Args:
+        workers (int): Worker processes, 1 rebuilds ranges in this process
+        range_size (int): Products per range
+        progress (callable, optional): Called with the running number of products rebuilt
+
+    Returns:
+        int: Number of products rebuilt
+    """
+    rebuilt = 0
+    for count in _map_tasks(_rebuild_sales_rollup_range, _product_ranges(range_size), workers):
+        rebuilt += count
+        if progress:
+            progress(rebuilt)
+    bump_inventory_version()
+    return rebuilt
+
+
+def _rebuild_cost_range(filters: dict, chunk_size: int = 10000) -> int:
+    """
+    Rebuild the cost layers and valuations of the products matching
+    ``filters`` by replaying their live and archived movements in one
+    ordered, streamed pass. Runs inside pool workers, so it only takes
+    picklable arguments.
+
+    Returns:
+        int: Number of products revalued
+    """
+    with transaction.atomic():
+        product_ids = _lock_product_range(filters)
+        if not product_ids:
+            return 0
+        CostLayer.objects.filter(product_id__in=product_ids).delete()
+        InventoryValuation.objects.filter(product_id__in=product_ids).delete()
+        # Their movements are replayed from the ledger below
+        PendingCost.objects.filter(product_id__in=product_ids).delete()
+        valuations = InventoryValuation.objects.bulk_create(
+            [InventoryValuation(product_id=product_id) for product_id in product_ids], batch_size=1000
+        )
+        fifo = costing_method() == FIFO
+        costs = {valuation.product_id: ProductCosts(valuation, fifo, layers=[]) for valuation in valuations}
+        products = {
+            pk: (price, stock)
+            for pk, price, stock in Product.objects.filter(pk__in=product_ids).with_stock().values_list("pk", "price", "stock")
+        }
+
+        columns = ("product_id", "date", "id", "movement_type", "quantity", "unit_price")
+        live = InventoryMovement.objects.filter(**_movement_filters(filters)).order_by().values_list(*columns)
+        archived = ArchivedInventoryMovement.objects.filter(**_movement_filters(filters)).order_by().values_list(*columns)
+        rows = live.union(archived, all=True).order_by("product_id", "date", "id").iterator(chunk_size=chunk_size)
+        for product_id, moved_at, _, movement_type, quantity, unit_price in rows:
+            price, _ = products[product_id]
+            costs[product_id].apply(movement_type, quantity, price if unit_price is None else unit_price, moved_at)
+
+        # Stock the ledger does not explain (drift, quantities set by hand) is
+        # valued like an adjustment made now
+        now = timezone.now()
+        for product_id, (price, stock) in products.items():
+            if costs[product_id].valuation.quantity != stock:
+                costs[product_id].apply(InventoryMovement.MOVEMENT_ADJUSTMENT, stock, price, now)
+        save_costs(costs.values())
+    return len(product_ids)
+
+
+def rebuild_cost_layers(workers: int = 1, range_size: int = 1000, progress=None) -> int:
+    """
+    Rebuild every product's cost layers and valuation from the live and
+    archived movement ledger under the configured costing method.
+
+    Like rebuild_sales_rollups, products are rebuilt in primary key ranges,
+    each in its own transaction that locks the range's products and stripes,
+    so it can run while movements are being written.
+
+    Args:
+        workers (int): Worker processes, 1 rebuilds ranges in this process
+        range_size (int): Products per range
+        progress (callable, optional): Called with the running number of products rebuilt
+
+    Returns:
+        int: Number of products rebuilt
+    """
+    costing_method()
+    rebuilt = 0
+    for count in _map_tasks(_rebuild_cost_range, _product_ranges(range_size), workers):
+        rebuilt += count
+        if progress:
+            progress(rebuilt)
+    bump_inventory_version()
+    return rebuilt
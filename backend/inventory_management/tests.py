@@ -1,9 +1,53 @@
-from rest_framework.test import APITestCase
+from rest_framework.test import APITestCase, APITransactionTestCase
 from django.urls import reverse
-from .models import Product, InventoryMovement
+from .models import Product, InventoryMovement, StockStripe, StockSnapshot, ArchivedInventoryMovement, ArchivedStockBalance, DailySalesRollup, MonthlySalesRollup
 from rest_framework import status
 from decimal import Decimal
 from django.contrib.auth.models import User
+from django.test import TestCase
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Sum
+from unittest import skipUnless
+from .services import create_inventory_movement, enable_stock_striping, disable_stock_striping, rebalance_stock_stripes, build_stock_snapshots, archive_movements, get_stock_at, get_stocks_before, reconcile_stock, rebuild_sales_rollups, create_inventory_movements_bulk
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.utils import timezone
+from .filters import MovementFilter, ProductFilter
+from django.test.utils import CaptureQueriesContext
+from django.core.cache import caches
+from django.conf import settings
+from .report_cache import bump_inventory_version, get_inventory_version
+from .coalescing import coalesce, coalescing_stats
+from django.test import override_settings
+import threading
+import time
+from .api import InventoryReportsView, ProductViewSet
+from .search import FullTextSearchFilter, has_trigram, search_query
+from . import autocomplete
+from .autocomplete import PrefixIndex, refresh_prefix_index
+from .report_cache import check_shared_cache, get_catalog_version
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from .dashboard import get_dashboard, refresh_dashboard
+from .analytics_export import create_analytics_export, run_analytics_export
+from .forecasting import holt_winters, refresh_demand_forecasts
+from .heavy_hitters import (
+    SpaceSaving, _flush_at_exit, approximate_top_sellers, flush_sales_sketches, rebuild_sales_sketches, record_sales,
+)
+from .models import DashboardSnapshot, AnalyticsExport, DemandForecast, SalesSketch, CostLayer, InventoryValuation, PendingCost
+from .services import rebuild_cost_layers
+from .valuation import apply_pending_costs
+from unittest import mock
+from purchasing.services import receive_purchase_order
+from suppliers.models import Supplier
+from purchasing.models import PurchaseOrder
+import random
+import re
+import os
+import shutil
+import tempfile
+import csv
+import json
+from .partitions import DEFAULT_PARTITION, ensure_month_partitions, partition_name
 
 product1_data = {
     'name': 'Laptop Z1 Pro', 'description': 'Potente laptop para desarrollo avanzado', 
@@ -211,6 +255,1672 @@ class InventoryMovementAPITest(APITestCase):
         self.assertEqual(self.product_active.quantity, initial_quantity)
         self.assertEqual(InventoryMovement.objects.filter(product=self.product_active, movement_type=InventoryMovement.MOVEMENT_OUTPUT).count(), 0)
         self.assertIn('there is not enought stock for', str(response.data))
-    
-    
-    
\ No newline at end of file
+
+    # test cases for bulk movement ingestion
+    def test_bulk_movements_combine_stock_per_product(self):
+        self.client.force_authenticate(user=self.admin_user)
+        initial_quantity = self.product_active.quantity
+        rows = [
+            {'product': self.product_active.pk, 'quantity': 5, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'product': self.product_active.pk, 'quantity': 20, 'movement_type': InventoryMovement.MOVEMENT_INPUT},
+            {'product': self.product_active.pk, 'quantity': 7, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+        ]
+        response = self.client.post(reverse('inventory_movements-bulk'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['created'], 3)
+        self.assertTrue(all(result['success'] for result in response.data['results']))
+        self.assertEqual(InventoryMovement.objects.count(), 4)
+        self.product_active.refresh_from_db()
+        self.assertEqual(self.product_active.quantity, initial_quantity - 5 + 20 - 7)
+
+    def test_bulk_movements_report_failures_per_row(self):
+        self.client.force_authenticate(user=self.admin_user)
+        initial_quantity = self.product_active.quantity
+        rows = [
+            {'product': self.product_active.pk, 'quantity': 2, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'product': self.product_active.pk, 'quantity': initial_quantity, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'product': self.product_inactive.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_INPUT},
+            {'product': self.product_active.pk, 'quantity': 0, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+        ]
+        response = self.client.post(reverse('inventory_movements-bulk'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS, response.data)
+        self.assertEqual(response.data['created'], 1)
+        self.assertEqual([result['success'] for result in response.data['results']], [True, False, False, False])
+        self.assertIn('quantity', response.data['results'][3]['errors'])
+        self.product_active.refresh_from_db()
+        self.assertEqual(self.product_active.quantity, initial_quantity - 2)
+
+    def test_bulk_movements_regular_user_only_outputs(self):
+        self.client.force_authenticate(user=self.regular_user)
+        rows = [
+            {'product': self.product_active.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'product': self.product_active.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_INPUT},
+        ]
+        response = self.client.post(reverse('inventory_movements-bulk'), rows, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN, response.data)
+        response = self.client.post(reverse('inventory_movements-bulk'), rows[:1], format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+    @override_settings(INVENTORY_BULK_MAX_MOVEMENTS=2)
+    def test_bulk_movements_reject_oversized_batches(self):
+        self.client.force_authenticate(user=self.admin_user)
+        row = {'product': self.product_active.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_INPUT}
+        response = self.client.post(reverse('inventory_movements-bulk'), [row] * 3, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        self.assertIn('at most 2', response.data['error'])
+        self.assertEqual(InventoryMovement.objects.count(), 1)
+
+    @skipUnless(connection.features.has_select_for_update, 'Row locks need a database that supports them')
+    def test_bulk_movements_lock_products_in_order(self):
+        other = Product.objects.create(name='Otro', price=Decimal('1.00'), quantity=5)
+        rows = [
+            {'product': other.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_INPUT},
+            {'product': self.product_active.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_INPUT},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            create_inventory_movements_bulk(rows, user=self.admin_user)
+        locks = [query['sql'] for query in queries if 'FOR UPDATE' in query['sql'] and '"inventory_management_product"' in query['sql']]
+        self.assertIn('ORDER BY "inventory_management_product"."id" ASC', locks[0])
+
+
+class StockUpdateServiceTest(TestCase):
+    # Test case for concurrency-safe stock updates in create_inventory_movement
+    def setUp(self):
+        self.product = Product.objects.create(name='Producto Caliente', price=Decimal('10.00'), quantity=5)
+
+    def test_stale_instances_do_not_lose_updates(self):
+        first = Product.objects.get(pk=self.product.pk)
+        second = Product.objects.get(pk=self.product.pk)
+        create_inventory_movement(product=first, quantity=2, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        create_inventory_movement(product=second, quantity=2, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+        self.assertEqual(second.quantity, 1)
+
+    def test_stale_instance_can_not_oversell(self):
+        stale = Product.objects.get(pk=self.product.pk)
+        create_inventory_movement(product=self.product, quantity=4, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        with self.assertRaises(ValueError):
+            create_inventory_movement(product=stale, quantity=4, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 1)
+        self.assertEqual(InventoryMovement.objects.count(), 1)
+
+
+class StripedStockTest(APITestCase):
+    # Test case for striped stock counters on hot products
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='stripe_admin', password='adminpassword123', is_staff=True)
+        self.product = Product.objects.create(name='Oferta Flash', price=Decimal('5.00'), quantity=20)
+        enable_stock_striping(self.product, stripes=4)
+
+    def stripe_quantities(self):
+        return list(StockStripe.objects.filter(product=self.product).order_by('index').values_list('quantity', flat=True))
+
+    def test_enable_spreads_stock_across_stripes(self):
+        self.assertEqual(self.product.stripe_count, 4)
+        self.assertEqual(self.stripe_quantities(), [5, 5, 5, 5])
+
+    def test_output_drains_several_stripes_when_needed(self):
+        create_inventory_movement(product=self.product, quantity=18, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        self.assertEqual(sum(self.stripe_quantities()), 2)
+        with self.assertRaises(ValueError):
+            create_inventory_movement(product=self.product, quantity=3, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+
+    def test_adjustment_and_rebalance(self):
+        create_inventory_movement(product=self.product, quantity=9, movement_type=InventoryMovement.MOVEMENT_ADJUSTMENT, user=None)
+        self.assertEqual(self.stripe_quantities(), [3, 2, 2, 2])
+        StockStripe.objects.filter(product=self.product, index=0).update(quantity=9)
+        StockStripe.objects.filter(product=self.product, index__gt=0).update(quantity=0)
+        self.assertTrue(rebalance_stock_stripes(self.product))
+        self.assertEqual(self.stripe_quantities(), [3, 2, 2, 2])
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.quantity, 9)
+
+    def test_disable_folds_stripes_back(self):
+        create_inventory_movement(product=self.product, quantity=3, movement_type=InventoryMovement.MOVEMENT_INPUT, user=None)
+        disable_stock_striping(self.product)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stripe_count, 0)
+        self.assertEqual(self.product.quantity, 23)
+        self.assertFalse(StockStripe.objects.filter(product=self.product).exists())
+
+    def test_product_api_and_stock_annotation_sum_stripes(self):
+        create_inventory_movement(product=self.product, quantity=7, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('products-detail', kwargs={'pk': self.product.pk}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['quantity'], 13)
+        self.assertEqual(Product.objects.with_stock().get(pk=self.product.pk).stock, 13)
+
+    def test_stale_instances_follow_the_current_layout(self):
+        stale_striped = Product.objects.get(pk=self.product.pk)
+        stale_adjust = Product.objects.get(pk=self.product.pk)
+        disable_stock_striping(Product.objects.get(pk=self.product.pk))
+        create_inventory_movement(product=stale_striped, quantity=3, movement_type=InventoryMovement.MOVEMENT_INPUT, user=None)
+        create_inventory_movement(product=stale_striped, quantity=4, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        create_inventory_movement(product=stale_adjust, quantity=19, movement_type=InventoryMovement.MOVEMENT_ADJUSTMENT, user=None)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.stripe_count, self.product.quantity), (0, 19))
+
+        stale_plain = Product.objects.get(pk=self.product.pk)
+        enable_stock_striping(Product.objects.get(pk=self.product.pk), stripes=2)
+        create_inventory_movement(product=stale_plain, quantity=5, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        self.assertEqual(stale_plain.stripe_count, 2)
+        self.assertEqual(sum(self.stripe_quantities()), 14)
+        self.assertEqual(Product.objects.with_stock().get(pk=self.product.pk).stock, 14)
+        with self.assertRaises(ValueError):
+            create_inventory_movement(product=Product.objects.get(pk=self.product.pk), quantity=15, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+
+    def test_admin_can_not_edit_the_stripes(self):
+        superuser = User.objects.create_superuser(username='stripe_superuser', password='adminpassword123')
+        self.client.force_login(superuser)
+        url = reverse('admin:inventory_management_product_change', args=[self.product.pk])
+        form = self.client.get(url).context['adminform'].form
+        self.assertNotIn('stripe_count', form.fields)
+        self.assertNotIn('quantity', form.fields)
+
+        plain = Product.objects.create(name='Plain', price=Decimal('1.00'), quantity=50)
+        form = self.client.get(reverse('admin:inventory_management_product_change', args=[plain.pk])).context['adminform'].form
+        self.assertIn('quantity', form.fields)
+        self.assertNotIn('stripe_count', form.fields)
+
+    def test_low_stock_counts_the_stripes(self):
+        # The cached Product.quantity still says 20
+        create_inventory_movement(product=self.product, quantity=15, movement_type=InventoryMovement.MOVEMENT_OUTPUT, user=None)
+        Product.objects.create(name='Plain', price=Decimal('1.00'), quantity=50)
+        self.assertEqual(list(Product.objects.low_stock()), [self.product])
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('products-list'), {'low_stock': 'true'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Oferta Flash'])
+        kpis = InventoryReportsView()._build_report({})['kpis']
+        self.assertEqual((kpis['total_products'], kpis['low_stock_count']), (2, 1))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row locks need PostgreSQL')
+class StripeLockTest(APITransactionTestCase):
+    # Committed stripes, because another connection holds one of them
+    def test_output_skips_a_busy_stripe(self):
+        product = Product.objects.create(name='Oferta Relampago', price=Decimal('5.00'), quantity=20)
+        enable_stock_striping(product, stripes=2)
+        held, release = threading.Event(), threading.Event()
+
+        def hold_first_stripe():
+            try:
+                with transaction.atomic():
+                    StockStripe.objects.select_for_update().get(product=product, index=0)
+                    held.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_first_stripe)
+        holder.start()
+        self.assertTrue(held.wait(10))
+        try:
+            # Waiting on the held stripe would time out instead of using the free one
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '2s'")
+                for _ in range(3):
+                    create_inventory_movement(product, 1, InventoryMovement.MOVEMENT_OUTPUT, None)
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(
+            list(StockStripe.objects.filter(product=product).order_by('index').values_list('quantity', flat=True)),
+            [10, 7],
+        )
+
+
+class StockSnapshotTest(APITestCase):
+    # Test case for daily stock snapshots and point-in-time stock
+    def setUp(self):
+        self.user = User.objects.create_user(username='snap_user', password='userpassword123')
+        self.product = Product.objects.create(name='Cuaderno', price=Decimal('2.00'))
+        history = [
+            ('2025-01-10T09:00:00', InventoryMovement.MOVEMENT_INPUT, 50),
+            ('2025-01-10T15:00:00', InventoryMovement.MOVEMENT_OUTPUT, 5),
+            ('2025-01-12T10:00:00', InventoryMovement.MOVEMENT_ADJUSTMENT, 40),
+            ('2025-01-12T18:00:00', InventoryMovement.MOVEMENT_OUTPUT, 8),
+            ('2025-01-15T08:00:00', InventoryMovement.MOVEMENT_INPUT, 10),
+        ]
+        for moment, movement_type, quantity in history:
+            movement = InventoryMovement.objects.create(product=self.product, movement_type=movement_type, quantity=quantity)
+            InventoryMovement.objects.filter(pk=movement.pk).update(
+                date=datetime.fromisoformat(moment).replace(tzinfo=dt_timezone.utc)
+            )
+        self.url = reverse('products-stock-at', kwargs={'pk': self.product.pk})
+
+    def test_build_snapshots_is_incremental(self):
+        self.assertEqual(build_stock_snapshots(until=datetime(2025, 1, 12).date()), 2)
+        self.assertEqual(build_stock_snapshots(until=datetime(2025, 1, 31).date()), 1)
+        self.assertEqual(build_stock_snapshots(until=datetime(2025, 1, 31).date()), 0)
+        snapshots = StockSnapshot.objects.filter(product=self.product).order_by('date')
+        self.assertEqual([(s.date.day, s.quantity) for s in snapshots], [(10, 45), (12, 32), (15, 42)])
+
+    def test_stock_at_uses_snapshot_plus_delta(self):
+        build_stock_snapshots(until=datetime(2025, 1, 10).date())
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(self.url, {'at': '2025-01-12T12:00:00Z'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['quantity'], 40)
+        self.assertEqual(str(response.data['snapshot_date']), '2025-01-10')
+        response = self.client.get(self.url, {'at': '2025-01-14'})
+        self.assertEqual(response.data['quantity'], 32)
+        # A bare date means the end of that day
+        response = self.client.get(self.url, {'at': '2025-01-12'})
+        self.assertEqual(response.data['quantity'], 32)
+        response = self.client.get(self.url, {'at': '2025-01-09'})
+        self.assertEqual(response.data['quantity'], 0)
+        self.assertIsNone(response.data['snapshot_date'])
+
+    def test_stock_at_requires_valid_timestamp(self):
+        self.client.force_authenticate(user=self.user)
+        for at in ['yesterday', '2025-02-30', '2025-02-30T10:00:00', '2025-13-01T00:00:00Z', '9999-12-31']:
+            with self.subTest(at=at):
+                response = self.client.get(self.url, {'at': at})
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        response = self.client.get(self.url, {'at': '9999-12-30T23:59:59Z'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Movement partitioning is PostgreSQL only')
+class MovementPartitionTest(TestCase):
+    # Test case for monthly partitioning of the movements table
+    def setUp(self):
+        self.product = Product.objects.create(name='Resma', price=Decimal('4.00'))
+
+    def create_movement_at(self, moment):
+        movement = InventoryMovement.objects.create(product=self.product, quantity=1)
+        InventoryMovement.objects.filter(pk=movement.pk).update(date=moment)
+        return movement
+
+    def test_date_filters_prune_partitions(self):
+        with connection.cursor() as cursor:
+            ensure_month_partitions(cursor, date(2025, 1, 1), date(2025, 3, 1))
+        movements = MovementFilter(
+            {'start_date': '2025-02-03', 'end_date': '2025-02-20'},
+            queryset=InventoryMovement.objects.all(),
+        ).qs
+        plan = movements.explain()
+        self.assertIn(partition_name(date(2025, 2, 1)), plan)
+        self.assertNotIn(partition_name(date(2025, 1, 1)), plan)
+        self.assertNotIn(partition_name(date(2025, 3, 1)), plan)
+        self.assertNotIn(DEFAULT_PARTITION, plan)
+
+    def test_new_partition_takes_rows_from_default(self):
+        moment = datetime(2019, 6, 15, tzinfo=dt_timezone.utc)
+        movement = self.create_movement_at(moment)
+        with connection.cursor() as cursor:
+            self.assertEqual(ensure_month_partitions(cursor, date(2019, 6, 1), date(2019, 6, 1)), [partition_name(date(2019, 6, 1))])
+            cursor.execute(f"SELECT id FROM {partition_name(date(2019, 6, 1))}")
+            self.assertEqual(cursor.fetchall(), [(movement.pk,)])
+            cursor.execute(f"SELECT count(*) FROM {DEFAULT_PARTITION}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertEqual(InventoryMovement.objects.get(pk=movement.pk).date, moment)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Query plan checks need PostgreSQL')
+class QueryPlanTest(APITestCase):
+    """Fails when a hot lookup is planned as a sequential scan of a large table.
+
+    The dataset is seeded at a size where indexes pay off and analyzed, and
+    queries are explained with the default planner settings, so a plan is
+    what production would run. Tables under MIN_SCANNED_ROWS rows are
+    cheaper to read whole than through an index, so their scans are fine.
+    """
+
+    MIN_SCANNED_ROWS = 1000
+    # Aggregates over a whole table, which only a full read can answer
+    FULL_SCANS = (
+        # Both product KPIs in one pass over the active products
+        'SELECT COUNT("inventory_management_product"."id") AS "total_products", COUNT("inventory_management_product"."id") '
+        'FILTER (WHERE (("inventory_management_product"."quantity" <= 10 AND "inventory_management_product"."stripe_count" = 0) '
+        'OR ("inventory_management_product"."id" IN (SELECT U0."product_id" FROM "inventory_management_stockstripe" U0 '
+        'GROUP BY U0."product_id" HAVING SUM(U0."quantity") <= 10) AND "inventory_management_product"."stripe_count" > 0))) '
+        'AS "low_stock_count" FROM "inventory_management_product" WHERE "inventory_management_product"."is_active"',
+        # All-time top sellers and sales by month read every rollup row
+        'SELECT "inventory_management_monthlysalesrollup"."product_id", SUM("inventory_management_monthlysalesrollup"."quantity") AS "total_quantity_sold" '
+        'FROM "inventory_management_monthlysalesrollup" GROUP BY "inventory_management_monthlysalesrollup"."product_id" '
+        'ORDER BY 2 DESC LIMIT 5',
+        'SELECT "inventory_management_monthlysalesrollup"."month", SUM("inventory_management_monthlysalesrollup"."quantity") AS "total_quantity" '
+        'FROM "inventory_management_monthlysalesrollup" GROUP BY "inventory_management_monthlysalesrollup"."month" '
+        'ORDER BY "inventory_management_monthlysalesrollup"."month" ASC',
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin_user = User.objects.create_user(username='plan_admin', password='adminpassword123', is_staff=True)
+        rng = random.Random(42)
+        kinds = ['Laptop', 'Mouse', 'Teclado', 'Monitor', 'Cable', 'Resma', 'Toner', 'Silla', 'Impresora', 'Audifonos']
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'{rng.choice(kinds)} marca{rng.randrange(400)} {i}',
+                price=Decimal('9.99'),
+                quantity=rng.randint(0, 200),
+                is_active=rng.random() < 0.9,
+            )
+            for i in range(50000)
+        ], batch_size=5000)
+        cls.product = products[0]
+        for product in products[1:4]:
+            enable_stock_striping(product, stripes=4)
+        movement_types = [InventoryMovement.MOVEMENT_INPUT, InventoryMovement.MOVEMENT_OUTPUT, InventoryMovement.MOVEMENT_ADJUSTMENT]
+        InventoryMovement.objects.bulk_create([
+            InventoryMovement(product=rng.choice(products), quantity=rng.randint(1, 20), movement_type=rng.choice(movement_types))
+            for _ in range(100000)
+        ], batch_size=10000)
+        cls.today = datetime.now(dt_timezone.utc).date()
+        with connection.cursor() as cursor:
+            ensure_month_partitions(cursor, cls.today - timedelta(days=560), cls.today)
+            cursor.execute(
+                f"UPDATE {InventoryMovement._meta.db_table} SET date = date - (id % 540) * interval '1 day'"
+            )
+        suppliers = Supplier.objects.bulk_create([
+            Supplier(name=f'Proveedor {i}', tax_id=f'NIT-{i}') for i in range(300)
+        ])
+        PurchaseOrder.objects.bulk_create([
+            PurchaseOrder(
+                supplier=rng.choice(suppliers),
+                is_paid=rng.random() < 0.8,
+                payment_due_date=cls.today + timedelta(days=rng.randint(-60, 60)),
+            )
+            for _ in range(3000)
+        ])
+        rebuild_sales_rollups()
+        with connection.cursor() as cursor:
+            # Autovacuum merges the pending entries of GIN indexes in production
+            cursor.execute("SELECT gin_clean_pending_list('inventory_management_product_search_idx')")
+            cursor.execute("ANALYZE")
+
+    def days_ago(self, days):
+        return (self.today - timedelta(days=days)).isoformat()
+
+    def explain(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN {sql}", params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def estimated_rows(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE relname = %s", [table])
+            return cursor.fetchone()[0]
+
+    def assertNoSeqScan(self, sql, params=None):
+        if sql in self.FULL_SCANS:
+            return
+        plan = self.explain(sql, params)
+        for table in re.findall(r'Seq Scan on (\w+)', plan):
+            if self.estimated_rows(table) >= self.MIN_SCANNED_ROWS:
+                self.fail(f"{sql}\n{plan}")
+
+    def assertQuerysetNoSeqScan(self, queryset):
+        self.assertNoSeqScan(*queryset.query.sql_with_params())
+
+    def test_low_stock_filter_uses_index(self):
+        queryset = ProductFilter({'low_stock': True}, queryset=Product.objects.all()).qs
+        self.assertQuerysetNoSeqScan(queryset)
+        queryset = ProductFilter({'low_stock': True, 'is_active': True}, queryset=Product.objects.all()).qs
+        self.assertQuerysetNoSeqScan(queryset)
+
+    def test_movement_filters_use_indexes(self):
+        for params in [
+            {},
+            {'product': self.product.pk},
+            {'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'start_date': self.days_ago(120), 'end_date': self.days_ago(90)},
+            {'product': self.product.pk, 'start_date': self.days_ago(120)},
+            {'movement_type': InventoryMovement.MOVEMENT_INPUT, 'end_date': self.days_ago(90)},
+        ]:
+            with self.subTest(params=params):
+                queryset = MovementFilter(params, queryset=InventoryMovement.objects.order_by('-date')).qs[:10]
+                self.assertQuerysetNoSeqScan(queryset)
+
+    def test_product_search_uses_index(self):
+        request = APIRequestFactory().get('/', {'search': 'monitor marca12'})
+        queryset = FullTextSearchFilter().filter_queryset(Request(request), Product.objects.all(), ProductViewSet())
+        self.assertQuerysetNoSeqScan(queryset[:10])
+
+    def test_report_queries_use_indexes(self):
+        self.client.force_authenticate(user=self.admin_user)
+        for params in [{}, {'start_date': self.days_ago(150), 'end_date': self.days_ago(30)}, {'product_id': self.product.pk}]:
+            with self.subTest(params=params):
+                with CaptureQueriesContext(connection) as context:
+                    response = self.client.get(reverse('inventory-reports'), params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                queries = [query['sql'] for query in context.captured_queries if query['sql'].startswith('SELECT')]
+                self.assertTrue(queries)
+                for sql in queries:
+                    self.assertNoSeqScan(sql)
+
+
+class MovementArchiveTest(APITestCase):
+    # Test case for archiving old movements with carry-forward balances
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='archive_admin', password='adminpassword123', is_staff=True)
+        self.product = Product.objects.create(name='Lapicero', price=Decimal('1.00'))
+        history = [
+            ('2023-01-05T10:00:00', InventoryMovement.MOVEMENT_INPUT, 100),
+            ('2023-01-05T10:00:00', InventoryMovement.MOVEMENT_OUTPUT, 10),
+            ('2023-02-01T10:00:00', InventoryMovement.MOVEMENT_OUTPUT, 20),
+            ('2023-03-01T10:00:00', InventoryMovement.MOVEMENT_ADJUSTMENT, 60),
+            ('2023-04-01T10:00:00', InventoryMovement.MOVEMENT_OUTPUT, 5),
+            ('2025-05-01T10:00:00', InventoryMovement.MOVEMENT_INPUT, 15),
+        ]
+        for moment, movement_type, quantity in history:
+            movement = InventoryMovement.objects.create(product=self.product, movement_type=movement_type, quantity=quantity)
+            InventoryMovement.objects.filter(pk=movement.pk).update(
+                date=datetime.fromisoformat(moment).replace(tzinfo=dt_timezone.utc)
+            )
+        self.before = datetime(2024, 1, 1, tzinfo=dt_timezone.utc)
+
+    def test_archive_moves_rows_in_chunks_and_carries_balance(self):
+        self.assertEqual(archive_movements(self.before, chunk_size=2), 5)
+        self.assertEqual(InventoryMovement.objects.count(), 1)
+        self.assertEqual(ArchivedInventoryMovement.objects.count(), 5)
+        balance = ArchivedStockBalance.objects.get(product=self.product)
+        self.assertEqual(balance.quantity, 55)
+        self.assertEqual(balance.archived_before, self.before)
+        self.assertEqual(archive_movements(self.before), 0)
+
+    def test_stock_history_stays_exact_after_archiving(self):
+        moments = [datetime(2023, 2, 15, tzinfo=dt_timezone.utc), datetime(2025, 6, 1, tzinfo=dt_timezone.utc)]
+        expected = [get_stock_at(self.product, moment)[0] for moment in moments]
+        archive_movements(self.before, chunk_size=2)
+        self.assertEqual([get_stock_at(self.product, moment)[0] for moment in moments], expected)
+        self.assertEqual(expected, [70, 70])
+
+        build_stock_snapshots(until=date(2025, 12, 31))
+        snapshot = StockSnapshot.objects.get(product=self.product)
+        self.assertEqual((snapshot.date, snapshot.quantity), (date(2025, 5, 1), 70))
+
+    def test_batch_stock_matches_point_lookups(self):
+        idle = Product.objects.create(name='Regla', price=Decimal('1.00'))
+        moments = [
+            datetime(2023, 1, 5, 10, tzinfo=dt_timezone.utc),
+            datetime(2023, 2, 15, tzinfo=dt_timezone.utc),
+            datetime(2023, 3, 1, 12, tzinfo=dt_timezone.utc),
+            datetime(2025, 6, 1, tzinfo=dt_timezone.utc),
+        ]
+        # Movements at exactly the moment are left out, the end of a window
+        expected = [0, 70, 60, 70]
+        for step in ('live', 'archived', 'snapshots'):
+            if step == 'archived':
+                archive_movements(self.before, chunk_size=2)
+            elif step == 'snapshots':
+                build_stock_snapshots(until=date(2025, 12, 31))
+            for moment, quantity in zip(moments, expected):
+                with self.subTest(step=step, moment=moment):
+                    self.assertEqual(get_stocks_before(moment), {self.product.pk: quantity, idle.pk: 0})
+
+    @skipUnless(connection.vendor == 'postgresql', 'BRIN indexes need PostgreSQL')
+    def test_archive_dates_use_a_brin_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT indexdef FROM pg_indexes WHERE indexname = 'archived_date_brin'")
+            self.assertIn('USING brin (date)', cursor.fetchone()[0])
+
+    def test_movement_list_reads_archive_only_when_asked(self):
+        archive_movements(self.before)
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('inventory_movements-list')
+        response = self.client.get(url)
+        self.assertEqual(response.data['count'], 1)
+        response = self.client.get(url, {'include_archived': 'true', 'movement_type': InventoryMovement.MOVEMENT_OUTPUT})
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual([row['quantity'] for row in response.data['results']], [5, 20, 10])
+        self.assertEqual(response.data['results'][0]['product_name'], self.product.name)
+
+    def test_movement_export_reads_archive_when_asked(self):
+        archive_movements(self.before)
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('inventory_movements-export', kwargs={'export_format': 'ndjson'})
+        response = self.client.get(url, {'include_archived': 'true', 'movement_type': InventoryMovement.MOVEMENT_OUTPUT})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row['quantity'] for row in rows], [5, 20, 10])
+        self.assertEqual(rows[0]['product_name'], self.product.name)
+
+    def test_reports_include_archived_sales(self):
+        archive_movements(self.before)
+        rebuild_sales_rollups()
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('inventory-reports'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(
+            response.data['sales_by_month'],
+            [{'month': '2023-01', 'total_quantity': 10}, {'month': '2023-02', 'total_quantity': 20}, {'month': '2023-04', 'total_quantity': 5}],
+        )
+        self.assertEqual(response.data['top_selling_products'], [{'product__name': self.product.name, 'total_quantity_sold': 35}])
+        response = self.client.get(reverse('inventory-reports'), {'start_date': '2024-06-01'})
+        self.assertEqual(response.data['sales_by_month'], [])
+
+
+class StreamingExportTest(APITestCase):
+    # Test case for the streaming CSV and NDJSON exports
+    def setUp(self):
+        self.user = User.objects.create_user(username='export_user', password='userpassword123')
+        self.pencil = Product.objects.create(name='Lapiz', price=Decimal('0.50'))
+        self.eraser = Product.objects.create(name='Borrador', price=Decimal('0.80'))
+        create_inventory_movement(self.pencil, 30, InventoryMovement.MOVEMENT_INPUT, self.user)
+        create_inventory_movement(self.pencil, 4, InventoryMovement.MOVEMENT_OUTPUT, self.user)
+        create_inventory_movement(self.eraser, 7, InventoryMovement.MOVEMENT_INPUT, self.user)
+        Product.objects.filter(pk=self.eraser.pk).update(is_active=False)
+
+    def export(self, basename, export_format, params=None):
+        url = reverse(f'{basename}-export', kwargs={'export_format': export_format})
+        response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_export_requires_authentication(self):
+        url = reverse('inventory_movements-export', kwargs={'export_format': 'csv'})
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_movement_csv_honors_filters(self):
+        self.client.force_authenticate(user=self.user)
+        response, content = self.export('inventory_movements', 'csv', {'product': self.pencil.pk})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('inventory-movements.csv', response['Content-Disposition'])
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows[0], ['id', 'date', 'product_id', 'product_name', 'movement_type', 'quantity', 'unit_price', 'user'])
+        self.assertEqual(sorted((row[4], row[5]) for row in rows[1:]), [('IN', '30'), ('OUT', '4')])
+        self.assertEqual({row[7] for row in rows[1:]}, {'export_user'})
+
+        _, content = self.export('inventory_movements', 'csv', {'movement_type': 'OUT', 'start_date': '2000-01-01'})
+        self.assertEqual(len(content.splitlines()), 2)
+        _, content = self.export('inventory_movements', 'csv', {'end_date': '2000-01-01'})
+        self.assertEqual(len(content.splitlines()), 1)
+
+    def test_product_ndjson_reports_current_stock(self):
+        self.client.force_authenticate(user=self.user)
+        response, content = self.export('products', 'ndjson', {'is_active': 'true'})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(rows, [{
+            'id': self.pencil.pk, 'name': 'Lapiz', 'description': '', 'price': '0.50', 'quantity': 26, 'is_active': True,
+        }])
+
+    def test_unknown_format_is_not_found(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(reverse('products-list') + 'export/xml/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+
+class AnalyticsExportTest(APITestCase):
+    # Test case for the Parquet export runs
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='export_admin', password='adminpassword123', is_staff=True)
+        self.product = Product.objects.create(name='Cuaderno', price=Decimal('3.50'))
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir, ignore_errors=True)
+        settings_override = override_settings(ANALYTICS_EXPORT_DIR=self.export_dir)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def add_movement(self, quantity, moment):
+        movement = create_inventory_movement(self.product, quantity, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        InventoryMovement.objects.filter(pk=movement.pk).update(date=moment)
+        return movement
+
+    def test_runs_after_the_first_are_incremental(self):
+        old = timezone.now() - timedelta(days=40)
+        first_movement = self.add_movement(5, old)
+        self.add_movement(2, timezone.now())
+
+        first = create_analytics_export()
+        self.assertTrue(first.full)
+        # The movement inside the grace period is left for the next run
+        self.assertEqual(first.high_water_mark, first_movement.pk)
+        AnalyticsExport.objects.filter(pk=first.pk).update(status=AnalyticsExport.STATUS_SUCCEEDED)
+
+        second = create_analytics_export()
+        self.assertFalse(second.full)
+        self.assertEqual(second.since, first.started_at)
+        self.assertEqual(second.since_movement_id, first.high_water_mark)
+        AnalyticsExport.objects.filter(pk=second.pk).update(status=AnalyticsExport.STATUS_FAILED)
+        self.assertTrue(create_analytics_export(full=True).full)
+
+    def test_only_one_export_runs_at_a_time(self):
+        running = create_analytics_export()
+        with self.assertRaises(ValueError):
+            create_analytics_export()
+
+        # A long run is alive as long as its heartbeat is recent
+        AnalyticsExport.objects.filter(pk=running.pk).update(started_at=timezone.now() - timedelta(days=1))
+        with self.assertRaises(ValueError):
+            create_analytics_export()
+
+        AnalyticsExport.objects.filter(pk=running.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=3))
+        create_analytics_export()
+        running.refresh_from_db()
+        self.assertEqual(running.status, AnalyticsExport.STATUS_FAILED)
+
+    def test_download_serves_only_recorded_files(self):
+        export = AnalyticsExport.objects.create(
+            status=AnalyticsExport.STATUS_SUCCEEDED,
+            files=[{'table': 'products', 'path': '1/products/part-0.parquet', 'rows': 1}],
+        )
+        os.makedirs(os.path.join(self.export_dir, '1', 'products'))
+        with open(os.path.join(self.export_dir, '1', 'products', 'part-0.parquet'), 'wb') as file:
+            file.write(b'PAR1')
+
+        url = reverse('analytics-export-file', kwargs={'pk': export.pk, 'path': '1/products/part-0.parquet'})
+        self.client.force_authenticate(user=User.objects.create_user(username='analyst', password='userpassword123'))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), b'PAR1')
+        other = reverse('analytics-export-file', kwargs={'pk': export.pk, 'path': '1/suppliers/part-0.parquet'})
+        self.assertEqual(self.client.get(other).status_code, status.HTTP_404_NOT_FOUND)
+
+    @skipUnless(pq is None, 'pyarrow is installed')
+    def test_start_without_pyarrow_is_refused(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(reverse('analytics-exports'), {'full': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(AnalyticsExport.objects.exists())
+
+    @skipUnless(pq is not None, 'Parquet exports need pyarrow')
+    def test_export_writes_month_partitions(self):
+        supplier = Supplier.objects.create(name='Papeleria Sur', tax_id='NIT-902')
+        order = PurchaseOrder.objects.create(supplier=supplier)
+        order.items.create(product=self.product, quantity=4, cost_per_unit=Decimal('2.00'))
+        self.add_movement(5, datetime(2025, 1, 10, 12, tzinfo=dt_timezone.utc))
+        self.add_movement(7, datetime(2025, 2, 10, 12, tzinfo=dt_timezone.utc))
+        self.add_movement(1, datetime(2025, 2, 11, 12, tzinfo=dt_timezone.utc))
+        # A full export also reads the archive
+        archive_movements(datetime(2025, 2, 1, tzinfo=dt_timezone.utc))
+
+        export = run_analytics_export()
+        self.assertEqual(export.status, AnalyticsExport.STATUS_SUCCEEDED)
+        rows = {file['path']: file['rows'] for file in export.files}
+        prefix = f'{export.pk}/inventory_movements'
+        self.assertEqual(rows[f'{prefix}/month=2025-01/part-0.parquet'], 1)
+        self.assertEqual(rows[f'{prefix}/month=2025-02/part-0.parquet'], 2)
+        for table in ('products', 'suppliers', 'purchase_orders', 'purchase_order_items'):
+            self.assertEqual(rows[f'{export.pk}/{table}/part-0.parquet'], 1)
+
+        products = pq.read_table(os.path.join(self.export_dir, f'{export.pk}/products/part-0.parquet')).to_pylist()
+        self.assertEqual(products[0]['quantity'], 13)
+        self.assertEqual(products[0]['price'], Decimal('3.50'))
+
+        # Nothing changed, so the next run only rewrites the products
+        export = run_analytics_export()
+        self.assertEqual([file['table'] for file in export.files], ['products'])
+
+        # An item edited without its order is exported too
+        item = order.items.get()
+        item.quantity = 6
+        item.save()
+        export = run_analytics_export()
+        self.assertEqual([file['table'] for file in export.files], ['products', 'purchase_order_items'])
+        items = pq.read_table(os.path.join(self.export_dir, f'{export.pk}/purchase_order_items/part-0.parquet')).to_pylist()
+        self.assertEqual([(row['id'], row['quantity']) for row in items], [(item.pk, 6)])
+
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+@skipUnless(numpy is not None, 'Inventory analytics need numpy')
+class InventoryAnalyticsTest(APITestCase):
+    # Test case for the vectorized ABC, turnover, days-of-supply and sell-through metrics
+    def setUp(self):
+        caches['reports'].clear()
+        self.admin_user = User.objects.create_user(username='analytics_admin', password='adminpassword123', is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+        self.products = {}
+        for name, price, received, sold in [('Tinta', '10.00', 100, 60), ('Clip', '1.00', 50, 30), ('Sobre', '5.00', 5, 0), ('Goma', '2.00', 10, 10)]:
+            product = Product.objects.create(name=name, price=Decimal(price))
+            create_inventory_movement(product, received, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+            if sold:
+                create_inventory_movement(product, sold, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            self.products[name] = product
+        # A sale long before the default window
+        old_sale = create_inventory_movement(self.products['Clip'], 5, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        InventoryMovement.objects.filter(pk=old_sale.pk).update(date=timezone.now() - timedelta(days=200))
+
+    def test_metrics_for_every_product(self):
+        response = self.client.get(reverse('inventory-analytics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['products'], 4)
+        self.assertEqual(response.data['abc_counts'], {'A': 1, 'B': 1, 'C': 2})
+        rows = {row['name']: row for row in response.data['results']}
+        self.assertEqual([row['name'] for row in response.data['results']], ['Tinta', 'Clip', 'Goma', 'Sobre'])
+        self.assertEqual(rows['Tinta'], {
+            'product_id': self.products['Tinta'].pk, 'name': 'Tinta', 'units_sold': 60, 'sales_value': 600.0,
+            'abc_class': 'A', 'turnover': 1.5, 'days_of_supply': 60.0, 'sell_through': 0.6,
+        })
+        self.assertEqual(
+            (rows['Clip']['abc_class'], rows['Clip']['units_sold'], rows['Clip']['turnover'], rows['Clip']['days_of_supply'], rows['Clip']['sell_through']),
+            ('B', 30, 2.0, 45.0, 0.6667),
+        )
+        # Sold out and never sold products have undefined metrics
+        self.assertEqual((rows['Goma']['abc_class'], rows['Goma']['turnover'], rows['Goma']['sell_through']), ('C', None, 1.0))
+        self.assertEqual((rows['Sobre']['abc_class'], rows['Sobre']['days_of_supply'], rows['Sobre']['sell_through']), ('C', None, 0.0))
+
+    def test_sales_are_valued_at_their_own_price(self):
+        # Repricing does not reclassify past sales; unpriced ones use the product price
+        Product.objects.filter(pk=self.products['Tinta'].pk).update(price=Decimal('0.10'))
+        self.products['Goma'].movements.filter(movement_type=InventoryMovement.MOVEMENT_OUTPUT).update(unit_price=None)
+        Product.objects.filter(pk=self.products['Goma'].pk).update(price=Decimal('4.00'))
+        rows = {row['name']: row for row in self.client.get(reverse('inventory-analytics')).data['results']}
+        self.assertEqual((rows['Tinta']['sales_value'], rows['Tinta']['abc_class']), (600.0, 'A'))
+        self.assertEqual(rows['Goma']['sales_value'], 40.0)
+
+    def test_window_and_class_filter(self):
+        start = (timezone.localdate() - timedelta(days=250)).isoformat()
+        response = self.client.get(reverse('inventory-analytics'), {'start_date': start, 'abc': 'B'})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['units_sold'], 35)
+
+        response = self.client.get(reverse('inventory-analytics'), {'end_date': '2000-01-01'})
+        self.assertEqual(response.data['abc_counts'], {'A': 0, 'B': 0, 'C': 4})
+
+    def test_past_window_uses_the_stock_at_its_end(self):
+        tinta = self.products['Tinta']
+        tinta.movements.update(date=timezone.now() - timedelta(days=10))
+        create_inventory_movement(tinta, 40, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        yesterday = timezone.localdate() - timedelta(days=1)
+        response = self.client.get(reverse('inventory-analytics'), {'end_date': yesterday.isoformat()})
+        row = next(row for row in response.data['results'] if row['name'] == 'Tinta')
+        # 40 units on hand at the end of yesterday, not the 80 of today
+        self.assertEqual((row['units_sold'], row['turnover'], row['sell_through']), (60, 1.5, 0.6))
+
+    def test_invalid_parameters(self):
+        for params in [{'start_date': '2025-13-01'}, {'start_date': '2025-02-01', 'end_date': '2025-01-01'}, {'abc': 'D'}]:
+            response = self.client.get(reverse('inventory-analytics'), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+
+    def test_results_are_cached_until_inventory_changes(self):
+        url = reverse('inventory-analytics')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertEqual(len(queries), 0)
+        create_inventory_movement(self.products['Sobre'], 5, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        rows = {row['name']: row for row in self.client.get(url).data['results']}
+        self.assertEqual(rows['Sobre']['units_sold'], 5)
+
+
+@skipUnless(numpy is not None, 'Forecasting needs numpy')
+class DemandForecastTest(APITestCase):
+    # Test case for the batch Holt-Winters forecasts
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='forecast_admin', password='adminpassword123', is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+
+    def test_holt_winters_repeats_a_steady_weekly_pattern(self):
+        week = [0, 0, 2, 4, 6, 8, 10]
+        series = numpy.array([week * 16, [3] * 112], dtype=float)
+        forecasts, errors = holt_winters(series, horizon=14)
+        numpy.testing.assert_allclose(forecasts[0], week * 2, atol=1e-9)
+        numpy.testing.assert_allclose(forecasts[1], [3] * 14, atol=1e-9)
+        numpy.testing.assert_allclose(errors, [0, 0], atol=1e-9)
+
+    def test_refresh_stores_forecasts_of_active_products(self):
+        today = timezone.localdate()
+        busy = Product.objects.create(name='Marcador', price=Decimal('2.00'))
+        quiet = Product.objects.create(name='Chinche', price=Decimal('0.10'))
+        retired = Product.objects.create(name='Disquete', price=Decimal('1.00'))
+        DailySalesRollup.objects.bulk_create(
+            [DailySalesRollup(product=busy, date=today - timedelta(days=day), quantity=5) for day in range(1, 113)]
+            + [DailySalesRollup(product=quiet, date=today - timedelta(days=day), quantity=1) for day in range(1, 113, 7)]
+            # Today is not complete yet and is left out
+            + [DailySalesRollup(product=busy, date=today, quantity=500)]
+        )
+        DemandForecast.objects.create(
+            product=retired, generated_at=timezone.now(), start_date=today, daily=[1], next_7_days=7, next_28_days=28, fit_error=0,
+        )
+        Product.objects.filter(pk=retired.pk).update(is_active=False)
+
+        self.assertEqual(refresh_demand_forecasts(range_size=1), 2)
+        self.assertFalse(DemandForecast.objects.filter(product=retired).exists())
+        forecast = busy.demand_forecast
+        self.assertEqual((forecast.start_date, len(forecast.daily)), (today, 28))
+        self.assertAlmostEqual(forecast.next_7_days, 35, places=1)
+        self.assertAlmostEqual(forecast.next_28_days, 140, places=1)
+
+        response = self.client.get(reverse('demand-forecasts'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['product_name'] for row in response.data['results']], ['Marcador', 'Chinche'])
+        response = self.client.get(reverse('demand-forecasts'), {'product_id': quiet.pk})
+        self.assertEqual(response.data['count'], 1)
+        self.assertLess(response.data['results'][0]['next_28_days'], 28)
+
+
+class HeavyHittersTest(APITestCase):
+    # Test case for the approximate top sellers sketches
+    def setUp(self):
+        flush_sales_sketches()
+        caches['reports'].clear()
+        self.admin_user = User.objects.create_user(username='sketch_admin', password='adminpassword123', is_staff=True)
+
+    def test_space_saving_bounds(self):
+        sketch = SpaceSaving(capacity=3)
+        stream = [1] * 50 + [2, 3, 4, 5, 6, 7] * 3 + [1] * 10
+        for item in stream:
+            sketch.add(item)
+        item, count, error = sketch.top(1)[0]
+        self.assertEqual(item, 1)
+        self.assertTrue(count - error <= 60 <= count)
+        for item, count, error in sketch.top(3):
+            self.assertTrue(count - error <= stream.count(item) <= count)
+
+        other = SpaceSaving(capacity=3, counters={'1': [5, 0], '9': [40, 0]})
+        merged = SpaceSaving(capacity=3).merge(sketch).merge(other)
+        self.assertEqual([item for item, _, _ in merged.top(2)], [1, 9])
+        self.assertEqual(len(merged.counters), 3)
+
+    def test_weighted_stream_keeps_the_invariants(self):
+        rng = random.Random(7)
+        sketch, truth = SpaceSaving(capacity=20), {}
+        for _ in range(5000):
+            item, weight = int(rng.paretovariate(1.2)), rng.randint(1, 9)
+            sketch.add(item, weight)
+            truth[item] = truth.get(item, 0) + weight
+        # Every unit is in exactly one counter, and no counter undercounts or overcounts by more than its error
+        self.assertEqual(sum(count for count, _ in sketch.counters.values()), sum(truth.values()))
+        for item, (count, error) in sketch.counters.items():
+            self.assertTrue(count - error <= truth[item] <= count)
+        self.assertEqual(sketch._floor(), min(count for count, _ in sketch.counters.values()))
+
+    def test_committed_sales_feed_the_sketch(self):
+        tape = Product.objects.create(name='Cinta', price=Decimal('1.00'))
+        glue = Product.objects.create(name='Pegamento', price=Decimal('2.00'))
+        create_inventory_movement(tape, 100, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        create_inventory_movement(glue, 100, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_inventory_movement(tape, 3, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            create_inventory_movements_bulk([
+                {'product': glue.pk, 'quantity': 8, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+                {'product': tape.pk, 'quantity': 2, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            ], self.admin_user)
+        # A rolled back sale is never counted
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(ValueError), transaction.atomic():
+                create_inventory_movement(glue, 50, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+                raise ValueError('rolled back')
+
+        today = timezone.localdate()
+        self.assertEqual(approximate_top_sellers(today, today), [(glue.pk, 8, 0), (tape.pk, 5, 0)])
+        flush_sales_sketches()
+        self.assertEqual(SalesSketch.objects.get(date=today).counters, {str(glue.pk): [8, 0], str(tape.pk): [5, 0]})
+        self.assertEqual(approximate_top_sellers(today), [(glue.pk, 8, 0), (tape.pk, 5, 0)])
+        self.assertEqual(approximate_top_sellers(end_date=today - timedelta(days=1)), [])
+
+        # Rebuilding from the exact rollups gives the same counts
+        SalesSketch.objects.all().delete()
+        self.assertEqual(rebuild_sales_sketches(days=2), 1)
+        self.assertEqual(approximate_top_sellers(today), [(glue.pk, 8, 0), (tape.pk, 5, 0)])
+
+    def test_exit_flush(self):
+        # Nothing pending: the exit flush never touches the database
+        with self.assertNumQueries(0):
+            _flush_at_exit()
+
+        today = timezone.localdate()
+        product = Product.objects.create(name='Clip', price=Decimal('0.10'))
+        with mock.patch('inventory_management.heavy_hitters.settings.SALES_SKETCH_FLUSH_SECONDS', 3600):
+            record_sales({(product.pk, today): 4})
+            with mock.patch('inventory_management.heavy_hitters._persist_sketch', side_effect=DatabaseError('no such table')):
+                with self.assertLogs('inventory_management.heavy_hitters', 'WARNING'):
+                    _flush_at_exit()
+            self.assertEqual(approximate_top_sellers(today), [])
+
+            record_sales({(product.pk, today): 4})
+            _flush_at_exit()
+        self.assertEqual(SalesSketch.objects.get(date=today).counters, {str(product.pk): [4, 0]})
+
+    def test_reports_approx_mode(self):
+        product = Product.objects.create(name='Folder', price=Decimal('1.00'))
+        SalesSketch.objects.create(date=timezone.localdate(), counters={str(product.pk): [42, 3]})
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.get(reverse('inventory-reports'), {'approx': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['top_selling_products'], [{'product__name': 'Folder', 'total_quantity_sold': 42}])
+        response = self.client.get(reverse('inventory-reports'), {'start_date': '2020-01-01'})
+        self.assertEqual(response.data['top_selling_products'], [])
+
+
+class StockReconciliationTest(APITestCase):
+    # Test case for reconciling recorded stock against the movement ledger
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='recon_admin', password='adminpassword123', is_staff=True)
+        self.regular_user = User.objects.create_user(username='recon_user', password='userpassword123', is_staff=False)
+        self.product1 = Product.objects.create(name='Cuaderno', price=Decimal('3.00'))
+        self.product2 = Product.objects.create(name='Borrador', price=Decimal('0.50'))
+        for product in (self.product1, self.product2):
+            create_inventory_movement(product, 50, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+            create_inventory_movement(product, 10, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            create_inventory_movement(product, 30, InventoryMovement.MOVEMENT_ADJUSTMENT, self.admin_user)
+            create_inventory_movement(product, 5, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        # Older than the grace period, so the first run moves the high-water mark past them
+        InventoryMovement.objects.update(date=timezone.now() - timedelta(hours=1))
+
+    def test_full_run_finds_and_repairs_drift(self):
+        Product.objects.filter(pk=self.product1.pk).update(quantity=99)
+
+        run = reconcile_stock(range_size=1)
+        self.assertTrue(run.full)
+        self.assertEqual(run.products_checked, 2)
+        self.assertEqual(run.high_water_mark, InventoryMovement.objects.order_by('-id').first().id)
+        drift = run.drifts.get()
+        self.assertEqual((drift.product_id, drift.recorded_quantity, drift.expected_quantity, drift.repaired), (self.product1.pk, 99, 35, False))
+
+        run = reconcile_stock(full=True, repair=True)
+        self.assertEqual(run.repaired_count, 1)
+        self.product1.refresh_from_db()
+        self.assertEqual(self.product1.quantity, 35)
+        self.assertEqual(reconcile_stock(full=True).drift_count, 0)
+
+    def test_incremental_run_only_checks_changed_products(self):
+        reconcile_stock()
+        movement = create_inventory_movement(self.product2, 4, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        InventoryMovement.objects.filter(pk=movement.pk).update(date=timezone.now() - timedelta(hours=1))
+        Product.objects.filter(pk=self.product2.pk).update(quantity=12)
+        # Edited without a movement, so only a full run notices it
+        Product.objects.filter(pk=self.product1.pk).update(quantity=7)
+
+        run = reconcile_stock()
+        self.assertFalse(run.full)
+        self.assertEqual(run.products_checked, 1)
+        self.assertEqual([(d.product_id, d.recorded_quantity, d.expected_quantity) for d in run.drifts.all()], [(self.product2.pk, 12, 31)])
+        self.assertEqual(reconcile_stock().products_checked, 0)
+        self.assertEqual(reconcile_stock(full=True).drift_count, 2)
+
+    def test_striped_and_archived_stock_is_replayed_from_carry_forward(self):
+        archive_movements(timezone.now() - timedelta(minutes=30))
+        enable_stock_striping(self.product1, stripes=4)
+        self.assertEqual(reconcile_stock(full=True).drift_count, 0)
+
+        StockStripe.objects.filter(product=self.product1, index=0).update(quantity=F('quantity') + 6)
+        run = reconcile_stock(full=True, repair=True)
+        self.assertEqual(run.drifts.get().recorded_quantity, 41)
+        self.assertEqual(Product.objects.with_stock().get(pk=self.product1.pk).stock, 35)
+        self.assertEqual(sum(self.product1.stock_stripes.values_list('quantity', flat=True)), 35)
+
+    def test_reconciliation_api(self):
+        url = reverse('stock-reconciliation')
+        self.client.force_authenticate(user=self.regular_user)
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(user=self.admin_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+        Product.objects.filter(pk=self.product2.pk).update(quantity=1)
+        response = self.client.post(url, {'repair': True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(response.data['drift_count'], 1)
+        self.assertEqual(response.data['drifts'][0]['product_name'], self.product2.name)
+        self.assertTrue(response.data['drifts'][0]['repaired'])
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['repaired_count'], 1)
+
+
+class SalesRollupTest(APITestCase):
+    # Test case for the daily and monthly sales rollups
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='rollup_admin', password='adminpassword123', is_staff=True)
+        self.product1 = Product.objects.create(name='Marcador', price=Decimal('2.00'))
+        self.product2 = Product.objects.create(name='Resaltador', price=Decimal('2.50'))
+        for product in (self.product1, self.product2):
+            create_inventory_movement(product, 100, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+
+    def sales(self, model):
+        return sorted(model.objects.values_list('product_id', 'quantity'))
+
+    def test_movement_writes_update_rollups(self):
+        create_inventory_movement(self.product1, 4, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        create_inventory_movement(self.product1, 6, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        create_inventory_movement(self.product1, 50, InventoryMovement.MOVEMENT_ADJUSTMENT, self.admin_user)
+        create_inventory_movements_bulk([
+            {'product': self.product1.pk, 'quantity': 5, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'product': self.product2.pk, 'quantity': 7, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            {'product': self.product2.pk, 'quantity': 500, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+        ], self.admin_user)
+
+        today = timezone.localdate()
+        expected = [(self.product1.pk, 15), (self.product2.pk, 7)]
+        self.assertEqual(self.sales(DailySalesRollup), expected)
+        self.assertEqual(self.sales(MonthlySalesRollup), expected)
+        self.assertEqual(set(DailySalesRollup.objects.values_list('date', flat=True)), {today})
+        self.assertEqual(set(MonthlySalesRollup.objects.values_list('month', flat=True)), {today.replace(day=1)})
+
+    def test_striped_products_spread_their_rollups(self):
+        enable_stock_striping(self.product1, stripes=4)
+        with mock.patch('inventory_management.services.random', random.Random(0)):
+            for _ in range(12):
+                create_inventory_movement(self.product1, 1, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            create_inventory_movements_bulk([
+                {'product': self.product1.pk, 'quantity': 3, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+            ], self.admin_user)
+        for model in (DailySalesRollup, MonthlySalesRollup):
+            rows = model.objects.filter(product=self.product1)
+            self.assertTrue(1 < rows.count() <= 4)
+            self.assertEqual(rows.aggregate(total=Sum('quantity'))['total'], 15)
+
+        # Readers sum the stripes
+        top = InventoryReportsView()._build_report({})['top_selling_products']
+        self.assertEqual(top, [{'product__name': 'Marcador', 'total_quantity_sold': 15}])
+        rebuild_sales_sketches(days=1)
+        self.assertEqual(SalesSketch.objects.get(date=timezone.localdate()).counters, {str(self.product1.pk): [15, 0]})
+        # Rebuilding folds them back into one row
+        rebuild_sales_rollups()
+        self.assertEqual(self.sales(DailySalesRollup), [(self.product1.pk, 15)])
+
+    def test_rebuild_recomputes_from_live_and_archived_ledger(self):
+        for moment, quantity in [('2023-01-31T23:00:00', 3), ('2023-02-01T09:00:00', 4), ('2025-02-10T09:00:00', 5)]:
+            movement = create_inventory_movement(self.product1, quantity, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            InventoryMovement.objects.filter(pk=movement.pk).update(
+                date=datetime.fromisoformat(moment).replace(tzinfo=dt_timezone.utc)
+            )
+        archive_movements(datetime(2024, 1, 1, tzinfo=dt_timezone.utc))
+        DailySalesRollup.objects.create(product=self.product2, date=date(2020, 1, 1), quantity=99)
+
+        self.assertEqual(rebuild_sales_rollups(range_size=1), 2)
+        self.assertEqual(
+            list(DailySalesRollup.objects.order_by('date').values_list('date', 'quantity')),
+            [(date(2023, 1, 31), 3), (date(2023, 2, 1), 4), (date(2025, 2, 10), 5)],
+        )
+        self.assertEqual(
+            list(MonthlySalesRollup.objects.order_by('month').values_list('month', 'quantity')),
+            [(date(2023, 1, 1), 3), (date(2023, 2, 1), 4), (date(2025, 2, 1), 5)],
+        )
+
+    def test_reports_read_rollups_for_whole_day_windows(self):
+        create_inventory_movement(self.product1, 8, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        create_inventory_movement(self.product2, 3, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+        # Rollups are the source of truth for whole-day windows
+        MonthlySalesRollup.objects.filter(product=self.product2).update(quantity=30)
+        DailySalesRollup.objects.filter(product=self.product2).update(quantity=30)
+
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('inventory-reports')
+        today = timezone.localdate()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data['kpis']['sales_current_month'], 38)
+        self.assertEqual(response.data['top_selling_products'][0], {'product__name': self.product2.name, 'total_quantity_sold': 30})
+
+        response = self.client.get(url, {'start_date': today.isoformat(), 'product_id': self.product1.pk})
+        self.assertEqual(response.data['sales_by_month'], [{'month': today.strftime('%Y-%m'), 'total_quantity': 8}])
+
+        # A bound inside a day falls back to the raw ledger
+        response = self.client.get(url, {'start_date': f'{today.isoformat()}T00:00:01'})
+        self.assertEqual(response.data['top_selling_products'][0], {'product__name': self.product1.name, 'total_quantity_sold': 8})
+
+
+class ReportCacheTest(APITestCase):
+    # Test case for the versioned report cache
+    def setUp(self):
+        caches['reports'].clear()
+        self.admin_user = User.objects.create_user(username='cache_admin', password='adminpassword123', is_staff=True)
+        self.product = Product.objects.create(name='Regla', price=Decimal('1.20'))
+        self.supplier = Supplier.objects.create(name='Papeleria Central', tax_id='NIT-900')
+
+    def assertBumps(self, write):
+        before = get_inventory_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            write()
+        self.assertTrue(callbacks)
+        self.assertNotEqual(get_inventory_version(), before)
+
+    def test_writes_bump_inventory_version(self):
+        self.assertBumps(lambda: create_inventory_movement(self.product, 5, InventoryMovement.MOVEMENT_INPUT, self.admin_user))
+        self.assertBumps(lambda: create_inventory_movements_bulk(
+            [{'product': self.product.pk, 'quantity': 1, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT}], self.admin_user
+        ))
+        self.assertBumps(lambda: Product.objects.filter(pk=self.product.pk).first().save())
+        self.assertBumps(lambda: PurchaseOrder.objects.create(supplier=self.supplier))
+
+        order = PurchaseOrder.objects.create(supplier=self.supplier, status='approved')
+        order.items.create(product=self.product, quantity=3, cost_per_unit=Decimal('1.00'))
+        self.assertBumps(lambda: receive_purchase_order(order, self.admin_user))
+
+    def test_reports_are_cached_until_inventory_changes(self):
+        self.client.force_authenticate(user=self.admin_user)
+        url = reverse('inventory-reports')
+        params = {'start_date': '2020-01-01'}
+        self.assertEqual(self.client.get(url, params).data['kpis']['total_products'], 1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(response.data['kpis']['total_products'], 1)
+
+        # Different parameters are cached separately
+        self.client.get(url, {'product_id': self.product.pk})
+        Product.objects.create(name='Compas', price=Decimal('4.00'))
+        self.assertEqual(self.client.get(url, params).data['kpis']['total_products'], 2)
+
+        stats = self.client.get(reverse('report-cache-stats')).data
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+        self.assertEqual(stats['coalescing']['reports']['computed'], 3)
+        self.assertEqual(stats['version'], get_inventory_version())
+
+
+class CoalescingTest(TestCase):
+    # Test case for single-flight coalescing of identical requests
+    def setUp(self):
+        caches['reports'].clear()
+
+    def test_concurrent_calls_share_one_computation(self):
+        started, release = threading.Event(), threading.Event()
+        calls, results = [], []
+
+        def compute():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return {'total': 42}
+
+        def request():
+            results.append(coalesce('reports', 'same-key', compute))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.2)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'total': 42}] * 5)
+        stats = coalescing_stats()['reports']
+        self.assertEqual((stats['computed'], stats['shared'], stats['coalescing_ratio']), (1, 4, 0.8))
+
+        # Once finished the key computes again
+        coalesce('reports', 'same-key', compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_leader_error_is_raised_and_not_remembered(self):
+        def fail():
+            raise ValueError('boom')
+
+        with self.assertRaises(ValueError):
+            coalesce('suggestions', 'key', fail)
+        self.assertEqual(coalesce('suggestions', 'key', lambda: ['Regla']), ['Regla'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Advisory locks need PostgreSQL')
+    @override_settings(COALESCE_ACROSS_WORKERS=True)
+    def test_result_stored_by_another_worker_is_reused(self):
+        compute = mock.Mock(return_value='computed')
+        self.assertEqual(coalesce('reports', 'key', compute, recheck=lambda: 'stored'), 'stored')
+        compute.assert_not_called()
+        self.assertEqual(coalesce('reports', 'key', compute, recheck=lambda: None), 'computed')
+        self.assertEqual(coalescing_stats()['reports'], {'computed': 1, 'shared': 1, 'coalescing_ratio': 0.5})
+
+
+class ReportQueryCountTest(APITestCase):
+    # The dashboard must stay at a fixed number of queries however much data there is
+    def setUp(self):
+        caches['reports'].clear()
+        self.admin_user = User.objects.create_user(username='count_admin', password='adminpassword123', is_staff=True)
+        supplier = Supplier.objects.create(name='Distribuidora Norte', tax_id='NIT-901')
+        for i in range(8):
+            product = Product.objects.create(name=f'Producto {i}', price=Decimal('5.00'))
+            create_inventory_movement(product, 20, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+            create_inventory_movement(product, i + 1, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            PurchaseOrder.objects.create(supplier=supplier, payment_terms=3)
+        self.client.force_authenticate(user=self.admin_user)
+
+    def test_dashboard_query_count(self):
+        with self.assertNumQueries(9):
+            report = InventoryReportsView()._build_report({})
+        kpis = report['kpis']
+        self.assertEqual((kpis['total_products'], kpis['low_stock_count']), (8, 0))
+        self.assertEqual(kpis['sales_current_month'], 36)
+        self.assertEqual(kpis['due_purchase_orders_count'], 8)
+        self.assertEqual(len(report['recent_movements']), 5)
+
+        # Once precomputed, the dashboard is a single lookup
+        self.client.get(reverse('inventory-reports'))
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('inventory-reports'))
+        self.assertEqual(response.data['kpis']['total_products'], 8)
+
+    def test_filtered_report_query_count(self):
+        today = timezone.localdate()
+        params = {'start_date': today.replace(day=1).isoformat(), 'end_date': (today + timedelta(days=1)).isoformat()}
+        with self.assertNumQueries(12):
+            response = self.client.get(reverse('inventory-reports'), params)
+        self.assertEqual(response.data['sales_by_month'], [{'month': today.strftime('%Y-%m'), 'total_quantity': 36}])
+
+
+class AsyncReportsViewTest(APITransactionTestCase):
+    # Committed data, because the async view reads it from other connections
+    def setUp(self):
+        caches['reports'].clear()
+        self.admin_user = User.objects.create_user(username='async_admin', password='adminpassword123', is_staff=True)
+        self.regular_user = User.objects.create_user(username='async_user', password='userpassword123', is_staff=False)
+        supplier = Supplier.objects.create(name='Distribuidora Sur', tax_id='NIT-902')
+        for i in range(4):
+            product = Product.objects.create(name=f'Articulo {i}', price=Decimal('3.00'))
+            create_inventory_movement(product, 12, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+            create_inventory_movement(product, 2 * i + 1, InventoryMovement.MOVEMENT_OUTPUT, self.admin_user)
+            PurchaseOrder.objects.create(supplier=supplier, payment_terms=2)
+
+    def test_async_view_matches_sync_view(self):
+        self.client.force_authenticate(user=self.admin_user)
+        today = timezone.localdate()
+        for params in [{}, {'start_date': today.isoformat()}, {'start_date': f'{today.isoformat()}T00:00:01'}]:
+            caches['reports'].clear()
+            sync_response = self.client.get(reverse('inventory-reports'), params)
+            caches['reports'].clear()
+            async_response = self.client.get(reverse('inventory-reports-async'), params)
+            self.assertEqual(async_response.status_code, status.HTTP_200_OK)
+            self.assertEqual(async_response.json(), sync_response.json())
+        self.assertEqual(async_response.json()['kpis']['due_purchase_orders_count'], 4)
+
+    def test_async_view_permissions(self):
+        url = reverse('inventory-reports-async')
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.force_authenticate(user=self.regular_user)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class DashboardSnapshotTest(TestCase):
+    # Test case for the precomputed dashboard payload
+    def build(self, total):
+        return lambda: {'kpis': {'total_products': total}, 'recent_movements': [{'date': datetime(2025, 3, 1, 12, 30, tzinfo=dt_timezone.utc)}]}
+
+    def test_first_request_builds_and_later_ones_read_the_stored_payload(self):
+        report = get_dashboard(self.build(3))
+        self.assertEqual(report['kpis'], {'total_products': 3})
+        self.assertIn('generated_at', report)
+
+        with self.assertNumQueries(1):
+            report = get_dashboard(self.build(4))
+        self.assertEqual(report['kpis'], {'total_products': 3})
+        # Stored as rendered JSON
+        self.assertEqual(report['recent_movements'], [{'date': '2025-03-01T12:30:00Z'}])
+
+    def test_stale_payload_is_served_while_one_refresh_runs_in_background(self):
+        refresh_dashboard(self.build(3))
+        DashboardSnapshot.objects.update(generated_at=timezone.now() - timedelta(hours=1))
+
+        with mock.patch('inventory_management.dashboard.threading.Thread') as thread:
+            report = get_dashboard(self.build(4))
+            get_dashboard(self.build(5))
+        self.assertEqual(report['kpis'], {'total_products': 3})
+        thread.assert_called_once()
+        thread.return_value.start.assert_called_once()
+        self.assertIsNotNone(DashboardSnapshot.objects.get().refreshing_since)
+
+        # The thread refreshes with the request's builder; doing the same
+        # here stores the new payload and releases the claim
+        self.assertEqual(thread.call_args.kwargs['target'].__name__, '_refresh_in_background')
+        refresh_dashboard(*thread.call_args.kwargs['args'])
+        snapshot = DashboardSnapshot.objects.get()
+        self.assertEqual(snapshot.payload['kpis'], {'total_products': 4})
+        self.assertIsNone(snapshot.refreshing_since)
+
+
+class InventoryValuationTest(APITestCase):
+    # Test case for the cost layers and the valuation report
+    def setUp(self):
+        caches['reports'].clear()
+        self.admin_user = User.objects.create_user(username='valuation_admin', password='adminpassword123', is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+        self.paper = Product.objects.create(name='Resma', price=Decimal('5.00'))
+
+    def move(self, quantity, movement_type, unit_price=None):
+        create_inventory_movement(self.paper, quantity, movement_type, self.admin_user, unit_price=unit_price)
+
+    def layers(self):
+        return list(self.paper.cost_layers.order_by('received_at', 'id').values_list('quantity', 'unit_cost'))
+
+    def test_fifo_consumes_the_oldest_layers_first(self):
+        self.move(10, InventoryMovement.MOVEMENT_INPUT, Decimal('2.00'))
+        self.move(10, InventoryMovement.MOVEMENT_INPUT, Decimal('3.00'))
+        self.move(15, InventoryMovement.MOVEMENT_OUTPUT)
+        self.assertEqual(self.layers(), [(5, Decimal('3.00'))])
+
+        create_inventory_movements_bulk([
+            {'product': self.paper.pk, 'quantity': 5, 'movement_type': InventoryMovement.MOVEMENT_INPUT, 'unit_price': Decimal('4.00')},
+            {'product': self.paper.pk, 'quantity': 7, 'movement_type': InventoryMovement.MOVEMENT_OUTPUT},
+        ], self.admin_user)
+        self.assertEqual(self.layers(), [(3, Decimal('4.00'))])
+
+        # Found units are valued at the current average cost
+        self.move(10, InventoryMovement.MOVEMENT_ADJUSTMENT)
+        valuation = InventoryValuation.objects.get(product=self.paper)
+        self.assertEqual((valuation.quantity, valuation.value), (10, Decimal('40.00')))
+
+        response = self.client.get(reverse('inventory-valuation'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['method'], 'fifo')
+        self.assertEqual((response.data['quantity'], response.data['value']), (10, Decimal('40.00')))
+        self.assertEqual(response.data['results'][0]['average_cost'], '4.0000')
+
+    @override_settings(INVENTORY_COSTING_METHOD='average')
+    def test_weighted_average(self):
+        self.move(10, InventoryMovement.MOVEMENT_INPUT, Decimal('2.00'))
+        self.move(10, InventoryMovement.MOVEMENT_INPUT, Decimal('4.00'))
+        self.move(5, InventoryMovement.MOVEMENT_OUTPUT)
+        self.assertEqual(self.layers(), [])
+        valuation = InventoryValuation.objects.get(product=self.paper)
+        self.assertEqual((valuation.quantity, valuation.value), (15, Decimal('45.00')))
+
+        self.move(15, InventoryMovement.MOVEMENT_OUTPUT)
+        self.assertEqual(InventoryValuation.objects.get(product=self.paper).value, 0)
+
+    @override_settings(INVENTORY_COSTING_METHOD='lifo')
+    def test_unknown_costing_method(self):
+        response = self.client.get(reverse('inventory-valuation'))
+        self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+
+    def test_rebuild_replays_live_and_archived_history(self):
+        pen = Product.objects.create(name='Lapicera', price=Decimal('1.00'))
+        self.move(10, InventoryMovement.MOVEMENT_INPUT, Decimal('2.00'))
+        self.move(4, InventoryMovement.MOVEMENT_OUTPUT)
+        InventoryMovement.objects.update(date=timezone.now() - timedelta(days=400))
+        self.move(10, InventoryMovement.MOVEMENT_INPUT, Decimal('3.00'))
+        self.move(8, InventoryMovement.MOVEMENT_OUTPUT)
+        archive_movements(timezone.now() - timedelta(days=365))
+        expected = (InventoryValuation.objects.get(product=self.paper).value, self.layers())
+        self.assertEqual(expected, (Decimal('24.00'), [(8, Decimal('3.00'))]))
+
+        # Stock recorded without movements is valued at the product price
+        Product.objects.filter(pk=pen.pk).update(quantity=6)
+        CostLayer.objects.all().delete()
+        InventoryValuation.objects.all().delete()
+
+        self.assertEqual(rebuild_cost_layers(range_size=1), 2)
+        self.assertEqual((InventoryValuation.objects.get(product=self.paper).value, self.layers()), expected)
+        self.assertEqual(InventoryValuation.objects.get(product=pen).value, Decimal('6.00'))
+        response = self.client.get(reverse('inventory-valuation'), {'product_id': pen.pk})
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['value'], Decimal('30.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Row locks need PostgreSQL')
+class PendingCostTest(APITransactionTestCase):
+    # Committed valuations, because another connection holds one of them
+    def setUp(self):
+        self.product = Product.objects.create(name='Oferta Relampago', price=Decimal('5.00'))
+        create_inventory_movement(self.product, 10, InventoryMovement.MOVEMENT_INPUT, None, unit_price=Decimal('2.00'))
+        enable_stock_striping(self.product, stripes=2)
+
+    def layers(self):
+        return list(self.product.cost_layers.order_by('received_at', 'id').values_list('quantity', 'unit_cost'))
+
+    def move_while_valuation_is_held(self, *quantities):
+        held, release = threading.Event(), threading.Event()
+
+        def hold_valuation():
+            try:
+                with transaction.atomic():
+                    InventoryValuation.objects.select_for_update().get(product=self.product)
+                    held.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        holder = threading.Thread(target=hold_valuation)
+        holder.start()
+        self.assertTrue(held.wait(10))
+        try:
+            # Waiting on the held valuation would time out instead of queuing
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute("SET LOCAL lock_timeout = '2s'")
+                for quantity in quantities:
+                    create_inventory_movement(self.product, quantity, InventoryMovement.MOVEMENT_OUTPUT, None)
+        finally:
+            release.set()
+            holder.join()
+
+    def test_striped_movements_queue_behind_a_busy_valuation(self):
+        self.move_while_valuation_is_held(3, 1)
+        self.assertEqual(PendingCost.objects.filter(product=self.product).count(), 2)
+        self.assertEqual(self.layers(), [(10, Decimal('2.00'))])
+
+        # The next movement applies the queue before its own cost
+        create_inventory_movement(self.product, 5, InventoryMovement.MOVEMENT_INPUT, None, unit_price=Decimal('3.00'))
+        self.assertEqual(self.layers(), [(6, Decimal('2.00')), (5, Decimal('3.00'))])
+        self.assertFalse(PendingCost.objects.exists())
+
+        self.move_while_valuation_is_held(4)
+        self.assertEqual(apply_pending_costs([self.product.pk]), 1)
+        valuation = InventoryValuation.objects.get(product=self.product)
+        self.assertEqual((valuation.quantity, valuation.value), (7, Decimal('19.00')))
+
+    def test_unstriping_applies_the_queue(self):
+        self.move_while_valuation_is_held(6)
+        disable_stock_striping(self.product)
+        self.assertEqual(self.layers(), [(4, Decimal('2.00'))])
+        self.assertFalse(PendingCost.objects.exists())
+
+
+class ConditionalGetTest(APITestCase):
+    # ETags and Last-Modified from the inventory version
+    def setUp(self):
+        # Validators are only sent when every worker shares the reports cache
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir, ignore_errors=True)
+        settings_override = override_settings(CACHES={
+            **settings.CACHES,
+            'reports': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir},
+        })
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.admin_user = User.objects.create_user(username='etag_admin', password='adminpassword123', is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+        self.product = Product.objects.create(name='Borrador', price=Decimal('0.50'))
+        self.supplier = Supplier.objects.create(name='Papelera Este', tax_id='NIT-701')
+
+    def test_unchanged_lists_answer_304_without_queries(self):
+        for url in [
+            reverse('products-list'),
+            reverse('products-detail', args=[self.product.pk]),
+            reverse('inventory_movements-list'),
+            reverse('supplier-list'),
+            reverse('purchase-order-list'),
+        ]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                etag = response['ETag']
+                with self.assertNumQueries(0):
+                    response = self.client.get(url, HTTP_IF_NONE_MATCH=f'W/{etag}')
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual((response['ETag'], response.content), (etag, b''))
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_writes_change_the_etag(self):
+        url = reverse('supplier-list')
+        etag = self.client.get(url)['ETag']
+        self.supplier.products.add(self.product)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['results'][0]['products'][0]['name'], 'Borrador')
+
+        etag = response['ETag']
+        create_inventory_movement(self.product, 5, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+        # Another user gets their own tag
+        other = User.objects.create_user(username='etag_other', password='adminpassword123', is_staff=True)
+        etag = self.client.get(url)['ETag']
+        self.client.force_authenticate(user=other)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_writes_from_another_process_change_the_etag(self):
+        url = reverse('products-list')
+        etag = self.client.get(url)['ETag']
+        # A management command or another worker bumps the version through its own cache connection
+        with mock.patch('inventory_management.report_cache.caches', {'reports': caches.create_connection('reports')}):
+            bump_inventory_version()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_no_validators_without_a_shared_cache(self):
+        url = reverse('products-list')
+        with self.settings(CACHES={**settings.CACHES, 'reports': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('ETag', response)
+            # The dashboard's version comes from its stored row, so it still has one
+            self.assertIn('ETag', self.client.get(reverse('inventory-reports')))
+
+    def test_unshared_cache_is_reported_outside_debug(self):
+        self.assertEqual(check_shared_cache(), [])
+        with self.settings(CACHES={**settings.CACHES, 'reports': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with self.settings(DEBUG=True):
+                self.assertEqual(check_shared_cache(), [])
+            self.assertEqual([warning.id for warning in check_shared_cache()], ['inventory_management.W001'])
+
+    def test_reports(self):
+        url = reverse('inventory-reports')
+        for params in [{}, {'start_date': '2025-01-01'}]:
+            with self.subTest(params=params):
+                etag = self.client.get(url, params)['ETag']
+                with self.assertNumQueries(1 if not params else 0):
+                    response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # The dashboard changes with its stored payload, not with every write
+        etag = self.client.get(url)['ETag']
+        DashboardSnapshot.objects.update(generated_at=timezone.now() + timedelta(seconds=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+
+class FullTextSearchTest(APITestCase):
+    # Test case for the product and supplier search
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='search_admin', password='adminpassword123', is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+        Product.objects.create(name='Laptop Z1 Pro', description='Potente laptop para desarrollo', price=Decimal('1500.00'))
+        Product.objects.create(name='Mochila', description='Mochila para laptop de 15 pulgadas', price=Decimal('40.00'))
+        Product.objects.create(name='Mouse Ergo', description='Mouse inalambrico', price=Decimal('25.00'))
+        Supplier.objects.create(name='Distribuidora Andina', tax_id='NIT-801', contact_person='Lucia Rojas')
+
+    def search(self, url_name, term):
+        response = self.client.get(reverse(url_name), {'search': term})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['name'] for row in response.data['results']]
+
+    def test_search_query_keeps_only_words(self):
+        self.assertIsNone(search_query(['', "&|!:*'"]))
+        self.assertEqual(str(search_query(['lap  top!', 'ño'])).count(':*'), 3)
+
+    def test_search_products_and_suppliers(self):
+        self.assertEqual(self.search('products-list', 'mouse'), ['Mouse Ergo'])
+        self.assertEqual(self.search('products-list', 'mochila laptop'), ['Mochila'])
+        self.assertEqual(self.search('supplier-list', 'lucia'), ['Distribuidora Andina'])
+        self.assertEqual(len(self.search('products-list', '')), 3)
+
+    @skipUnless(connection.vendor == 'postgresql', 'Full-text search needs PostgreSQL')
+    def test_prefixes_ranked_by_field_weight(self):
+        # A match in the name outranks one in the description
+        self.assertEqual(self.search('products-list', 'lapt'), ['Laptop Z1 Pro', 'Mochila'])
+        self.assertEqual(self.search('products-list', 'lapt z1'), ['Laptop Z1 Pro'])
+        # An explicit ordering still wins
+        response = self.client.get(reverse('products-list'), {'search': 'lapt', 'ordering': 'price'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Mochila', 'Laptop Z1 Pro'])
+
+        # The trigger also covers queryset updates and bulk inserts
+        Product.objects.filter(name='Mouse Ergo').update(description='Mouse para laptop')
+        Product.objects.bulk_create([Product(name='Funda laptop', price=Decimal('9.00'))])
+        self.assertEqual(len(self.search('products-list', 'laptop')), 4)
+        self.assertEqual(self.search('supplier-list', 'nit 801'), ['Distribuidora Andina'])
+
+
+class AutocompleteTest(APITestCase):
+    # Test case for the in-memory product autocomplete
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='autocomplete_admin', password='adminpassword123', is_staff=True)
+        self.client.force_authenticate(user=self.admin_user)
+        self.laptop = Product.objects.create(**product1_data)
+        Product.objects.create(**product2_data)
+        Product.objects.create(**product_inactive_data)
+        refresh_prefix_index()
+
+    def suggest(self, term, **params):
+        response = self.client.get(reverse('products-suggestions'), {'search': term, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_prefix_index_order(self):
+        index = PrefixIndex([
+            (1, 'Mouse Ergo'), (2, 'Café Molido'), (3, 'Cable HDMI'), (4, 'Monitor 24 pulgadas'), (5, 'Soporte monitor'),
+        ])
+        # Names starting with the text first, then names with a word starting with it
+        self.assertEqual(index.suggest('mo'), ['Monitor 24 pulgadas', 'Mouse Ergo', 'Café Molido', 'Soporte monitor'])
+        self.assertEqual(index.suggest('mo', limit=2), ['Monitor 24 pulgadas', 'Mouse Ergo'])
+        self.assertEqual(index.suggest('CAFE'), ['Café Molido'])
+        self.assertEqual(index.suggest('pulg 24'), ['Monitor 24 pulgadas'])
+        self.assertEqual(index.suggest('soporte-mon'), ['Soporte monitor'])
+        self.assertEqual(index.suggest('zz'), [])
+        self.assertEqual(len(index.suggest('')), 5)
+
+    def test_suggestions_without_queries(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.suggest('lap'), ['Laptop Z1 Pro'])
+        self.assertEqual(self.suggest('ergo'), ['Mouse Ergo RGB'])
+        # Inactive products are not suggested, unless asked through the filters
+        self.assertEqual(self.suggest('teclado'), [])
+        self.assertEqual(self.suggest('teclado', is_active='false'), ['Teclado Antiguo'])
+
+    def test_product_writes_refresh_the_index(self):
+        version = get_catalog_version()
+        create_inventory_movement(self.laptop, 5, InventoryMovement.MOVEMENT_INPUT, self.admin_user)
+        self.laptop.quantity = 3
+        self.laptop.save(update_fields=['quantity'])
+        self.assertEqual(get_catalog_version(), version)
+
+        self.laptop.name = 'Portatil Z1 Pro'
+        self.laptop.save()
+        self.assertNotEqual(get_catalog_version(), version)
+        # A stale index keeps answering while it is rebuilt in the background
+        with mock.patch('inventory_management.autocomplete._rebuilding', False), \
+                mock.patch('inventory_management.autocomplete.threading.Thread') as thread:
+            self.assertEqual(self.suggest('lap'), ['Laptop Z1 Pro'])
+            self.suggest('lap')
+        thread.assert_called_once()
+        self.assertEqual(thread.call_args.kwargs['target'].__name__, '_rebuild_in_background')
+
+        refresh_prefix_index()
+        self.assertEqual(self.suggest('lap'), [])
+        self.assertEqual(self.suggest('port'), ['Portatil Z1 Pro'])
+
+    def test_changes_from_other_processes_refresh_the_index(self):
+        # Like a rename in another process, whose catalog version this worker never sees
+        with mock.patch('inventory_management.autocomplete.get_catalog_version', return_value=get_catalog_version()), \
+                mock.patch('inventory_management.autocomplete._rebuilding', False), \
+                mock.patch('inventory_management.autocomplete.threading.Thread') as thread:
+            response = self.client.patch(reverse('products-detail', args=[self.laptop.pk]), {'name': 'Portatil Z1 Pro'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            with self.assertNumQueries(0):
+                self.suggest('lap')
+            thread.assert_not_called()
+            with self.settings(AUTOCOMPLETE_CHECK_SECONDS=0):
+                self.assertEqual(self.suggest('lap'), ['Laptop Z1 Pro'])
+        thread.assert_called_once()
+
+        refresh_prefix_index()
+        self.assertEqual(self.suggest('port'), ['Portatil Z1 Pro'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'Fuzzy suggestions need PostgreSQL')
+    def test_fuzzy_fallback(self):
+        if not has_trigram(connection):
+            self.skipTest('pg_trgm is not installed')
+        with mock.patch('inventory_management.autocomplete._trigram', None):
+            self.assertEqual(self.suggest('mousse'), ['Mouse Ergo RGB'])
+            self.assertEqual(self.suggest('tecladp'), [])
@@ -1,7 +1,7 @@
 from django.urls import path, include
 #from . import views
 from rest_framework import routers
-from .api import ProductViewSet, InventoryMovementViewSet, InventoryReportsView
+from .api import ProductViewSet, InventoryMovementViewSet, InventoryReportsView, AsyncInventoryReportsView, ReportCacheStatsView, StockReconciliationView, AnalyticsExportView, AnalyticsExportFileView, InventoryAnalyticsView, DemandForecastView, InventoryValuationView
 
 router = routers.DefaultRouter()
 
@@ -12,4 +12,12 @@ urlpatterns = [
     path('', include(router.urls)),
 
     path('reports/', InventoryReportsView.as_view(), name='inventory-reports'),
+    path('reports/async/', AsyncInventoryReportsView.as_view(), name='inventory-reports-async'),
+    path('reports/analytics/', InventoryAnalyticsView.as_view(), name='inventory-analytics'),
+    path('reports/forecasts/', DemandForecastView.as_view(), name='demand-forecasts'),
+    path('reports/valuation/', InventoryValuationView.as_view(), name='inventory-valuation'),
+    path('reports/cache-stats/', ReportCacheStatsView.as_view(), name='report-cache-stats'),
+    path('reconciliation/', StockReconciliationView.as_view(), name='stock-reconciliation'),
+    path('analytics-exports/', AnalyticsExportView.as_view(), name='analytics-exports'),
+    path('analytics-exports/<int:pk>/<path:path>', AnalyticsExportFileView.as_view(), name='analytics-export-file'),
 ]
\ No newline at end of file
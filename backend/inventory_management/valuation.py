@@ -0,0 +1,300 @@
+"""
+Inventory valuation with FIFO or weighted-average costing.
+
+Every movement updates the valuation of its product inside the movement's
+transaction, so the value of the stock is read from one row per product
+instead of being recomputed from the unit price history:
+
+- FIFO (the default): IN movements add a cost layer at their unit price and
+  OUT movements consume the oldest layers first. A product's valuation is
+  the sum of its layers.
+- Weighted average: there are no layers; IN movements blend their units into
+  the average cost and OUT movements take units out at it.
+
+An ADJ movement that raises the stock adds the difference at the current
+average cost (the product price when nothing is valued yet); one that lowers
+it consumes the difference like an OUT movement.
+
+Striped products are the exception: their valuation row would serialize
+the writers the stock stripes let run side by side. A movement that finds
+it locked queues its cost as a PendingCost row instead of waiting, and the
+queue is applied, oldest first, by the next transaction that gets the row.
+Their valuation can trail the stock by the movements still queued.
+
+INVENTORY_COSTING_METHOD only applies to new movements. After changing it,
+or to value stock recorded before costing existed, run rebuild_cost_layers.
+"""
+from collections import deque
+from decimal import Decimal
+from functools import partial
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import CostLayer, InventoryMovement, InventoryValuation, PendingCost
+from .report_cache import bump_inventory_version, cache_report, get_cached_report, report_cache_key
+
+FIFO = "fifo"
+AVERAGE = "average"
+COSTING_METHODS = (FIFO, AVERAGE)
+COST_PLACES = Decimal("0.01")
+VALUE_PLACES = Decimal("0.0001")
+
+
+def costing_method() -> str:
+    """The configured costing method, one of COSTING_METHODS."""
+    method = settings.INVENTORY_COSTING_METHOD
+    if method not in COSTING_METHODS:
+        raise ImproperlyConfigured(
+            f"INVENTORY_COSTING_METHOD must be one of {', '.join(COSTING_METHODS)}, not {method!r}."
+        )
+    return method
+
+
+class ProductCosts:
+    """
+    The valuation of one product, and its cost layers under FIFO, while
+    movements are applied to it in memory. Nothing is written until
+    save_costs.
+    """
+
+    def __init__(self, valuation: InventoryValuation, fifo: bool, layers=None):
+        self.valuation = valuation
+        self.fifo = fifo
+        # Oldest first; saved layers are loaded on the first consumption
+        self.layers = deque(layers) if layers is not None else None
+        self.new_layers = []
+        self.new_emptied = 0
+        self.emptied = []
+        # Saved layers partly consumed, by primary key
+        self.changed = {}
+
+    def apply(self, movement_type: str, quantity: int, unit_cost, moved_at) -> None:
+        if movement_type == InventoryMovement.MOVEMENT_INPUT:
+            self.receive(quantity, unit_cost, moved_at)
+        elif movement_type == InventoryMovement.MOVEMENT_OUTPUT:
+            self.consume(quantity)
+        elif movement_type == InventoryMovement.MOVEMENT_ADJUSTMENT:
+            difference = quantity - self.valuation.quantity
+            if difference > 0:
+                average = self.valuation.average_cost
+                self.receive(difference, unit_cost if average is None else average, moved_at)
+            elif difference < 0:
+                self.consume(-difference)
+
+    def receive(self, quantity: int, unit_cost, received_at) -> None:
+        unit_cost = Decimal(unit_cost or 0)
+        if self.fifo:
+            # Layer costs are stored in cents, so the value is built from the stored cost
+            unit_cost = unit_cost.quantize(COST_PLACES)
+            layer = CostLayer(
+                product_id=self.valuation.product_id,
+                received_at=received_at,
+                unit_cost=unit_cost,
+                quantity=quantity,
+            )
+            self.new_layers.append(layer)
+            if self.layers is not None:
+                self.layers.append(layer)
+        self.valuation.quantity += quantity
+        self.valuation.value += quantity * unit_cost
+
+    def consume(self, quantity: int) -> None:
+        # Units that were never valued (stock from before costing) carry no value
+        quantity = min(quantity, self.valuation.quantity)
+        if not quantity:
+            return
+        if not self.fifo:
+            self.valuation.value -= self.valuation.value * quantity / self.valuation.quantity
+            self.valuation.quantity -= quantity
+            return
+
+        if self.layers is None:
+            self.layers = deque(
+                CostLayer.objects.filter(product_id=self.valuation.product_id).order_by("received_at", "id")
+            )
+            self.layers.extend(self.new_layers)
+        while quantity and self.layers:
+            layer = self.layers[0]
+            taken = min(layer.quantity, quantity)
+            layer.quantity -= taken
+            quantity -= taken
+            self.valuation.quantity -= taken
+            self.valuation.value -= taken * layer.unit_cost
+            if layer.quantity:
+                if layer.pk:
+                    self.changed[layer.pk] = layer
+            else:
+                self.layers.popleft()
+                if layer.pk:
+                    self.changed.pop(layer.pk, None)
+                    self.emptied.append(layer.pk)
+                else:
+                    self._drop_new_layer()
+
+    def _drop_new_layer(self) -> None:
+        # Emptied unsaved layers are skipped when saving and compacted away
+        # now and then, so replaying a long history keeps only open layers
+        self.new_emptied += 1
+        if self.new_emptied * 2 > len(self.new_layers):
+            self.new_layers = [layer for layer in self.new_layers if layer.quantity]
+            self.new_emptied = 0
+
+
+def save_costs(costs) -> None:
+    """Write the layers and valuations of ProductCosts objects with one statement per kind of change."""
+    costs = list(costs)
+    emptied = [pk for product in costs for pk in product.emptied]
+    if emptied:
+        CostLayer.objects.filter(pk__in=emptied).delete()
+    changed = [layer for product in costs for layer in product.changed.values()]
+    CostLayer.objects.bulk_update(changed, ["quantity"], batch_size=1000)
+    CostLayer.objects.bulk_create(
+        [layer for product in costs for layer in product.new_layers if layer.quantity], batch_size=1000
+    )
+    for product in costs:
+        if not product.valuation.quantity:
+            # Drop the rounding left over by averages
+            product.valuation.value = Decimal(0)
+        product.valuation.value = product.valuation.value.quantize(VALUE_PLACES)
+    InventoryValuation.objects.bulk_update(
+        [product.valuation for product in costs], ["quantity", "value"], batch_size=1000
+    )
+
+
+def _lock_costs(product_ids, skip_locked: bool = False) -> dict:
+    """
+    ProductCosts of each product, with its valuation row created if needed
+    and locked. With ``skip_locked``, products whose row another transaction
+    holds are left out.
+    """
+    product_ids = sorted(product_ids)
+    InventoryValuation.objects.bulk_create(
+        [InventoryValuation(product_id=product_id) for product_id in product_ids], ignore_conflicts=True
+    )
+    fifo = costing_method() == FIFO
+    # Locked in product order, like every other writer of these rows
+    valuations = (
+        InventoryValuation.objects.select_for_update(skip_locked=skip_locked)
+        .filter(product_id__in=product_ids)
+        .order_by("product_id")
+    )
+    return {valuation.product_id: ProductCosts(valuation, fifo) for valuation in valuations}
+
+
+def _unit_cost(movement):
+    return movement.unit_price if movement.unit_price is not None else movement.product.price
+
+
+def _apply_queued_costs(costs: dict) -> int:
+    """
+    Apply and drop the queued costs of products whose valuation rows the
+    caller holds, in ledger order. Queued costs are only ever applied under
+    that lock, so no two workers apply the same ones.
+    """
+    pending = list(
+        PendingCost.objects.filter(product_id__in=costs).order_by("product_id", "moved_at", "movement_id")
+    )
+    for cost in pending:
+        costs[cost.product_id].apply(cost.movement_type, cost.quantity, cost.unit_cost, cost.moved_at)
+    if pending:
+        PendingCost.objects.filter(pk__in=[cost.pk for cost in pending]).delete()
+    return len(pending)
+
+
+def record_costs(movements) -> None:
+    """
+    Apply just saved movements, in ledger order, to the cost layers and
+    valuations of their products. Must run inside the movements'
+    transaction: the valuation rows of their products stay locked until it
+    commits.
+
+    A striped product's movements never wait for its valuation row: when
+    another transaction holds it they are queued, and applied by
+    apply_pending_costs once one of the two transactions commits.
+    """
+    movements = list(movements)
+    if not movements:
+        return
+    striped = {movement.product_id for movement in movements if movement.product.stripe_count}
+    costs = _lock_costs({movement.product_id for movement in movements} - striped)
+    if striped:
+        locked = _lock_costs(striped, skip_locked=True)
+        # Costs queued before these movements come first
+        _apply_queued_costs(locked)
+        costs.update(locked)
+        PendingCost.objects.bulk_create([
+            PendingCost(
+                product_id=movement.product_id,
+                movement_id=movement.pk,
+                movement_type=movement.movement_type,
+                quantity=movement.quantity,
+                unit_cost=_unit_cost(movement),
+                moved_at=movement.date,
+            )
+            for movement in movements
+            if movement.product_id in striped and movement.product_id not in locked
+        ])
+        # A failure leaves the costs queued for the next movement of the
+        # product, it must not fail the movements that just committed
+        transaction.on_commit(partial(apply_pending_costs, striped), robust=True)
+    for movement in movements:
+        if movement.product_id in costs:
+            costs[movement.product_id].apply(
+                movement.movement_type, movement.quantity, _unit_cost(movement), movement.date
+            )
+    save_costs(costs.values())
+
+
+def apply_pending_costs(product_ids, wait: bool = False) -> int:
+    """
+    Apply the queued costs of products to their valuations.
+
+    A product whose valuation row another transaction holds is skipped
+    unless ``wait``: whoever holds it calls this too once it commits, and
+    applies the costs queued meanwhile.
+
+    Returns:
+        int: Number of queued costs applied
+    """
+    applied = 0
+    while True:
+        product_ids = set(PendingCost.objects.filter(product_id__in=product_ids).values_list("product_id", flat=True))
+        if not product_ids:
+            return applied
+        with transaction.atomic():
+            costs = _lock_costs(product_ids, skip_locked=not wait)
+            applied_now = _apply_queued_costs(costs)
+            if applied_now:
+                save_costs(costs.values())
+                bump_inventory_version()
+        if not applied_now:
+            return applied
+        applied += applied_now
+        # Costs queued by transactions that skipped these rows while they were locked
+        product_ids = costs
+
+
+def inventory_value() -> dict:
+    """
+    Costing method, units valued and total value of the stock. Summed over
+    the valuation rows once per inventory version and served from the
+    report cache in between.
+    """
+    method = costing_method()
+    key = report_cache_key({"valuation": method})
+    totals = get_cached_report(key)
+    if totals is None:
+        totals = InventoryValuation.objects.filter(quantity__gt=0).aggregate(
+            products=Count("pk"), quantity=Sum("quantity"), value=Sum("value")
+        )
+        totals = {
+            "method": method,
+            "products": totals["products"],
+            "quantity": totals["quantity"] or 0,
+            "value": (totals["value"] or Decimal(0)).quantize(COST_PLACES),
+        }
+        cache_report(key, totals)
+    return totals
@@ -1,13 +1,15 @@
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.db import transaction
 from .models import PurchaseOrder
 from .serializers import PurchaseOrderSerializer
-from .services import receive_purchase_order
+from .services import draft_purchase_orders, receive_purchase_order, suggest_replenishment
+from inventory_management.conditional import ConditionalGetMixin
 
 
-class PurchaseOrderViewSet(viewsets.ModelViewSet):
+class PurchaseOrderViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for managing purchase orders.
     """
@@ -70,4 +72,26 @@ class PurchaseOrderViewSet(viewsets.ModelViewSet):
                 "purchase_order": serializer.data
             })
         except ValueError as e:
-            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ReplenishmentView(APIView):
+    """
+    Reorder suggestions grouped by supplier (GET), or draft pending purchase
+    orders from them (POST).
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, *args, **kwargs):
+        return Response(suggest_replenishment())
+
+    def post(self, request, *args, **kwargs):
+        orders = draft_purchase_orders(request.user)
+        return Response(
+            {
+                "created": len(orders),
+                "purchase_orders": [{"id": order.pk, "supplier": order.supplier_id} for order in orders],
+            },
+            status=status.HTTP_201_CREATED,
+        )
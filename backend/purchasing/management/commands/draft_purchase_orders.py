@@ -0,0 +1,35 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from purchasing.services import draft_purchase_orders, suggest_replenishment
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute reorder points for the whole catalog and draft one pending "
+        "purchase order per supplier for the products at or below them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username the orders are created by")
+        parser.add_argument("--dry-run", action="store_true", help="Only print the suggestions")
+
+    def handle(self, *args, **options):
+        user = None
+        if options["user"]:
+            user = get_user_model().objects.filter(username=options["user"]).first()
+            if user is None:
+                raise CommandError(f"Unknown user {options['user']}")
+
+        suggestions = suggest_replenishment()
+        for group in suggestions["suppliers"]:
+            self.stdout.write(f"{group['supplier_name']}: {len(group['items'])} products")
+        if suggestions["unassigned"]:
+            self.stdout.write(self.style.WARNING(
+                f"{len(suggestions['unassigned'])} products need reordering but have no supplier"
+            ))
+        if options["dry_run"]:
+            return
+
+        orders = draft_purchase_orders(user, suggestions)
+        self.stdout.write(self.style.SUCCESS(f"Drafted {len(orders)} purchase orders"))
@@ -0,0 +1,24 @@
+# Generated by Django 5.1.15 on 2026-10-18 03:53
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('purchasing', '0006_alter_purchaseorderitem_unique_together'),
+        ('suppliers', '0004_alter_supplier_payment_terms'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(fields=['supplier', '-order_date'], name='po_supplier_order_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='purchaseorder',
+            index=models.Index(condition=models.Q(('is_paid', False)), fields=['payment_due_date'], name='po_unpaid_due_date_idx'),
+        ),
+    ]
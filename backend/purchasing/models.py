@@ -6,6 +6,8 @@ from django.utils import timezone
 from datetime import timedelta
 from suppliers.models import Supplier
 from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 class PurchaseOrder(models.Model):
     STATUS_CHOICES = [
@@ -47,6 +49,12 @@ class PurchaseOrder(models.Model):
     def status_display(self):
         return dict(self.STATUS_CHOICES)[self.status]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        order = super().from_db(db, field_names, values)
+        order._loaded_supplier_date = (order.__dict__.get("supplier_id"), order.__dict__.get("order_date"))
+        return order
+
     def save(self, *args, **kwargs):
         # Use order-specific payment terms if set, otherwise use supplier default
         if not self.payment_terms and self.supplier:
@@ -64,6 +72,26 @@ class PurchaseOrder(models.Model):
 
     class Meta:
         ordering = ['-order_date']
+        indexes = [
+            models.Index(fields=['supplier', '-order_date'], name='po_supplier_order_date_idx'),
+            models.Index(
+                fields=['payment_due_date'],
+                condition=models.Q(is_paid=False),
+                name='po_unpaid_due_date_idx',
+            ),
+        ]
+
+
+@receiver(post_save, sender=PurchaseOrder)
+@receiver(post_delete, sender=PurchaseOrder)
+def refresh_supplier_order_dates(sender, instance, **kwargs):
+    """Keep the latest order and next payment due dates of the order's supplier(s) in step."""
+    loaded_supplier_id, loaded_order_date = getattr(instance, "_loaded_supplier_date", (None, None))
+    if kwargs.get("created") is False and (loaded_supplier_id, loaded_order_date) == (instance.supplier_id, instance.order_date):
+        return
+    # Moving an order to another supplier changes both
+    Supplier.objects.filter(pk__in={instance.supplier_id, loaded_supplier_id} - {None}).refresh_order_dates()
+    instance._loaded_supplier_date = (instance.supplier_id, instance.order_date)
 
 
 class PurchaseOrderItem(models.Model):
@@ -75,6 +103,8 @@ class PurchaseOrderItem(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     cost_per_unit = models.DecimalField(max_digits=10, decimal_places=2)
+    # Lets the analytics export pick up items edited without their order
+    updated_at = models.DateTimeField(auto_now=True)
 
     @property
     def total_cost(self):
@@ -177,7 +177,7 @@ class PurchaseOrderSerializer(serializers.ModelSerializer):
             # Update product price
             product.refresh_from_db()
             product.price = new_avg_cost
-            product.save()
+            product.save(update_fields=["price"])
 
             total_items += item.quantity
 
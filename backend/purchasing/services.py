@@ -1,10 +1,24 @@
+import math
 from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
 from django.utils import timezone
 from datetime import timedelta
-from .models import PurchaseOrder
+from .models import PurchaseOrder, PurchaseOrderItem
+from inventory_management.models import DailySalesRollup, Product
 from inventory_management.services import create_inventory_movement
+from inventory_management.report_cache import bump_inventory_version
+from suppliers.models import Supplier
 from decimal import Decimal, ROUND_HALF_UP
 
+# Days of sales history the velocity and its variability are measured over
+VELOCITY_DAYS = 28
+# Days of demand an order covers beyond the lead time
+REVIEW_PERIOD_DAYS = 14
+# Safety stock z-score; 1.65 keeps about 95% of lead times free of stockouts
+SERVICE_LEVEL_Z = 1.65
+# Orders that have not arrived yet
+OPEN_ORDER_STATUSES = ("pending", "approved")
+
 def calculate_weighted_average_cost(current_quantity, current_price, new_quantity, new_price):
     """
     Calculate weighted average cost based on current inventory and new purchase.
@@ -75,7 +89,7 @@ def receive_purchase_order(purchase_order: PurchaseOrder, user):
         # Update the product price to the new weighted average
         product.refresh_from_db()  # Get updated quantity after movement
         product.price = new_avg_cost
-        product.save()
+        product.save(update_fields=["price"])
 
     today = timezone.now().date()
     
@@ -86,4 +100,166 @@ def receive_purchase_order(purchase_order: PurchaseOrder, user):
     purchase_order.payment_due_date = today + timedelta(days=payment_terms)
     
     purchase_order.save()
+    bump_inventory_version()
     return purchase_order
+
+
+def _sales_statistics(today):
+    """{product id: (mean, standard deviation)} of daily units sold over VELOCITY_DAYS."""
+    # Summed per day first: a striped product has several rows per day
+    rows = (
+        DailySalesRollup.objects.filter(date__gte=today - timedelta(days=VELOCITY_DAYS), date__lt=today)
+        .values("product_id", "date")
+        .annotate(total=Sum("quantity"))
+        .values_list("product_id", "total")
+        .iterator(chunk_size=20000)
+    )
+    sums = {}
+    for product_id, total in rows:
+        running = sums.setdefault(product_id, [0, 0])
+        running[0] += total
+        running[1] += total * total
+    statistics = {}
+    for product_id, (total, squares) in sums.items():
+        mean = total / VELOCITY_DAYS
+        # Days without a rollup row sold nothing and count as zeros
+        statistics[product_id] = (mean, math.sqrt(max(squares / VELOCITY_DAYS - mean * mean, 0)))
+    return statistics
+
+
+def _preferred_suppliers():
+    """{product id: supplier} choosing the shortest lead time when several supply a product."""
+    suppliers = {supplier.pk: supplier for supplier in Supplier.objects.all()}
+    links = Supplier.products.through.objects.order_by(
+        "product_id", "supplier__lead_time_days", "supplier_id"
+    ).values_list("product_id", "supplier_id")
+    preferred = {}
+    for product_id, supplier_id in links:
+        preferred.setdefault(product_id, suppliers[supplier_id])
+    return preferred
+
+
+def suggest_replenishment():
+    """
+    Reorder suggestions for every active product, in one pass over the catalog.
+
+    The reorder point is the expected demand over the supplier's lead time
+    plus safety stock (SERVICE_LEVEL_Z standard deviations of the daily sales
+    over the lead time). A product whose stock plus open orders is at or
+    below it is ordered up to the reorder point plus REVIEW_PERIOD_DAYS of
+    demand. Demand is the stored forecast when there is one, else the average
+    of the last VELOCITY_DAYS of sales.
+
+    Returns:
+        dict: ``suppliers``, a list of suppliers with the items to order from
+        them, and ``unassigned``, suggestions for products without a supplier
+    """
+    today = timezone.localdate()
+    statistics = _sales_statistics(today)
+    suppliers = _preferred_suppliers()
+    on_order = dict(
+        PurchaseOrderItem.objects.filter(purchase_order__status__in=OPEN_ORDER_STATUSES)
+        .values("product_id")
+        .annotate(total=Sum("quantity"))
+        .values_list("product_id", "total")
+    )
+    last_cost = (
+        PurchaseOrderItem.objects.filter(product=OuterRef("pk"))
+        .order_by("-purchase_order__order_date", "-pk")
+        .values("cost_per_unit")[:1]
+    )
+    products = (
+        Product.objects.filter(is_active=True)
+        .with_stock()
+        .annotate(forecast=F("demand_forecast__next_28_days"), last_cost=Subquery(last_cost))
+        .order_by("pk")
+        .values_list("pk", "name", "price", "stock", "forecast", "last_cost")
+    )
+
+    grouped = {}
+    unassigned = []
+    for product_id, name, price, stock, forecast, cost in products.iterator(chunk_size=5000):
+        if product_id not in statistics and forecast is None:
+            continue
+        mean, deviation = statistics.get(product_id, (0.0, 0.0))
+        velocity = forecast / 28 if forecast is not None else mean
+        supplier = suppliers.get(product_id)
+        lead_time = supplier.lead_time_days if supplier else 0
+        safety_stock = SERVICE_LEVEL_Z * deviation * math.sqrt(lead_time)
+        reorder_point = velocity * lead_time + safety_stock
+        position = stock + on_order.get(product_id, 0)
+        if velocity <= 0 or position > reorder_point:
+            continue
+
+        suggestion = {
+            "product_id": product_id,
+            "product_name": name,
+            "daily_velocity": round(velocity, 2),
+            "safety_stock": round(safety_stock, 1),
+            "reorder_point": round(reorder_point, 1),
+            "stock": stock,
+            "on_order": on_order.get(product_id, 0),
+            "order_quantity": math.ceil(reorder_point + velocity * REVIEW_PERIOD_DAYS - position),
+            "cost_per_unit": cost if cost is not None else price,
+        }
+        if supplier is None:
+            unassigned.append(suggestion)
+            continue
+        group = grouped.setdefault(supplier.pk, {
+            "supplier_id": supplier.pk,
+            "supplier_name": supplier.name,
+            "lead_time_days": supplier.lead_time_days,
+            "items": [],
+        })
+        group["items"].append(suggestion)
+    return {"suppliers": list(grouped.values()), "unassigned": unassigned}
+
+
+@transaction.atomic
+def draft_purchase_orders(user, suggestions=None):
+    """
+    Create one pending purchase order per supplier from reorder suggestions,
+    with bulk inserts.
+
+    Args:
+        user: The user the orders are created by
+        suggestions (dict, optional): Output of suggest_replenishment;
+            computed when not given
+
+    Returns:
+        list: The created purchase orders
+    """
+    if suggestions is None:
+        suggestions = suggest_replenishment()
+    groups = [group for group in suggestions["suppliers"] if group["items"]]
+    if not groups:
+        return []
+
+    suppliers = Supplier.objects.in_bulk([group["supplier_id"] for group in groups])
+    now = timezone.now()
+    # bulk_create skips PurchaseOrder.save, so its defaults are applied here
+    orders = PurchaseOrder.objects.bulk_create([
+        PurchaseOrder(
+            supplier=suppliers[group["supplier_id"]],
+            order_date=now,
+            status="pending",
+            created_by=user,
+            payment_terms=suppliers[group["supplier_id"]].payment_terms,
+            payment_due_date=now.date() + timedelta(days=suppliers[group["supplier_id"]].payment_terms),
+        )
+        for group in groups
+    ])
+    PurchaseOrderItem.objects.bulk_create([
+        PurchaseOrderItem(
+            purchase_order=order,
+            product_id=item["product_id"],
+            quantity=item["order_quantity"],
+            cost_per_unit=item["cost_per_unit"],
+        )
+        for order, group in zip(orders, groups)
+        for item in group["items"]
+    ])
+    # Nor do the signals run that keep the suppliers' order dates in step
+    Supplier.objects.filter(pk__in=suppliers).refresh_order_dates()
+    bump_inventory_version()
+    return orders
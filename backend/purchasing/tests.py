@@ -1,6 +1,15 @@
 from django.test import TestCase
 from decimal import Decimal
-from purchasing.services import calculate_weighted_average_cost
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from inventory_management.models import DailySalesRollup, Product
+from purchasing.models import PurchaseOrder
+from purchasing.services import calculate_weighted_average_cost, suggest_replenishment
+from suppliers.models import Supplier
 
 
 class WeightedAverageCostTest(TestCase):
@@ -46,3 +55,115 @@ class WeightedAverageCostTest(TestCase):
         expected = Decimal('3.11')
         self.assertEqual(result, expected)
 
+
+
+class ReplenishmentTest(APITestCase):
+    """Test reorder points and drafted purchase orders"""
+
+    def setUp(self):
+        self.admin_user = User.objects.create_user(username='buyer', password='adminpassword123', is_staff=True)
+        self.slow = Supplier.objects.create(name='Mayorista Lento', tax_id='NIT-100', lead_time_days=5, payment_terms=15)
+        self.fast = Supplier.objects.create(name='Mayorista Rapido', tax_id='NIT-101', lead_time_days=3)
+        self.toner = Product.objects.create(name='Toner', price=Decimal('9.00'), quantity=10)
+        self.paper = Product.objects.create(name='Resma', price=Decimal('4.00'), quantity=100)
+        self.folder = Product.objects.create(name='Carpeta', price=Decimal('1.20'), quantity=0)
+        self.stapler = Product.objects.create(name='Grapadora', price=Decimal('6.00'), quantity=0)
+        retired = Product.objects.create(name='Fax', price=Decimal('50.00'), quantity=0, is_active=False)
+        self.slow.products.add(self.toner, self.paper, self.folder, retired)
+        self.fast.products.add(self.folder)
+
+        today = timezone.localdate()
+        daily_sales = {self.toner: lambda day: 2 if day % 2 else 6, self.paper: lambda day: 1,
+                       self.folder: lambda day: 2, self.stapler: lambda day: 1, retired: lambda day: 3}
+        DailySalesRollup.objects.bulk_create([
+            DailySalesRollup(product=product, date=today - timedelta(days=day), quantity=sales(day))
+            for product, sales in daily_sales.items()
+            for day in range(1, 29)
+        ])
+        earlier = PurchaseOrder.objects.create(supplier=self.slow, status='received')
+        earlier.items.create(product=self.toner, quantity=5, cost_per_unit=Decimal('2.50'))
+        pending = PurchaseOrder.objects.create(supplier=self.fast, status='pending')
+        pending.items.create(product=self.folder, quantity=3, cost_per_unit=Decimal('1.10'))
+
+    def test_suggestions_by_preferred_supplier(self):
+        suggestions = suggest_replenishment()
+        groups = {group['supplier_name']: group for group in suggestions['suppliers']}
+        self.assertEqual(set(groups), {'Mayorista Lento', 'Mayorista Rapido'})
+
+        toner = groups['Mayorista Lento']['items'][0]
+        self.assertEqual(len(groups['Mayorista Lento']['items']), 1)
+        # Mean 4 a day with a standard deviation of 2 over a 5 day lead time
+        self.assertEqual((toner['daily_velocity'], toner['safety_stock'], toner['reorder_point']), (4, 7.4, 27.4))
+        self.assertEqual((toner['order_quantity'], toner['cost_per_unit']), (74, Decimal('2.50')))
+
+        folder = groups['Mayorista Rapido']['items'][0]
+        self.assertEqual((folder['on_order'], folder['reorder_point'], folder['order_quantity']), (3, 6, 31))
+        self.assertEqual([item['product_name'] for item in suggestions['unassigned']], ['Grapadora'])
+
+    def test_drafts_one_order_per_supplier(self):
+        self.client.force_authenticate(user=self.admin_user)
+        response = self.client.post(reverse('replenishment'))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['created'], 2)
+
+        order = PurchaseOrder.objects.get(pk__in=[row['id'] for row in response.data['purchase_orders']], supplier=self.slow)
+        self.assertEqual((order.status, order.created_by, order.payment_terms), ('pending', self.admin_user, 15))
+        self.assertEqual(order.payment_due_date, order.order_date.date() + timedelta(days=15))
+        self.assertEqual(list(order.items.values_list('product__name', 'quantity')), [('Toner', 74)])
+        self.slow.refresh_from_db()
+        self.assertEqual((self.slow.latest_order_date, self.slow.next_payment_due_date), (order.order_date, order.payment_due_date))
+
+        # The drafted quantities now count as on order
+        self.assertEqual(suggest_replenishment()['suppliers'], [])
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='clerk', password='userpassword123'))
+        self.assertEqual(self.client.get(reverse('replenishment')).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class SupplierOrderDatesTest(TestCase):
+    # The latest order and next payment due dates kept on the supplier
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Papelera Sur', tax_id='NIT-611', payment_terms=30)
+        self.other = Supplier.objects.create(name='Papelera Norte', tax_id='NIT-612', payment_terms=10)
+        self.now = timezone.now()
+
+    def dates(self, supplier):
+        supplier.refresh_from_db()
+        return supplier.latest_order_date, supplier.next_payment_due_date
+
+    def test_dates_follow_the_purchase_orders(self):
+        latest = PurchaseOrder.objects.create(supplier=self.supplier, order_date=self.now)
+        older = PurchaseOrder.objects.create(supplier=self.supplier, order_date=self.now - timedelta(days=20))
+        expected = (self.now, self.now.date() + timedelta(days=30))
+        self.assertEqual(self.dates(self.supplier), expected)
+
+        # A stale instance saved later keeps them
+        stale = Supplier.objects.get(pk=self.supplier.pk)
+        stale.latest_order_date = None
+        stale.contact_person = 'Ana'
+        stale.save()
+        self.assertEqual(self.dates(self.supplier), expected)
+
+        # The due date follows the payment terms
+        self.supplier.payment_terms = 45
+        self.supplier.save()
+        self.assertEqual(self.supplier.next_payment_due_date, self.now.date() + timedelta(days=45))
+
+        latest.supplier = self.other
+        latest.save()
+        self.assertEqual(self.dates(self.supplier), (older.order_date, older.order_date.date() + timedelta(days=45)))
+        self.assertEqual(self.dates(self.other), (self.now, self.now.date() + timedelta(days=10)))
+
+        older.delete()
+        self.assertEqual(self.dates(self.supplier), (None, None))
+
+    def test_due_suppliers_kpi_is_an_indexed_range_count(self):
+        from inventory_management.api import InventoryReportsView
+
+        PurchaseOrder.objects.create(supplier=self.supplier, order_date=self.now - timedelta(days=25))
+        PurchaseOrder.objects.create(supplier=self.other, order_date=self.now - timedelta(days=30))
+        PurchaseOrder.objects.create(supplier=self.other, order_date=self.now)
+        context = {'due_date_threshold': timezone.localdate() + timedelta(days=7)}
+        with self.assertNumQueries(1):
+            self.assertEqual(InventoryReportsView._due_suppliers(context), {'due_suppliers_count': 1})
@@ -1,10 +1,11 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .api import PurchaseOrderViewSet
+from .api import PurchaseOrderViewSet, ReplenishmentView
 
 router = DefaultRouter()
 router.register(r"purchase-orders", PurchaseOrderViewSet, basename="purchase-order")
 
 urlpatterns = [
     path("", include(router.urls)),
+    path("replenishment/", ReplenishmentView.as_view(), name="replenishment"),
 ]
\ No newline at end of file
@@ -2,13 +2,17 @@ from rest_framework import viewsets, permissions
 from .models import Supplier
 from .serializers import SupplierSerializer
 from accounts.permissions import IsAdminOrReadOnly
+from inventory_management.conditional import ConditionalGetMixin
+from inventory_management.search import FullTextSearchFilter
 
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     A viewset for viewing and editing supplier instances.
     """
 
-    queryset = Supplier.objects.all().prefetch_related("products")
+    queryset = Supplier.objects.all().prefetch_related("products__stock_stripes")
     serializer_class = SupplierSerializer
     permission_classes = [permissions.IsAuthenticated, IsAdminOrReadOnly]
+    filter_backends = [FullTextSearchFilter]
+    search_fields = ["name", "tax_id", "contact_person", "email"]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 04:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('suppliers', '0004_alter_supplier_payment_terms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='lead_time_days',
+            field=models.PositiveIntegerField(default=7, help_text='Days from placing an order to receiving the goods'),
+        ),
+    ]
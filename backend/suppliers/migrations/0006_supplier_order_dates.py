@@ -0,0 +1,49 @@
+# Generated by Django 5.1.15 on 2026-10-18 05:03
+
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import Max
+from django.utils import timezone
+
+
+def fill_order_dates(apps, schema_editor):
+    Supplier = apps.get_model("suppliers", "Supplier")
+    suppliers = list(
+        Supplier.objects.annotate(latest=Max("purchase_orders__order_date")).filter(latest__isnull=False)
+    )
+    for supplier in suppliers:
+        supplier.latest_order_date = supplier.latest
+        supplier.next_payment_due_date = timezone.localdate(supplier.latest) + timedelta(days=supplier.payment_terms)
+    Supplier.objects.bulk_update(suppliers, ["latest_order_date", "next_payment_due_date"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory_management', '0020_cost_layers'),
+        ('suppliers', '0005_supplier_lead_time'),
+        ('purchasing', '0007_purchase_order_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplier',
+            name='latest_order_date',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Date of the most recent purchase order', null=True),
+        ),
+        migrations.AddField(
+            model_name='supplier',
+            name='next_payment_due_date',
+            field=models.DateField(blank=True, editable=False, help_text='Latest order date plus the payment terms', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['latest_order_date'], name='supplier_latest_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='supplier',
+            index=models.Index(fields=['next_payment_due_date'], name='supplier_payment_due_idx'),
+        ),
+        migrations.RunPython(fill_order_dates, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,39 @@
-from django.db import models
+from datetime import timedelta
+
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import Max
+from django.utils import timezone
 from inventory_management.models import Product
 
+# Maintained from the purchase orders, never written by a plain save
+ORDER_DATE_FIELDS = ("latest_order_date", "next_payment_due_date")
+
+
+class SupplierQuerySet(models.QuerySet):
+    def refresh_order_dates(self) -> None:
+        """
+        Recompute latest_order_date and next_payment_due_date of these
+        suppliers from their purchase orders.
+
+        The suppliers are locked first, so concurrent purchase order writes
+        for the same supplier refresh one after the other and the last one
+        sees every committed order.
+        """
+        with transaction.atomic():
+            supplier_ids = list(self.select_for_update().order_by("pk").values_list("pk", flat=True))
+            if not supplier_ids:
+                return
+            suppliers = list(
+                Supplier.objects.filter(pk__in=supplier_ids)
+                .annotate(latest=Max("purchase_orders__order_date"))
+                .order_by()
+            )
+            for supplier in suppliers:
+                supplier.latest_order_date = supplier.latest
+                supplier.next_payment_due_date = supplier.payment_due_date_after(supplier.latest)
+            Supplier.objects.bulk_update(suppliers, ORDER_DATE_FIELDS, batch_size=1000)
+
 
 class Supplier(models.Model):
     name = models.CharField(
@@ -18,14 +51,55 @@ class Supplier(models.Model):
         default=30, 
         help_text="Default payment terms in days (default is 30 days)"
     )
+    lead_time_days = models.PositiveIntegerField(
+        default=7,
+        help_text="Days from placing an order to receiving the goods"
+    )
 
     products = models.ManyToManyField(Product, related_name="suppliers", blank=True)
 
+    latest_order_date = models.DateTimeField(
+        null=True, blank=True, editable=False,
+        help_text="Date of the most recent purchase order"
+    )
+    next_payment_due_date = models.DateField(
+        null=True, blank=True, editable=False,
+        help_text="Latest order date plus the payment terms"
+    )
+    # Kept up to date by a database trigger on PostgreSQL, see inventory_management.search
+    search_vector = SearchVectorField(null=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = SupplierQuerySet.as_manager()
+
+    def payment_due_date_after(self, order_date):
+        """Day the payment of an order placed at ``order_date`` is due under these terms."""
+        if order_date is None:
+            return None
+        return timezone.localdate(order_date) + timedelta(days=self.payment_terms)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if not adding and kwargs.get("update_fields") is None:
+            # A stale instance must not overwrite the dates kept by the purchase orders
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in ORDER_DATE_FIELDS
+            ]
+        super().save(*args, **kwargs)
+        if not adding and "payment_terms" in kwargs["update_fields"]:
+            # The due date follows the payment terms
+            Supplier.objects.filter(pk=self.pk).refresh_order_dates()
+            self.refresh_from_db(fields=ORDER_DATE_FIELDS)
+
     def __str__(self):
         return self.name
 
     class Meta:
-        ordering = ["name"]
\ No newline at end of file
+        ordering = ["name"]
+        indexes = [
+            models.Index(fields=["latest_order_date"], name="supplier_latest_order_idx"),
+            models.Index(fields=["next_payment_due_date"], name="supplier_payment_due_idx"),
+        ]
\ No newline at end of file
@@ -25,8 +25,12 @@ class SupplierSerializer(serializers.ModelSerializer):
             "email",
             "contact_person",
             "payment_terms",
+            "lead_time_days",
             "products",
             "product_ids",
+            "latest_order_date",
+            "next_payment_due_date",
             "created_at",
             "updated_at",
-        ]
\ No newline at end of file
+        ]
+        read_only_fields = ["latest_order_date", "next_payment_due_date"]
\ No newline at end of file